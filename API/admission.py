@@ -0,0 +1,287 @@
+"""
+Control de admisión con límite de concurrencia adaptativo para /predict.
+
+Sin él, en un pico de tráfico las solicitudes se acumulan sin límite
+delante del pool de intérpretes y del micro-batcher: la latencia crece
+hasta que el cliente o el balanceador abandonan, y para entonces el
+servidor sigue trabajando en respuestas que nadie leerá.
+
+Solo la inferencia ocupa plaza: una solicitud la pide después de
+descargar, decodificar y buscar su imagen en las cachés, y la libera al
+recibir las probabilidades. Así la latencia que ajusta el límite es la de
+la inferencia (con la espera del intérprete o del micro-batcher): ni una
+URL lenta lo reduce ni una ráfaga de aciertos de caché lo aumenta.
+
+- Límite de inferencias en curso (in-flight) que se ajusta con la
+  latencia observada, al estilo del algoritmo Gradient2: se compara una
+  media corta de la latencia con una media larga (la latencia "normal"),
+  y el límite crece mientras ambas se parecen y se reduce cuando la corta
+  supera `tolerance` veces la larga, es decir, cuando las solicitudes
+  empiezan a hacer cola dentro del servidor.
+- Cola acotada (FIFO) para las solicitudes que no caben en el límite,
+  con un tiempo de espera máximo. Al terminar una solicitud su plaza pasa
+  directamente a la primera de la cola.
+- Una solicitud que no cabe en la cola, o que agota su espera, se rechaza
+  en el acto con AdmissionRejectedError (503 con Retry-After).
+
+admit() es para hilos (Flask) y admit_async() para el event loop (ASGI);
+ambos comparten el mismo límite y la misma cola.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from .metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED, observe_stage
+)
+
+# Pesos de las medias móviles exponenciales de la latencia
+SHORT_ALPHA = 0.2
+LONG_ALPHA = 0.01
+# Fracción del nuevo límite calculado que se aplica en cada muestra
+SMOOTHING = 0.2
+# Retry-After (segundos) mínimo y máximo
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Se lanza cuando una solicitud no cabe en el límite ni en la cola (HTTP 503)."""
+
+    def __init__(self, message, retry_after, reason):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    """Solicitud en la cola; `wake` se llama (con el lock tomado) al cederle una plaza."""
+
+    __slots__ = ('granted', 'wake')
+
+    def __init__(self, wake):
+        self.granted = False
+        self.wake = wake
+
+
+class AdmissionController:
+    """Límite de concurrencia adaptativo con cola acotada."""
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=64, max_queue=32,
+                 queue_timeout=1.0, tolerance=2.0, endpoint='/predict'):
+        """
+        Args:
+            initial_limit (int): Solicitudes en curso permitidas al arrancar
+            min_limit (int): Límite mínimo
+            max_limit (int): Límite máximo
+            max_queue (int): Solicitudes que pueden esperar una plaza (0 = sin cola)
+            queue_timeout (float): Segundos máximos de espera en la cola
+            tolerance (float): Cuántas veces la latencia habitual se tolera
+                antes de reducir el límite
+            endpoint (str): Etiqueta de las métricas
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("Se requiere 1 <= min_limit <= max_limit.")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.endpoint = endpoint
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters = deque()
+        self._short_latency = None
+        self._long_latency = None
+        # Los gauges se publican con la primera solicitud, no al importar: con
+        # preload_app el proceso master no atiende solicitudes
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        """Solicitudes en curso permitidas ahora."""
+        return max(self.min_limit, int(self._limit))
+
+    def _publish(self):
+        ADMISSION_LIMIT.set(self.limit, endpoint=self.endpoint)
+        ADMISSION_IN_FLIGHT.set(self._in_flight, endpoint=self.endpoint)
+        ADMISSION_QUEUE_DEPTH.set(len(self._waiters), endpoint=self.endpoint)
+
+    def _retry_after(self):
+        """Segundos estimados hasta que se vacíe la cola actual."""
+        latency = self._short_latency or 1.0
+        seconds = math.ceil((len(self._waiters) + 1) * latency / self.limit)
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, seconds))
+
+    def _wait_timeout(self, deadline):
+        """Espera máxima en la cola: queue_timeout, acotado al plazo de la solicitud."""
+        return self.queue_timeout if deadline is None else deadline.wait_timeout(self.queue_timeout)
+
+    def _timed_out(self, deadline):
+        """Error de una espera agotada: plazo vencido (504) o cola lenta (503)."""
+        if deadline is not None and deadline.expired():
+            return deadline.exceeded('admission_wait')
+        return self._reject('queue_timeout')
+
+    def _reject(self, reason):
+        retry_after = self._retry_after()
+        ADMISSION_SHED.inc(endpoint=self.endpoint, reason=reason)
+        if reason == 'queue_full':
+            message = "Servidor saturado: demasiadas solicitudes en curso."
+        else:
+            message = f"Servidor saturado: sin plaza tras {self.queue_timeout:.1f}s de espera."
+        return AdmissionRejectedError(message, retry_after, reason)
+
+    def _enter(self, wake):
+        """
+        Admite la solicitud o la encola.
+
+        Returns:
+            _Waiter: None si se admitió en el acto, o el de la cola
+
+        Raises:
+            AdmissionRejectedError: Si la cola está llena
+        """
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                self._publish()
+                return None
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject('queue_full')
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            self._publish()
+            return waiter
+
+    def _withdraw(self, waiter):
+        """
+        Retira de la cola una solicitud que deja de esperar.
+
+        Returns:
+            bool: False si la plaza se le cedió justo antes (ya está admitida)
+        """
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            self._publish()
+            return True
+
+    def _exit(self, latency):
+        """Libera una plaza, ajusta el límite y cede las plazas libres a la cola."""
+        with self._lock:
+            if latency is not None:
+                self._update_limit(latency)
+            self._in_flight -= 1
+            while self._waiters and self._in_flight < self.limit:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self._in_flight += 1
+                waiter.wake()
+            self._publish()
+
+    def _update_limit(self, latency):
+        """Ajusta el límite con una muestra de latencia (con el lock tomado)."""
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = latency
+            return
+        self._short_latency += SHORT_ALPHA * (latency - self._short_latency)
+        self._long_latency += LONG_ALPHA * (latency - self._long_latency)
+        if self._long_latency > 2 * self._short_latency:
+            # La latencia bajó de forma sostenida: olvidar antes la referencia anterior
+            self._long_latency *= 0.95
+        if self._in_flight < self._limit / 2:
+            # El límite no se está usando: la muestra no dice nada de él
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / self._short_latency))
+        new_limit = self._limit * gradient + math.sqrt(self._limit)
+        self._limit = min(self.max_limit, max(
+            self.min_limit, (1 - SMOOTHING) * self._limit + SMOOTHING * new_limit
+        ))
+
+    @contextmanager
+    def admit(self, deadline=None, sample=True):
+        """
+        Ocupa una plaza durante el bloque `with`, esperando en la cola si hace falta.
+
+        Args:
+            deadline (Deadline): Plazo de la solicitud; acota la espera en la cola
+            sample (bool): Si la duración del bloque ajusta el límite. Un lote
+                de /predict/batch ocupa una plaza, pero su latencia (la de
+                varias imágenes) no es comparable con la de una inferencia
+
+        Raises:
+            AdmissionRejectedError: Si la cola está llena o la espera se agota
+            DeadlineExceededError: Si el plazo vence esperando en la cola
+        """
+        start = time.perf_counter()
+        event = threading.Event()
+        waiter = self._enter(event.set)
+        if (waiter is not None and not event.wait(self._wait_timeout(deadline))
+                and self._withdraw(waiter)):
+            raise self._timed_out(deadline)
+        observe_stage('admission_wait', time.perf_counter() - start)
+
+        # Solo las solicitudes terminadas sin error, cuya latencia es
+        # representativa, ajustan el límite
+        start = time.perf_counter()
+        latency = None
+        try:
+            yield
+            if sample:
+                latency = time.perf_counter() - start
+        finally:
+            self._exit(latency)
+
+    @asynccontextmanager
+    async def admit_async(self, deadline=None):
+        """Como admit(), esperando en la cola sin bloquear el event loop."""
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enter(wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(future, self._wait_timeout(deadline))
+            except asyncio.TimeoutError:
+                if self._withdraw(waiter):
+                    raise self._timed_out(deadline)
+            except asyncio.CancelledError:
+                # Cliente desconectado: dejar la cola o devolver la plaza cedida
+                if not self._withdraw(waiter):
+                    self._exit(None)
+                raise
+        observe_stage('admission_wait', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        latency = None
+        try:
+            yield
+            latency = time.perf_counter() - start
+        finally:
+            self._exit(latency)
+
+    def stats(self):
+        """
+        Retorna el estado del control de admisión.
+
+        Returns:
+            dict: limit, in_flight, queued y latencias medias (ms)
+        """
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'queued': len(self._waiters),
+                'short_latency_ms': round(self._short_latency * 1000, 2) if self._short_latency else None,
+                'long_latency_ms': round(self._long_latency * 1000, 2) if self._long_latency else None,
+            }
@@ -2,429 +2,244 @@
 API Flask para reconocimiento de imágenes con TensorFlow Lite.
 """
 
-from flask import Flask, request, jsonify
-import os
-from .image_utils import load_image_from_url, load_image_from_file, preprocess_image
-from .model_loader import load_model, predict, is_model_loaded, get_model_info
-import json
+import time
+
+from flask import Flask, Request, Response, abort, g, request, jsonify
+import numpy as np
+from werkzeug.exceptions import RequestEntityTooLarge
+from .admission import AdmissionRejectedError
+from .batching import BatcherQueueFullError
+from .deadlines import DEADLINE_HEADER, DeadlineExceededError
+from .decode_pool import DecodePoolBusyError
+from .interpreter_pool import PoolTimeoutError
+from .metrics import CONTENT_TYPE, IMAGE_REJECTIONS, REGISTRY, observe_error, observe_request
+from .pages import cached_home_page, cached_predict_page, static_asset
+from .profiling import bind, start_trace
+from .prediction import (
+    BATCH_ENDPOINT_CHUNK_SIZE, BATCH_ENDPOINT_MAX_ITEMS, DEFAULT_TARGET_SIZE,
+    MAX_BATCH_REQUEST_BYTES, MAX_UPLOAD_BYTES, MODEL_PATH, AdminConflictError, admin_authorized,
+    admin_load_model, admin_set_default, admin_unload, admit_request, format_predictions,
+    image_limits, model_registry, near_duplicates, parse_resize, parse_top_k, predict_images,
+    predict_scores, prepare_image, preprocess_executor, request_deadline, result_cache,
+    store_result
+)
+from .upload_limits import (
+    FORM_OVERHEAD_BYTES, ImageTooLargeError, InspectedUpload, UnsupportedImageError
+)
+
+# Tamaño máximo del cuerpo por endpoint; el resto de rutas usa MAX_CONTENT_LENGTH
+ENDPOINT_MAX_BYTES = {
+    'predict_endpoint': MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+    'predict_batch_endpoint': MAX_BATCH_REQUEST_BYTES,
+}
+
+
+class InspectingRequest(Request):
+    """
+    Request cuyos archivos subidos se inspeccionan mientras se reciben (ver
+    upload_limits.InspectedUpload): una imagen que no cumple los límites se
+    descarta sin guardarla ni decodificarla.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return InspectedUpload(image_limits)
+
 
 app = Flask(__name__)
+app.request_class = InspectingRequest
+# Tope global: werkzeug corta la lectura del cuerpo (también sin Content-Length)
+app.config['MAX_CONTENT_LENGTH'] = max(ENDPOINT_MAX_BYTES.values())
+
+
+def request_endpoint():
+    """Patrón de la ruta atendida (p. ej. /predict), usado como etiqueta de métricas."""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.before_request
+def check_content_length():
+    # Rechazar por Content-Length antes de leer el cuerpo
+    max_bytes = ENDPOINT_MAX_BYTES.get(request.endpoint)
+    if max_bytes is not None and (request.content_length or 0) > max_bytes:
+        IMAGE_REJECTIONS.inc(reason='bytes')
+        return request_too_large(max_bytes)
+
+
+def request_too_large(max_bytes=None):
+    """Respuesta 413 de un cuerpo que excede el tamaño máximo."""
+    max_bytes = max_bytes or app.config['MAX_CONTENT_LENGTH']
+    return jsonify({
+        'success': False,
+        'error': f'La solicitud excede el tamaño máximo de {max_bytes} bytes.'
+    }), 413
+
+
+@app.errorhandler(413)
+def handle_request_too_large(e):
+    IMAGE_REJECTIONS.inc(reason='bytes')
+    return request_too_large()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        observe_request(request_endpoint(), response.status_code, time.perf_counter() - start)
+    return response
+
+
+# Endpoints que se pueden perfilar bajo demanda (ver profiling.py)
+PROFILED_ENDPOINTS = ('predict_endpoint', 'predict_batch_endpoint')
+
+
+@app.before_request
+def start_profiling():
+    if request.endpoint in PROFILED_ENDPOINTS:
+        g.trace = start_trace(request.headers)
+
+
+@app.after_request
+def add_profiling_headers(response):
+    trace = g.get('trace')
+    if trace is not None:
+        trace.deactivate()
+        response.headers.update(trace.headers())
+    return response
+
+
+@app.teardown_request
+def stop_profiling(exc):
+    # Si la vista lanzó una excepción no se llamó a after_request
+    trace = g.pop('trace', None)
+    if trace is not None:
+        trace.deactivate()
 
-# Configuración
-MODEL_PATH = os.getenv('MODEL_PATH', 'plant_species.tflite')
-DEFAULT_TARGET_SIZE = (256, 256)  # Puede ajustarse según el modelo
 
-# Cargar el modelo al iniciar la aplicación
-try:
-    load_model(MODEL_PATH)
-    print(f"Modelo cargado exitosamente desde: {MODEL_PATH}")
-except Exception as e:
-    print(f"Error al cargar el modelo: {str(e)}")
-    print("La aplicación puede no funcionar correctamente.")
+def get_top_k_param(data=None):
+    """
+    Lee el parámetro top_k de la solicitud (JSON, formulario o query string).
+
+    Args:
+        data (dict): Cuerpo JSON ya parseado, si lo hay
 
+    Returns:
+        int: Número de clases a retornar (1 si no se especificó)
 
-def predict_class_name(class_idx):
+    Raises:
+        ValueError: Si top_k no es un entero entre 1 y MAX_TOP_K
     """
-    Lee el archivo labels.json y retorna el nombre de la clase dado un índice.
-    labels.json tiene el formato: {"0": ..., "1": ..., ...}
+    value = None
+    if data:
+        value = data.get('top_k')
+    if value is None:
+        value = request.values.get('top_k')
+    return parse_top_k(value)
+
+
+def get_resize_param(data=None):
     """
-    try:
-        # Buscar labels.json en la misma carpeta que app.py
-        labels_path = os.path.join(os.path.dirname(__file__), 'labels.json')
-        with open(labels_path, 'r', encoding='utf-8') as f:
-            labels = json.load(f)
-        clase_nombre = labels[str(class_idx)]
-        return clase_nombre
-    except Exception:
-        return f"Clase {class_idx}"
+    Lee el parámetro resize de la solicitud (JSON, formulario o query string).
+
+    Args:
+        data (dict): Cuerpo JSON ya parseado, si lo hay
+
+    Returns:
+        str: Estrategia de redimensionado (RESIZE_STRATEGY si no se especificó)
+
+    Raises:
+        ValueError: Si no es una estrategia conocida
+    """
+    value = None
+    if data:
+        value = data.get('resize')
+    if value is None:
+        value = request.values.get('resize')
+    return parse_resize(value)
+
+
+def get_model_param(data=None):
+    """
+    Lee el parámetro model de la solicitud (JSON, formulario o query string).
+
+    Args:
+        data (dict): Cuerpo JSON ya parseado, si lo hay
+
+    Returns:
+        str: "nombre" o "nombre:versión", o None para el modelo por defecto
+    """
+    value = None
+    if data:
+        value = data.get('model')
+    if value is None:
+        value = request.values.get('model')
+    return value or None
+
+
+def get_deadline(data=None):
+    """
+    Plazo de la solicitud: cabecera X-Request-Timeout o parámetro timeout
+    (JSON, formulario o query string), en segundos, contado desde su llegada.
+
+    Args:
+        data (dict): Cuerpo JSON ya parseado, si lo hay
+
+    Returns:
+        Deadline: Plazo de la solicitud, o None si no tiene
+
+    Raises:
+        ValueError: Si el plazo no es un número positivo
+    """
+    value = request.headers.get(DEADLINE_HEADER)
+    if value is None and data:
+        value = data.get('timeout')
+    if value is None:
+        value = request.values.get('timeout')
+    return request_deadline(value, g.get('request_start'))
+
+
+def get_json_object():
+    """
+    Cuerpo JSON de la solicitud, que debe ser un objeto.
+
+    Returns:
+        dict: El objeto, o {} si la solicitud no trae un JSON válido
+
+    Raises:
+        ValueError: Si el JSON no es un objeto (ej. una lista)
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("El cuerpo JSON debe ser un objeto.")
+    return data
+
+
+def page_response(page):
+    """Respuesta de una página ya renderizada (ver page_cache.py), o 304 si el cliente la tiene."""
+    status, body, headers = page.respond(request.headers)
+    return Response(body, status, headers)
 
 
 @app.route('/predict', methods=['GET'])
 def predict_page():
     """Página HTML interactiva para realizar predicciones sobre imágenes."""
-    html = """
-    <!DOCTYPE html>
-    <html lang="es">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Reconocimiento de Plantas - Clasificador</title>
-        <style>
-            * {
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }
-            
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }
-            
-            .container {
-                max-width: 800px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 20px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                padding: 40px;
-            }
-            
-            h1 {
-                color: #333;
-                text-align: center;
-                margin-bottom: 10px;
-                font-size: 2em;
-            }
-            
-            .subtitle {
-                text-align: center;
-                color: #666;
-                margin-bottom: 30px;
-            }
-            
-            .upload-section {
-                margin-bottom: 30px;
-            }
-            
-            .button-group {
-                display: flex;
-                gap: 15px;
-                justify-content: center;
-                flex-wrap: wrap;
-                margin-bottom: 20px;
-            }
-            
-            .btn {
-                padding: 15px 30px;
-                border: none;
-                border-radius: 10px;
-                font-size: 16px;
-                font-weight: bold;
-                cursor: pointer;
-                transition: all 0.3s;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
-            
-            .btn-primary {
-                background: #667eea;
-                color: white;
-            }
-            
-            .btn-primary:hover {
-                background: #5568d3;
-                transform: translateY(-2px);
-                box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
-            }
-            
-            .btn-secondary {
-                background: #48bb78;
-                color: white;
-            }
-            
-            .btn-secondary:hover {
-                background: #38a169;
-                transform: translateY(-2px);
-                box-shadow: 0 5px 15px rgba(72, 187, 120, 0.4);
-            }
-            
-            .btn:disabled {
-                opacity: 0.6;
-                cursor: not-allowed;
-                transform: none;
-            }
-            
-            input[type="file"] {
-                display: none;
-            }
-            
-            .preview-section {
-                text-align: center;
-                margin: 30px 0;
-            }
-            
-            .preview-image {
-                max-width: 100%;
-                max-height: 400px;
-                border-radius: 15px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                display: none;
-                margin: 0 auto;
-            }
-            
-            .preview-image.show {
-                display: block;
-            }
-            
-            .camera-preview {
-                max-width: 100%;
-                max-height: 400px;
-                border-radius: 15px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                display: none;
-                margin: 0 auto;
-            }
-            
-            .camera-preview.show {
-                display: block;
-            }
-            
-            .camera-controls {
-                text-align: center;
-                margin-top: 15px;
-                display: none;
-            }
-            
-            .camera-controls.show {
-                display: block;
-            }
-            
-            .result-section {
-                margin-top: 30px;
-                padding: 20px;
-                background: #f7fafc;
-                border-radius: 15px;
-                display: none;
-            }
-            
-            .result-section.show {
-                display: block;
-            }
-            
-            .result-success {
-                background: #f0fff4;
-                border-left: 4px solid #48bb78;
-            }
-            
-            .result-error {
-                background: #fff5f5;
-                border-left: 4px solid #f56565;
-            }
-            
-            .result-title {
-                font-size: 1.5em;
-                font-weight: bold;
-                margin-bottom: 15px;
-                color: #333;
-            }
-            
-            .result-class {
-                font-size: 1.8em;
-                color: #667eea;
-                font-weight: bold;
-                margin: 10px 0;
-            }
-            
-            .result-confidence {
-                font-size: 1.2em;
-                color: #666;
-                margin: 10px 0;
-            }
-            
-            .loading {
-                text-align: center;
-                padding: 20px;
-                display: none;
-            }
-            
-            .loading.show {
-                display: block;
-            }
-            
-            .spinner {
-                border: 4px solid #f3f3f3;
-                border-top: 4px solid #667eea;
-                border-radius: 50%;
-                width: 40px;
-                height: 40px;
-                animation: spin 1s linear infinite;
-                margin: 0 auto;
-            }
-            
-            @keyframes spin {
-                0% { transform: rotate(0deg); }
-                100% { transform: rotate(360deg); }
-            }
-            
-            .error-message {
-                color: #f56565;
-                font-weight: bold;
-            }
-            
-            @media (max-width: 600px) {
-                .container {
-                    padding: 20px;
-                }
-                
-                h1 {
-                    font-size: 1.5em;
-                }
-                
-                .button-group {
-                    flex-direction: column;
-                }
-                
-                .btn {
-                    width: 100%;
-                    justify-content: center;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🌿 Reconocimiento de Plantas</h1>
-            <p class="subtitle">Sube una imagen o usa tu cámara para identificar la especie</p>
-            
-            <div class="upload-section">
-                <div class="button-group">
-                    <button class="btn btn-secondary" onclick="openCamera()">
-                        📷 Usar Cámara
-                    </button>
-                    <button class="btn btn-primary" onclick="document.getElementById('fileInput').click()">
-                        📁 Seleccionar Imagen
-                    </button>
-                    <input type="file" id="fileInput" accept="image/*" onchange="handleFileSelect(event)">
-                </div>
-                
-                <div class="preview-section">
-                    <img id="previewImage" class="preview-image" alt="Preview">
-                    <video id="cameraPreview" class="camera-preview" autoplay playsinline></video>
-                    <div class="camera-controls">
-                        <button class="btn btn-primary" onclick="capturePhoto()">📸 Capturar Foto</button>
-                        <button class="btn btn-secondary" onclick="stopCamera()">❌ Cerrar Cámara</button>
-                    </div>
-                </div>
-                
-                <div class="loading">
-                    <div class="spinner"></div>
-                    <p style="margin-top: 15px; color: #666;">Procesando imagen...</p>
-                </div>
-                
-                <div id="resultSection" class="result-section">
-                    <div id="resultContent"></div>
-                </div>
-            </div>
-        </div>
-        
-        <script>
-            let stream = null;
-            const fileInput = document.getElementById('fileInput');
-            const previewImage = document.getElementById('previewImage');
-            const cameraPreview = document.getElementById('cameraPreview');
-            const cameraControls = document.querySelector('.camera-controls');
-            const resultSection = document.getElementById('resultSection');
-            const resultContent = document.getElementById('resultContent');
-            const loading = document.querySelector('.loading');
-            let capturedBlob = null;
-            
-            function openCamera() {
-                navigator.mediaDevices.getUserMedia({ video: { facingMode: 'environment' } })
-                    .then(mediaStream => {
-                        stream = mediaStream;
-                        cameraPreview.srcObject = stream;
-                        cameraPreview.classList.add('show');
-                        cameraControls.classList.add('show');
-                        previewImage.classList.remove('show');
-                        resultSection.classList.remove('show');
-                    })
-                    .catch(err => {
-                        alert('Error al acceder a la cámara: ' + err.message);
-                    });
-            }
-            
-            function stopCamera() {
-                if (stream) {
-                    stream.getTracks().forEach(track => track.stop());
-                    stream = null;
-                }
-                cameraPreview.classList.remove('show');
-                cameraControls.classList.remove('show');
-            }
-            
-            function capturePhoto() {
-                const canvas = document.createElement('canvas');
-                canvas.width = cameraPreview.videoWidth;
-                canvas.height = cameraPreview.videoHeight;
-                canvas.getContext('2d').drawImage(cameraPreview, 0, 0);
-                
-                canvas.toBlob(blob => {
-                    capturedBlob = blob;
-                    previewImage.src = URL.createObjectURL(blob);
-                    previewImage.classList.add('show');
-                    stopCamera();
-                    uploadImage(blob);
-                }, 'image/jpeg');
-            }
-            
-            function handleFileSelect(event) {
-                const file = event.target.files[0];
-                if (file) {
-                    previewImage.src = URL.createObjectURL(file);
-                    previewImage.classList.add('show');
-                    resultSection.classList.remove('show');
-                    uploadImage(file);
-                }
-            }
-            
-            function uploadImage(imageBlob) {
-                const formData = new FormData();
-                formData.append('image_file', imageBlob, 'image.jpg');
-                
-                loading.classList.add('show');
-                resultSection.classList.remove('show');
-                
-                fetch('/predict', {
-                    method: 'POST',
-                    body: formData
-                })
-                .then(response => response.json())
-                .then(data => {
-                    loading.classList.remove('show');
-                    displayResult(data);
-                })
-                .catch(error => {
-                    loading.classList.remove('show');
-                    displayError('Error al procesar la imagen: ' + error.message);
-                });
-            }
-            
-            function displayResult(data) {
-                resultSection.classList.add('show');
-                
-                if (data.success) {
-                    resultSection.className = 'result-section show result-success';
-                    resultContent.innerHTML = `
-                        <div class="result-title">✅ Resultado de la Predicción</div>
-                        <div class="result-class">${data.class}</div>
-                        <div class="result-confidence">Confianza: ${data.confidence}</div>
-                    `;
-                } else {
-                    resultSection.className = 'result-section show result-error';
-                    resultContent.innerHTML = `
-                        <div class="result-title">❌ Error</div>
-                        <div class="error-message">${data.error || 'Error desconocido'}</div>
-                    `;
-                }
-            }
-            
-            function displayError(message) {
-                resultSection.classList.add('show');
-                resultSection.className = 'result-section show result-error';
-                resultContent.innerHTML = `
-                    <div class="result-title">❌ Error</div>
-                    <div class="error-message">${message}</div>
-                `;
-            }
-        </script>
-    </body>
-    </html>
-    """
-    return html
+    return page_response(cached_predict_page())
+
+
+@app.route('/assets/<name>', methods=['GET'])
+def assets(name):
+    """Hojas de estilo y JavaScript de las páginas, con el hash del contenido en el nombre."""
+    page = static_asset(name)
+    if page is None:
+        abort(404)
+    return page_response(page)
 
 
 @app.route('/predict', methods=['POST'])
@@ -434,63 +249,365 @@ def predict_endpoint():
     
     Acepta:
     - image_file: archivo de imagen (multipart/form-data)
+    - model: nombre o nombre:versión del modelo (opcional)
+    - resize: estrategia de redimensionado (opcional, ver image_utils.resize_image)
+    - timeout: plazo en segundos (opcional, también en X-Request-Timeout)
     
     Returns:
-        JSON con class, confidence y success
+        JSON con class, confidence, model y success
     """
     try:
-        image_array = None
+        source = None
+        data = get_json_object() if request.is_json else None
+        k = get_top_k_param(data)
+        resize = get_resize_param(data)
+        deadline = get_deadline(data)
         
         # Intentar obtener imagen desde archivo
         if 'image_file' in request.files:
             file = request.files['image_file']
             if file.filename != '':
-                image_array = load_image_from_file(file)
+                source = ('file', file)
         
         # Si no hay archivo, intentar obtener desde URL
-        if image_array is None:
+        if source is None:
             if request.is_json:
-                data = request.get_json()
-                image_url = data.get('image_url')
+                image_url = (data or {}).get('image_url')
             else:
                 image_url = request.form.get('image_url')
             
             if image_url:
-                image_array = load_image_from_url(image_url)
+                source = ('url', image_url)
         
         # Validar que se obtuvo una imagen
-        if image_array is None:
+        if source is None:
             return jsonify({
                 'success': False,
                 'error': 'No se proporcionó imagen. Use image_file o image_url.'
             }), 400
         
-        # Preprocesar la imagen
-        processed_image = preprocess_image(image_array, target_size=DEFAULT_TARGET_SIZE)
+        # La solicitud usa la misma versión del modelo de principio a fin,
+        # aunque el modelo por defecto cambie mientras tanto. Cada etapa
+        # comprueba el plazo y abandona el trabajo si ya venció
+        with model_registry.use(get_model_param(data)) as entry:
+            # Leer, buscar en caché y, si no está, decodificar y preprocesar
+            cache_key, processed_image, scores = prepare_image(
+                *source, entry=entry, deadline=deadline, resize=resize
+            )
+
+            if scores is None:
+                # Solo la inferencia ocupa plaza en el control de admisión: si el
+                # servidor está saturado se responde 503 en el acto en lugar de
+                # encolar sin límite. Predicción agrupada en lotes si el
+                # micro-batching está activo
+                with admit_request(deadline):
+                    scores = predict_scores(processed_image, entry, deadline)
+                store_result(cache_key, scores)
+
+            # Retornar resultado
+            return jsonify(format_predictions(scores[np.newaxis], k, entry)[0])
         
-        # Realizar predicción
-        class_idx, confidence = predict(processed_image)
-        confidence = confidence * 100
+    except ImageTooLargeError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+    except UnsupportedImageError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 415
+    except RequestEntityTooLarge:
+        # Cuerpo sin Content-Length que superó MAX_CONTENT_LENGTH al leerlo
+        raise
+    except AdmissionRejectedError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(e.retry_after)}
+    except DeadlineExceededError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    except ValueError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (BatcherQueueFullError, DecodePoolBusyError, PoolTimeoutError) as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except IOError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+
+def _collect_batch_sources(data=None):
+    """
+    Reúne las imágenes de una solicitud a /predict/batch en el orden recibido.
+
+    Args:
+        data (dict): Cuerpo JSON ya parseado, si lo hay
+
+    Returns:
+        list: Tuplas (tipo, origen, nombre visible)
+
+    Raises:
+        ValueError: Si image_urls no es una URL ni una lista
+    """
+    sources = []
+    for field in ('image_files', 'image_file'):
+        for file in request.files.getlist(field):
+            if file.filename != '':
+                sources.append(('file', file, file.filename))
+
+    if request.is_json:
+        image_urls = (data or {}).get('image_urls') or []
+        if isinstance(image_urls, str):
+            image_urls = [image_urls]
+        elif not isinstance(image_urls, list):
+            raise ValueError("image_urls debe ser una lista de URLs.")
+    else:
+        image_urls = request.form.getlist('image_urls')
+    for url in image_urls:
+        if url:
+            sources.append(('url', url, url))
+    return sources
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch_endpoint():
+    """
+    Endpoint POST para clasificar varias imágenes en una sola solicitud.
+    
+    Acepta:
+    - image_files: uno o más archivos de imagen (multipart/form-data)
+    - image_urls: lista de URLs (JSON) o campo repetido (formulario)
+    - model: nombre o nombre:versión del modelo (opcional)
+    - resize: estrategia de redimensionado de todas las imágenes (opcional)
+    - timeout: plazo en segundos de toda la solicitud (opcional, también en
+      X-Request-Timeout)
+    
+    Las imágenes se cargan y preprocesan en paralelo y se ejecutan en lotes
+    reales sobre el modelo. Un error en una imagen no afecta a las demás;
+    un rechazo del control de admisión (503) o el plazo vencido (504)
+    afectan a toda la solicitud.
+    
+    Returns:
+        JSON con success, count y results (uno por imagen, en el orden recibido)
+    """
+    try:
+        data = get_json_object() if request.is_json else None
+        k = get_top_k_param(data)
+        resize = get_resize_param(data)
+        deadline = get_deadline(data)
+        sources = _collect_batch_sources(data)
+        if not sources:
+            return jsonify({
+                'success': False,
+                'error': 'No se proporcionaron imágenes. Use image_files o image_urls.'
+            }), 400
+        if len(sources) > BATCH_ENDPOINT_MAX_ITEMS:
+            return jsonify({
+                'success': False,
+                'error': f'Demasiadas imágenes: máximo {BATCH_ENDPOINT_MAX_ITEMS} por solicitud.'
+            }), 413
+
+        results = [{'index': i, 'source': name} for i, (_, _, name) in enumerate(sources)]
+        with model_registry.use(get_model_param(data)) as entry:
+            futures = [
+                preprocess_executor.submit(
+                    bind(prepare_image), kind, source, True, entry, deadline, resize
+                )
+                for kind, source, _ in sources
+            ]
+
+            # Recoger imágenes preprocesadas; los aciertos de caché se responden
+            # directamente y los errores quedan en su propio resultado
+            ready = []
+            for i, future in enumerate(futures):
+                try:
+                    cache_key, processed_image, scores = future.result()
+                    if scores is not None:
+                        results[i].update(format_predictions(scores[np.newaxis], k, entry)[0])
+                    else:
+                        ready.append((i, cache_key, processed_image))
+                except DeadlineExceededError:
+                    # El plazo es de toda la solicitud: las demás imágenes
+                    # también lo verán vencido
+                    raise
+                except (ValueError, IOError) as e:
+                    observe_error(request_endpoint(), e)
+                    results[i].update({'success': False, 'error': str(e)})
+                except Exception as e:
+                    observe_error(request_endpoint(), e)
+                    results[i].update({'success': False, 'error': f'Error interno del servidor: {str(e)}'})
 
-        class_name = predict_class_name(class_idx)
+            # Ejecutar el modelo en lotes reales. Cada lote ocupa una plaza del
+            # control de admisión, como una solicitud a /predict, para que
+            # una sola solicitud no lo eluda con decenas de imágenes. Los lotes
+            # ya clasificados quedan en la caché si uno posterior se rechaza
+            for start in range(0, len(ready), BATCH_ENDPOINT_CHUNK_SIZE):
+                chunk = ready[start:start + BATCH_ENDPOINT_CHUNK_SIZE]
+                with admit_request(deadline, sample=False):
+                    scores = predict_images([image for _, _, image in chunk], entry, deadline)
+                for (i, cache_key, _), row in zip(chunk, scores):
+                    store_result(cache_key, row)
+                for (i, _, _), prediction in zip(chunk, format_predictions(scores, k, entry)):
+                    results[i].update(prediction)
 
-        # Retornar resultado
         return jsonify({
             'success': True,
-            'class': class_name,
-            'confidence': f"{confidence:.3f}%"
+            'count': len(results),
+            'results': results
         })
-        
+
+    except RequestEntityTooLarge:
+        raise
+    except AdmissionRejectedError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503, {'Retry-After': str(e.retry_after)}
+    except DeadlineExceededError as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
     except ValueError as e:
+        observe_error(request_endpoint(), e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 400
-    except IOError as e:
+    except PoolTimeoutError as e:
+        observe_error(request_endpoint(), e)
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 400
+        }), 503
+    except Exception as e:
+        observe_error(request_endpoint(), e)
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Contadores de aciertos y fallos de la caché de resultados y del índice de casi duplicados."""
+    stats = {'enabled': False}
+    if result_cache is not None:
+        stats = {'enabled': True, **result_cache.stats()}
+    if near_duplicates is not None:
+        stats['near_duplicates'] = near_duplicates.stats()
+    return jsonify(stats)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas de todos los workers en formato de texto de Prometheus."""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """Modelos cargados, versión activa de cada uno, modelo por defecto y cargas en curso."""
+    model_registry.maybe_reload()
+    return jsonify(model_registry.describe())
+
+
+def admin_forbidden():
+    """Respuesta de una solicitud de administración sin token válido."""
+    return jsonify({
+        'success': False,
+        'error': 'Token de administración inválido o ADMIN_TOKEN no definido.'
+    }), 403
+
+
+@app.route('/admin/models', methods=['POST'])
+def admin_models_load():
+    """
+    Carga una versión de un modelo en segundo plano y la publica al terminar.
+
+    Acepta (JSON): name, version, model_path, labels_path, activate, default,
+    keep_previous. Ver prediction.admin_load_model.
+
+    Returns:
+        JSON con success y model (nombre:versión); 202 mientras se carga
+    """
+    if not admin_authorized(request.headers):
+        return admin_forbidden()
+    try:
+        key = admin_load_model(get_json_object())
+        return jsonify({'success': True, 'model': key, 'status': 'loading'}), 202
+    except AdminConflictError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except (ValueError, IOError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+
+@app.route('/admin/models/default', methods=['PUT'])
+def admin_models_default():
+    """
+    Cambia de forma atómica el modelo por defecto.
+
+    Acepta (JSON): model, como "nombre" o "nombre:versión" (también activa esa versión)
+    """
+    if not admin_authorized(request.headers):
+        return admin_forbidden()
+    try:
+        admin_set_default(get_json_object().get('model'))
+        return jsonify({'success': True, 'default': model_registry.describe()['default']})
+    except AdminConflictError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except (ValueError, IOError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error interno del servidor: {str(e)}'
+        }), 500
+
+
+@app.route('/admin/models/<name>/<version>', methods=['DELETE'])
+def admin_models_unload(name, version):
+    """Retira una versión que no esté activa; se libera al terminar sus solicitudes."""
+    if not admin_authorized(request.headers):
+        return admin_forbidden()
+    try:
+        admin_unload(f'{name}:{version}')
+        return jsonify({'success': True})
+    except AdminConflictError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except (ValueError, IOError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -502,152 +619,18 @@ def predict_endpoint():
 @app.route('/home', methods=['GET'])
 def home():
     """Endpoint de validación visible desde el navegador."""
-    model_loaded = is_model_loaded()
-    model_status = "Cargado" if model_loaded else "No cargado"
-    
-    model_info = get_model_info()
-    if model_info:
-        model_path = model_info['model_path']
-        input_shape = model_info['input_shape']
-        if input_shape:
-            input_size_display = f"{input_shape[1]}x{input_shape[0]}" if len(input_shape) >= 2 else "N/A"
-        else:
-            input_size_display = f"{DEFAULT_TARGET_SIZE[0]}x{DEFAULT_TARGET_SIZE[1]}"
-    else:
-        model_path = MODEL_PATH
-        input_size_display = f"{DEFAULT_TARGET_SIZE[0]}x{DEFAULT_TARGET_SIZE[1]}"
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="es">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>API de Reconocimiento de Imágenes - Estado</title>
-        <style>
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                margin: 0;
-                padding: 0;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                min-height: 100vh;
-            }}
-            .container {{
-                background: white;
-                border-radius: 20px;
-                padding: 40px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                max-width: 600px;
-                width: 90%;
-            }}
-            h1 {{
-                color: #333;
-                text-align: center;
-                margin-bottom: 10px;
-            }}
-            .status {{
-                text-align: center;
-                margin: 30px 0;
-            }}
-            .status-badge {{
-                display: inline-block;
-                padding: 10px 30px;
-                border-radius: 25px;
-                font-size: 18px;
-                font-weight: bold;
-                color: white;
-                background: #4CAF50;
-                box-shadow: 0 4px 15px rgba(76, 175, 80, 0.4);
-            }}
-            .info {{
-                background: #f5f5f5;
-                border-radius: 10px;
-                padding: 20px;
-                margin-top: 20px;
-            }}
-            .info-item {{
-                margin: 15px 0;
-                padding: 10px;
-                border-left: 4px solid #667eea;
-                background: white;
-                border-radius: 5px;
-            }}
-            .info-label {{
-                font-weight: bold;
-                color: #555;
-                margin-bottom: 5px;
-            }}
-            .info-value {{
-                color: #333;
-                font-family: 'Courier New', monospace;
-            }}
-            .endpoints {{
-                margin-top: 30px;
-                padding-top: 20px;
-                border-top: 2px solid #eee;
-            }}
-            .endpoint {{
-                background: #e3f2fd;
-                padding: 15px;
-                margin: 10px 0;
-                border-radius: 8px;
-                border-left: 4px solid #2196F3;
-            }}
-            .endpoint-method {{
-                display: inline-block;
-                background: #2196F3;
-                color: white;
-                padding: 4px 12px;
-                border-radius: 4px;
-                font-size: 12px;
-                font-weight: bold;
-                margin-right: 10px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🌿 API de Reconocimiento de Plantas</h1>
-            <div class="status">
-                <div class="status-badge">✓ API ACTIVA</div>
-            </div>
-            <div class="info">
-                <div class="info-item">
-                    <div class="info-label">Estado del Modelo:</div>
-                    <div class="info-value">{model_status}</div>
-                </div>
-                <div class="info-item">
-                    <div class="info-label">Ruta del Modelo:</div>
-                    <div class="info-value">{model_path}</div>
-                </div>
-                <div class="info-item">
-                    <div class="info-label">Tamaño de Entrada:</div>
-                    <div class="info-value">{input_size_display} píxeles</div>
-                </div>
-            </div>
-            <div class="endpoints">
-                <h3 style="color: #333; margin-top: 0;">Endpoints Disponibles:</h3>
-                <div class="endpoint">
-                    <span class="endpoint-method">GET</span>
-                    <strong>/home</strong> - Página de estado (esta página)
-                </div>
-                <div class="endpoint">
-                    <span class="endpoint-method">GET</span>
-                    <strong>/predict</strong> - Página de predicción (HTML)
-                </div>
-                <div class="endpoint">
-                    <span class="endpoint-method" style="background: #4CAF50;">POST</span>
-                    <strong>/predict</strong> - Predicción de imágenes (tflite)
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    return html
+    default_entry = model_registry.default_entry()
+    # Renderizada una vez por estado de los modelos: el balanceador la consulta continuamente
+    return page_response(cached_home_page(
+        default_entry.info() if default_entry else None, MODEL_PATH, DEFAULT_TARGET_SIZE,
+        models=model_registry.describe()['models'], routes=SERVED_ROUTES,
+    ))
+
+
+# Pares (método, ruta) de esta aplicación: /home solo lista los que existen
+SERVED_ROUTES = frozenset(
+    (method, rule.rule) for rule in app.url_map.iter_rules() for method in rule.methods
+)
 
 
 if __name__ == '__main__':
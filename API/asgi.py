@@ -0,0 +1,451 @@
+"""
+Modo de servicio ASGI (asyncio) de la API de reconocimiento de imágenes.
+
+Expone las mismas rutas que app.py (GET/POST /predict, /metrics, /models,
+/admin/models, /assets, / y /home) sobre Starlette. La descarga de image_url se hace con I/O no bloqueante, de modo que
+una descarga lenta no ocupa un hilo; la decodificación/preprocesamiento y la
+inferencia se delegan a executors acotados.
+
+Ejecución:
+    uvicorn API.asgi:app --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from .admission import AdmissionRejectedError
+from .batching import BatcherQueueFullError
+from .deadlines import DEADLINE_HEADER, DeadlineExceededError, wait_timeout
+from .decode_pool import DecodePoolBusyError
+from .image_fetcher import AsyncImageFetcher
+from .interpreter_pool import PoolTimeoutError
+from .metrics import (
+    CONTENT_TYPE, IMAGE_REJECTIONS, REGISTRY, observe_error, observe_request, stage_timer
+)
+from .pages import cached_home_page, cached_predict_page, static_asset
+from .profiling import bind, start_trace
+from .prediction import (
+    DEFAULT_TARGET_SIZE, IMAGE_FETCH_CONNECT_TIMEOUT, IMAGE_FETCH_MAX_BYTES,
+    IMAGE_FETCH_READ_TIMEOUT, MAX_UPLOAD_BYTES, MODEL_PATH, AdminConflictError, admin_authorized,
+    admin_load_model, admin_set_default, admin_unload, admit_request_async, format_predictions,
+    model_registry, parse_resize, parse_top_k, predict_scores, prepare_content,
+    preprocess_executor, request_deadline, store_result
+)
+from .upload_limits import FORM_OVERHEAD_BYTES, ImageTooLargeError, UnsupportedImageError
+
+# Descargas simultáneas máximas por proceso
+ASYNC_FETCH_MAX_CONNECTIONS = int(os.getenv('ASYNC_FETCH_MAX_CONNECTIONS', '100'))
+# Hilos que esperan al pool de intérpretes cuando no hay micro-batching
+_default_entry = model_registry.default_entry()
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0')) or (
+    _default_entry.loader.pool_size if _default_entry else 1
+)
+
+inference_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS, thread_name_prefix='inference'
+)
+fetcher = None
+# Tamaño máximo del cuerpo de POST /predict
+PREDICT_MAX_BODY_BYTES = MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Crea el cliente HTTP asíncrono al arrancar y lo cierra al terminar."""
+    global fetcher
+    fetcher = AsyncImageFetcher(
+        max_bytes=IMAGE_FETCH_MAX_BYTES,
+        connect_timeout=IMAGE_FETCH_CONNECT_TIMEOUT,
+        read_timeout=IMAGE_FETCH_READ_TIMEOUT,
+        max_connections=ASYNC_FETCH_MAX_CONNECTIONS,
+    )
+    try:
+        yield
+    finally:
+        await fetcher.aclose()
+
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI que registra la duración y el código de cada solicitud HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            endpoint = route.path if route is not None else 'unmatched'
+            observe_request(endpoint, status, time.perf_counter() - start)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Middleware ASGI que limita el tamaño del cuerpo de las rutas indicadas.
+
+    Un Content-Length excesivo se responde con 413 sin leer el cuerpo; sin
+    Content-Length (chunked) se cuentan los bytes recibidos y al superar el
+    tope se lanza ImageTooLargeError desde receive(), que el endpoint
+    traduce a 413.
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope['path']) if scope['type'] == 'http' else None
+        if max_bytes is None or scope['method'] != 'POST':
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope['headers']).get(b'content-length', b'')
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            IMAGE_REJECTIONS.inc(reason='bytes')
+            response = error_response(
+                f'La solicitud excede el tamaño máximo de {max_bytes} bytes.', 413
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > max_bytes:
+                    IMAGE_REJECTIONS.inc(reason='bytes')
+                    raise ImageTooLargeError(
+                        f'La solicitud excede el tamaño máximo de {max_bytes} bytes.', 'bytes'
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def error_response(message, status_code, headers=None):
+    """Respuesta JSON de error con el mismo formato que app.py."""
+    return JSONResponse({'success': False, 'error': message}, status_code=status_code,
+                        headers=headers)
+
+
+def page_response(request, page):
+    """Respuesta de una página ya renderizada (ver page_cache.py), o 304 si el cliente la tiene."""
+    status, body, headers = page.respond(request.headers)
+    return Response(body, status_code=status, headers=headers)
+
+
+async def predict_page(request):
+    """Página HTML interactiva para realizar predicciones sobre imágenes."""
+    return page_response(request, cached_predict_page())
+
+
+async def assets(request):
+    """Hojas de estilo y JavaScript de las páginas, con el hash del contenido en el nombre."""
+    page = static_asset(request.path_params['name'])
+    if page is None:
+        raise HTTPException(404)
+    return page_response(request, page)
+
+
+async def read_request_image(request):
+    """
+    Extrae la imagen, top_k, el modelo, la estrategia de redimensionado y el
+    plazo de una solicitud a POST /predict.
+
+    Returns:
+        tuple: (bytes subidos o None, image_url o None, top_k, modelo o None,
+            estrategia de redimensionado, plazo pedido en segundos o None)
+    """
+    content = None
+    image_url = None
+    top_k_value = None
+    model_ref = None
+    resize = None
+    timeout = request.headers.get(DEADLINE_HEADER)
+    if request.headers.get('content-type', '').startswith('application/json'):
+        data = await read_json_body(request)
+        image_url = data.get('image_url')
+        top_k_value = data.get('top_k')
+        model_ref = data.get('model')
+        resize = data.get('resize')
+        if timeout is None:
+            timeout = data.get('timeout')
+    else:
+        form = await request.form()
+        upload = form.get('image_file')
+        if upload is not None and getattr(upload, 'filename', ''):
+            content = await upload.read()
+        else:
+            image_url = form.get('image_url')
+        top_k_value = form.get('top_k')
+        model_ref = form.get('model')
+        resize = form.get('resize')
+        if timeout is None:
+            timeout = form.get('timeout')
+    if top_k_value is None:
+        top_k_value = request.query_params.get('top_k')
+    if model_ref is None:
+        model_ref = request.query_params.get('model')
+    if resize is None:
+        resize = request.query_params.get('resize')
+    if timeout is None:
+        timeout = request.query_params.get('timeout')
+    return (
+        content, image_url, parse_top_k(top_k_value), model_ref or None, parse_resize(resize),
+        timeout,
+    )
+
+
+def profiled(endpoint):
+    """
+    Perfila bajo demanda las solicitudes a `endpoint` (ver profiling.py).
+
+    Solo tiempos por etapa: cProfile no se usa en este modo porque el event
+    loop intercala en el mismo hilo otras solicitudes que contaminarían el perfil.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(request):
+        trace = start_trace(request.headers, use_cprofile=False)
+        if trace is None:
+            return await endpoint(request)
+        try:
+            response = await endpoint(request)
+        finally:
+            trace.deactivate()
+        response.headers.update(trace.headers())
+        return response
+    return wrapper
+
+
+async def wait_batch_result(future, deadline):
+    """
+    Espera el resultado del micro-batcher sin ocupar un hilo, como mucho
+    hasta el plazo de la solicitud.
+
+    Raises:
+        DeadlineExceededError: Si el plazo vence antes de que empiece su lote
+    """
+    waiter = asyncio.wrap_future(future)
+    done, _ = await asyncio.wait({waiter}, timeout=wait_timeout(deadline))
+    # Si el lote ya empezó, el resultado está por llegar; si no, la imagen
+    # se retira de la cola
+    if not done and future.cancel():
+        raise deadline.exceeded('batch_queue_wait')
+    return await waiter
+
+
+@profiled
+async def predict_endpoint(request):
+    """
+    Endpoint POST para procesar imágenes y realizar predicciones.
+
+    Acepta:
+    - image_file: archivo de imagen (multipart/form-data)
+    - image_url: URL de la imagen (JSON o formulario)
+    - model: nombre o nombre:versión del modelo (opcional)
+    - resize: estrategia de redimensionado (opcional, ver image_utils.resize_image)
+    - timeout: plazo en segundos (opcional, también en X-Request-Timeout)
+
+    Returns:
+        JSON con class, confidence, model y success
+    """
+    start = time.perf_counter()
+    try:
+        content, image_url, k, model_ref, resize, timeout = await read_request_image(request)
+        # Cada etapa comprueba el plazo y abandona el trabajo si ya venció
+        deadline = request_deadline(timeout, start)
+
+        # Descarga no bloqueante: el event loop atiende otras solicitudes mientras tanto
+        if content is None and image_url:
+            with stage_timer('fetch'):
+                content = await fetcher.fetch(image_url, deadline)
+
+        if content is None:
+            return error_response('No se proporcionó imagen. Use image_file o image_url.', 400)
+
+        loop = asyncio.get_running_loop()
+        # La solicitud usa la misma versión del modelo de principio a fin
+        with model_registry.use(model_ref) as entry:
+            cache_key, processed_image, scores = await loop.run_in_executor(
+                preprocess_executor, bind(prepare_content), content, False, entry, deadline,
+                resize,
+            )
+
+            if scores is None:
+                # Solo la inferencia ocupa plaza en el control de admisión: con
+                # el servidor saturado, 503 en el acto (la espera en la cola no
+                # bloquea el event loop)
+                async with admit_request_async(deadline):
+                    batcher = entry.get_batcher()
+                    if batcher is not None:
+                        # El future del micro-batcher se espera sin ocupar un hilo
+                        scores = await wait_batch_result(
+                            batcher.submit(processed_image, deadline), deadline
+                        )
+                    else:
+                        scores = await loop.run_in_executor(
+                            inference_executor, bind(predict_scores), processed_image, entry,
+                            deadline
+                        )
+                preprocess_executor.submit(store_result, cache_key, scores)
+
+            return JSONResponse(format_predictions(scores[np.newaxis], k, entry)[0])
+
+    except AdmissionRejectedError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 503, {'Retry-After': str(e.retry_after)})
+    except DeadlineExceededError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 504)
+    except ImageTooLargeError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 413)
+    except UnsupportedImageError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 415)
+    except ValueError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 400)
+    except (BatcherQueueFullError, DecodePoolBusyError, PoolTimeoutError) as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 503)
+    except IOError as e:
+        observe_error('/predict', e)
+        return error_response(str(e), 400)
+    except Exception as e:
+        observe_error('/predict', e)
+        return error_response(f'Error interno del servidor: {str(e)}', 500)
+
+
+async def metrics(request):
+    """Métricas de todos los workers en formato de texto de Prometheus."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+async def list_models(request):
+    """Modelos cargados, versión activa de cada uno, modelo por defecto y cargas en curso."""
+    model_registry.maybe_reload()
+    return JSONResponse(model_registry.describe())
+
+
+def admin_endpoint(action):
+    """
+    Endpoint de administración: comprueba X-Admin-Token y traduce los errores
+    de `action(request)` (una corrutina que retorna la respuesta) al formato JSON.
+    """
+    @functools.wraps(action)
+    async def wrapper(request):
+        if not admin_authorized(request.headers):
+            return error_response('Token de administración inválido o ADMIN_TOKEN no definido.', 403)
+        try:
+            return await action(request)
+        except AdminConflictError as e:
+            return error_response(str(e), 409)
+        except (ValueError, IOError) as e:
+            return error_response(str(e), 400)
+        except Exception as e:
+            return error_response(f'Error interno del servidor: {str(e)}', 500)
+    return wrapper
+
+
+async def read_json_body(request):
+    """
+    Cuerpo JSON de la solicitud, que debe ser un objeto.
+
+    Returns:
+        dict: El objeto, o {} si la solicitud no trae un JSON válido
+
+    Raises:
+        ValueError: Si el JSON no es un objeto (ej. una lista)
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("El cuerpo JSON debe ser un objeto.")
+    return data
+
+
+@admin_endpoint
+async def admin_models_load(request):
+    """Carga una versión de un modelo en segundo plano (ver prediction.admin_load_model)."""
+    key = admin_load_model(await read_json_body(request))
+    return JSONResponse({'success': True, 'model': key, 'status': 'loading'}, status_code=202)
+
+
+@admin_endpoint
+async def admin_models_default(request):
+    """Cambia de forma atómica el modelo por defecto."""
+    admin_set_default((await read_json_body(request)).get('model'))
+    return JSONResponse({'success': True, 'default': model_registry.describe()['default']})
+
+
+@admin_endpoint
+async def admin_models_unload(request):
+    """Retira una versión que no esté activa; se libera al terminar sus solicitudes."""
+    admin_unload(f"{request.path_params['name']}:{request.path_params['version']}")
+    return JSONResponse({'success': True})
+
+
+async def home(request):
+    """Endpoint de validación visible desde el navegador."""
+    default_entry = model_registry.default_entry()
+    return page_response(request, cached_home_page(
+        default_entry.info() if default_entry else None, MODEL_PATH, DEFAULT_TARGET_SIZE,
+        models=model_registry.describe()['models'], routes=SERVED_ROUTES,
+    ))
+
+
+app = Starlette(
+    routes=[
+        Route('/predict', predict_page, methods=['GET']),
+        Route('/assets/{name}', assets, methods=['GET']),
+        Route('/predict', predict_endpoint, methods=['POST']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/models', list_models, methods=['GET']),
+        Route('/admin/models', admin_models_load, methods=['POST']),
+        Route('/admin/models/default', admin_models_default, methods=['PUT']),
+        Route('/admin/models/{name}/{version}', admin_models_unload, methods=['DELETE']),
+        Route('/', home, methods=['GET']),
+        Route('/home', home, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(BodySizeLimitMiddleware, limits={'/predict': PREDICT_MAX_BODY_BYTES}),
+    ],
+    lifespan=lifespan,
+)
+
+# Pares (método, ruta) de esta aplicación: /home solo lista los que existen
+SERVED_ROUTES = frozenset(
+    (method, route.path)
+    for route in app.routes for method in getattr(route, 'methods', None) or ()
+)
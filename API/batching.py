@@ -0,0 +1,200 @@
+"""
+Planificador de micro-batching delante de ModelLoader.predict_batch.
+
+Agrupa las imágenes que llegan dentro de una ventana de tiempo configurable
+y las ejecuta en una sola invocación del intérprete, devolviendo a cada
+solicitante la fila de resultados que le corresponde.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from .metrics import observe_stage
+from .model_loader import top_prediction
+from .profiling import activate_group, current_trace, deactivate_group
+
+
+class BatcherClosedError(RuntimeError):
+    """Se lanza al enviar trabajo a un MicroBatcher detenido."""
+
+
+class BatcherQueueFullError(RuntimeError):
+    """Se lanza cuando la cola de espera del MicroBatcher está llena."""
+
+
+class MicroBatcher:
+    """Agrupa predicciones concurrentes en lotes para una única invocación."""
+
+    def __init__(self, predict_batch_fn, max_batch_size=8, max_wait_ms=5.0,
+                 max_queue_size=1024, num_workers=1):
+        """
+        Inicializa el planificador y arranca sus hilos de trabajo.
+
+        Args:
+            predict_batch_fn (callable): Función que recibe una lista de N imágenes (H, W, C)
+                y retorna un array (N, num_clases)
+            max_batch_size (int): Número máximo de imágenes por lote
+            max_wait_ms (float): Tiempo máximo que espera el primer elemento
+                de un lote a que lleguen más solicitudes
+            max_queue_size (int): Número máximo de imágenes en espera
+            num_workers (int): Hilos que forman y ejecutan lotes en paralelo
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size debe ser al menos 1")
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._workers = []
+        for i in range(max(1, num_workers)):
+            worker = threading.Thread(
+                target=self._run, name=f"micro-batcher-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, image_array, deadline=None):
+        """
+        Encola una imagen preprocesada para la próxima invocación por lotes.
+
+        Args:
+            image_array (np.ndarray): Imagen preprocesada (H, W, C)
+            deadline (Deadline): Plazo de la solicitud; si vence antes de que
+                empiece su lote, la imagen se descarta sin invocar al intérprete
+
+        Returns:
+            concurrent.futures.Future: Se resuelve con la fila (num_clases,) de salida
+        """
+        if self._closed:
+            raise BatcherClosedError("El planificador de lotes está detenido.")
+        future = Future()
+        # Para medir la espera en cola hasta que el lote empieza a ejecutarse
+        future.enqueued_at = time.perf_counter()
+        # Traza de perfilado de la solicitud, que se ejecuta en otro hilo
+        future.trace = current_trace()
+        future.deadline = deadline
+        try:
+            self._queue.put_nowait((image_array, future))
+        except queue.Full:
+            raise BatcherQueueFullError("Cola de inferencia llena, intente más tarde.")
+        return future
+
+    def predict_scores(self, image_array, timeout=None, deadline=None):
+        """
+        Ejecuta una imagen a través del planificador y espera su resultado.
+
+        Args:
+            image_array (np.ndarray): Imagen preprocesada (H, W, C)
+            timeout (float): Segundos máximos de espera, None para esperar siempre
+            deadline (Deadline): Plazo de la solicitud (ver submit)
+
+        Returns:
+            np.ndarray: Probabilidades por clase de la imagen
+
+        Raises:
+            DeadlineExceededError: Si el plazo vence antes de que empiece su lote
+        """
+        future = self.submit(image_array, deadline)
+        if deadline is None:
+            return future.result(timeout=timeout)
+        try:
+            return future.result(timeout=deadline.wait_timeout(timeout))
+        except FutureTimeoutError:
+            # Si el lote ya empezó, el resultado está por llegar; si no, la
+            # imagen se retira de la cola
+            if not future.cancel():
+                return future.result()
+            deadline.check('batch_queue_wait')
+            raise
+
+    def predict(self, image_array, timeout=None):
+        """
+        Equivalente a model_loader.predict pero a través del planificador.
+
+        Returns:
+            tuple: (clase_predicha, confianza)
+        """
+        return top_prediction(self.predict_scores(image_array, timeout=timeout))
+
+    def close(self):
+        """Detiene los hilos de trabajo después de vaciar la cola."""
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put((None, None))
+        for worker in self._workers:
+            worker.join()
+
+    def _collect_batch(self):
+        """
+        Bloquea hasta tener un primer elemento y luego agrupa los que lleguen
+        antes de que venza la ventana de espera o se llene el lote.
+
+        Returns:
+            list: Pares (imagen, future); vacío si se recibió la señal de cierre
+        """
+        image_array, future = self._queue.get()
+        if future is None:
+            return []
+        batch = [(image_array, future)]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[1] is None:
+                # Devolver la señal de cierre para procesarla tras este lote
+                self._queue.put(item)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Bucle principal de cada hilo de trabajo."""
+        while True:
+            batch = self._collect_batch()
+            if not batch:
+                return
+            self._run_batch(batch)
+            # Soltar las imágenes antes de esperar el siguiente lote: pueden
+            # ocupar ranuras de memoria compartida (ver decode_pool.py)
+            del batch
+
+    def _run_batch(self, batch):
+        """Ejecuta un lote y entrega el resultado (o la excepción) a cada future."""
+        # Descartar solicitudes cuyo cliente ya canceló la espera o cuyo
+        # plazo venció en la cola
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        live = []
+        for item in batch:
+            deadline = item[1].deadline
+            if deadline is not None and deadline.expired():
+                item[1].set_exception(deadline.exceeded('batch_queue_wait'))
+            else:
+                live.append(item)
+        batch = live
+        if not batch:
+            return
+        started = time.perf_counter()
+        for _, future in batch:
+            observe_stage('batch_queue_wait', started - future.enqueued_at)
+            if future.trace is not None:
+                future.trace.add('batch_queue_wait', started - future.enqueued_at)
+        token = activate_group([future.trace for _, future in batch])
+        try:
+            outputs = self.predict_batch_fn([image for image, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            deactivate_group(token)
+        for row, (_, future) in zip(outputs, batch):
+            future.set_result(row)
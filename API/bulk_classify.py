@@ -0,0 +1,439 @@
+"""
+Clasificación masiva sin conexión de archivos de imágenes.
+
+Recorre un directorio, un archivo tar (también comprimido) o una lista de
+URLs (un archivo de texto, una por línea) y escribe un resultado JSONL por
+imagen, en el mismo orden del origen. Las etapas se solapan en un pipeline
+acotado:
+
+    lectura     un hilo recorre el origen (y lee los miembros del tar)
+    carga       --workers hilos leen/descargan y decodifican cada imagen
+                (o --decode-processes procesos, ver decode_pool.py)
+    inferencia  el hilo principal agrupa las imágenes en lotes de
+                --batch-size y las ejecuta con ModelLoader.predict_batch
+
+Entre etapas hay como máximo --prefetch imágenes en vuelo, de modo que la
+memoria no crece con el tamaño del archivo.
+
+Cada --checkpoint-interval segundos se sincroniza la salida y se guarda en
+<salida>.checkpoint cuántas imágenes se completaron y el tamaño de la
+salida en ese momento. Una ejecución posterior con la misma salida retoma
+desde ahí: descarta lo escrito después del checkpoint y salta las imágenes
+ya clasificadas.
+
+Uso:
+    python -m API.bulk_classify /datos/herbario --output herbario.jsonl
+    python -m API.bulk_classify fotos.tar.gz --output fotos.jsonl --top-k 3
+    python -m API.bulk_classify urls.txt --output urls.jsonl --workers 32
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .decode_pool import DecodePool
+from .image_utils import (
+    DEFAULT_RESIZE_STRATEGY, RESIZE_STRATEGIES, fetch_image_bytes, load_image_from_bytes,
+    resize_image
+)
+from .label_registry import LabelRegistry
+from .model_loader import ModelLoader, top_k
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+DEFAULT_LABELS_PATH = os.path.join(os.path.dirname(__file__), 'labels.json')
+# Marca de fin del origen en la cola del pipeline
+_END = object()
+
+
+def _is_image_name(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def iter_directory(root):
+    """
+    Recorre un directorio en orden determinista.
+
+    Yields:
+        tuple: (ruta relativa, función que retorna los bytes)
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if _is_image_name(name):
+                path = os.path.join(dirpath, name)
+                yield os.path.relpath(path, root), partial(_read_file, path)
+
+
+def iter_tar(path):
+    """
+    Recorre un archivo tar en modo streaming (sin acceso aleatorio).
+
+    Los bytes de cada miembro se leen aquí, en el hilo de lectura, porque el
+    tar solo puede leerse en orden.
+
+    Yields:
+        tuple: (nombre del miembro, función que retorna los bytes)
+    """
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if member.isfile() and _is_image_name(member.name):
+                content = archive.extractfile(member).read()
+                yield member.name, partial(bytes, content)
+
+
+def iter_url_list(path):
+    """
+    Recorre un archivo de texto con una URL por línea (se ignoran las líneas
+    vacías y las que empiezan por #).
+
+    Yields:
+        tuple: (URL, función que descarga los bytes)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                yield url, partial(fetch_image_bytes, url)
+
+
+def open_source(path, kind='auto'):
+    """
+    Abre un origen de imágenes.
+
+    Args:
+        path (str): Directorio, archivo tar o lista de URLs
+        kind (str): 'auto', 'dir', 'tar' o 'urls'
+
+    Returns:
+        iterator: Pares (identificador, función que retorna los bytes)
+
+    Raises:
+        ValueError: Si el origen no existe o no se reconoce
+    """
+    if kind == 'auto':
+        if os.path.isdir(path):
+            kind = 'dir'
+        elif os.path.isfile(path):
+            kind = 'tar' if tarfile.is_tarfile(path) else 'urls'
+        else:
+            raise ValueError(f"No existe el origen: {path}")
+    if kind == 'dir':
+        return iter_directory(path)
+    if kind == 'tar':
+        return iter_tar(path)
+    if kind == 'urls':
+        return iter_url_list(path)
+    raise ValueError(f"Tipo de origen desconocido: {kind}")
+
+
+def load_checkpoint(output_path, source):
+    """
+    Lee el checkpoint de una ejecución anterior y recorta la salida al
+    último punto consistente.
+
+    Args:
+        output_path (str): Archivo JSONL de resultados
+        source (str): Origen de la ejecución actual
+
+    Returns:
+        int: Imágenes del origen ya clasificadas (0 si no hay checkpoint)
+
+    Raises:
+        ValueError: Si el checkpoint pertenece a otro origen
+    """
+    checkpoint_path = f'{output_path}.checkpoint'
+    if not os.path.exists(checkpoint_path):
+        # Sin checkpoint, lo que hubiera en la salida no es reanudable
+        open(output_path, 'wb').close()
+        return 0
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint['source'] != os.path.abspath(source):
+        raise ValueError(
+            f"El checkpoint {checkpoint_path} corresponde a otro origen ({checkpoint['source']})."
+        )
+    with open(output_path, 'ab') as f:
+        f.truncate(checkpoint['output_bytes'])
+    return checkpoint['done']
+
+
+def save_checkpoint(output_path, source, done, output_bytes):
+    """Guarda el checkpoint de forma atómica."""
+    checkpoint_path = f'{output_path}.checkpoint'
+    tmp_path = f'{checkpoint_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(source), 'done': done,
+                   'output_bytes': output_bytes}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+class Progress:
+    """Reporte periódico de avance e imágenes por segundo en stderr."""
+
+    def __init__(self, interval, skipped=0):
+        self.interval = interval
+        self.skipped = skipped
+        self.done = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self._last_time = self.start
+        self._last_done = 0
+
+    def update(self, done, errors):
+        self.done += done
+        self.errors += errors
+        now = time.perf_counter()
+        if now - self._last_time >= self.interval:
+            self.report(now)
+
+    def report(self, now=None, final=False):
+        now = now or time.perf_counter()
+        average = self.done / max(now - self.start, 1e-9)
+        if final:
+            print(
+                f"Total: {self.skipped + self.done} imágenes ({self.errors} errores) - "
+                f"{self.done} en {now - self.start:.1f}s, media {average:.1f} img/s",
+                file=sys.stderr, flush=True,
+            )
+            return
+        window = (self.done - self._last_done) / max(now - self._last_time, 1e-9)
+        print(
+            f"Procesadas: {self.skipped + self.done} imágenes ({self.errors} errores) - "
+            f"{window:.1f} img/s, media {average:.1f} img/s",
+            file=sys.stderr, flush=True,
+        )
+        self._last_time = now
+        self._last_done = self.done
+
+
+class BulkClassifier:
+    """Pipeline acotado de lectura, decodificación e inferencia por lotes."""
+
+    def __init__(self, loader, labels, batch_size=32, workers=8, prefetch=None,
+                 top_k=1, decode_processes=0, fast_decode=True, resize=DEFAULT_RESIZE_STRATEGY):
+        """
+        Args:
+            loader (ModelLoader): Modelo cargado
+            labels (LabelRegistry): Nombres de las clases
+            batch_size (int): Imágenes por invocación del intérprete
+            workers (int): Hilos de lectura/descarga y decodificación
+            prefetch (int): Imágenes en vuelo entre etapas; por defecto 4 lotes
+            top_k (int): Clases a reportar por imagen
+            decode_processes (int): Si es mayor que 0, decodifica en un
+                DecodePool de este número de procesos
+            fast_decode (bool): Decodificar JPEG a escala reducida (ver FAST_DECODE)
+            resize (str): Estrategia de redimensionado (ver image_utils.resize_image)
+        """
+        self.loader = loader
+        self.labels = labels
+        self.batch_size = batch_size
+        self.workers = workers
+        self.prefetch = prefetch or 4 * batch_size
+        self.top_k = top_k
+        self.resize = resize
+        height, width = loader.get_input_shape()[:2]
+        self.target_size = (width, height)
+        self.decode_options = {'target_size': self.target_size, 'as_array': False} if fast_decode else {}
+        self.decode_pool = None
+        if decode_processes > 0:
+            # Cada imagen en vuelo o en el lote en curso retiene una ranura:
+            # con menos ranuras el pipeline podría bloquearse esperándolas
+            self.decode_pool = DecodePool(
+                self.target_size, decode_processes,
+                slots=self.prefetch + self.batch_size + workers,
+                decode_options=self.decode_options,
+            )
+
+    def load(self, read):
+        """Lee (o descarga) y decodifica una imagen; se ejecuta en un hilo de carga."""
+        content = read()
+        if self.decode_pool is not None:
+            return self.decode_pool.decode(content, resize=self.resize)
+        image = load_image_from_bytes(content, **self.decode_options)
+        return resize_image(image, target_size=self.target_size, strategy=self.resize)
+
+    def _feed(self, items, executor, pending, stop):
+        """Hilo de lectura: envía cada imagen a los hilos de carga en orden."""
+        try:
+            for name, read in items:
+                if stop.is_set():
+                    return
+                pending.put((name, executor.submit(self.load, read)))
+        except Exception as e:
+            pending.put((None, e))
+        finally:
+            pending.put(_END)
+
+    def _results(self, batch):
+        """Ejecuta un lote de (nombre, píxeles) y retorna sus resultados."""
+        scores = self.loader.predict_batch([pixels for _, pixels in batch])
+        indices, values = top_k(scores, self.top_k)
+        names = self.labels.names(indices)
+        results = []
+        for (name, _), row_names, row_values in zip(batch, names, values.tolist()):
+            result = {'source': name, 'success': True, 'class': row_names[0],
+                      'confidence': round(row_values[0], 6)}
+            if self.top_k > 1:
+                result['top_k'] = [
+                    {'class': label, 'confidence': round(value, 6)}
+                    for label, value in zip(row_names, row_values)
+                ]
+            results.append(result)
+        return results
+
+    def run(self, items, write, on_progress=None):
+        """
+        Clasifica todas las imágenes de `items`.
+
+        Args:
+            items (iterator): Pares (identificador, función que retorna los bytes)
+            write (callable): Recibe la lista de resultados de cada lote, en orden
+            on_progress (callable): Recibe (imágenes, errores) tras cada lote
+
+        Raises:
+            Exception: Los errores del origen (p. ej. un tar corrupto); los de
+                cada imagen se escriben como resultados con success=False
+        """
+        pending = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-load')
+        feeder = threading.Thread(
+            target=self._feed, args=(items, executor, pending, stop), daemon=True
+        )
+        feeder.start()
+        try:
+            finished = False
+            while not finished:
+                batch, output = [], []
+                # Armar un lote; los errores de imagen ocupan su lugar en la salida
+                while len(batch) < self.batch_size:
+                    entry = pending.get()
+                    if entry is _END:
+                        finished = True
+                        break
+                    name, future = entry
+                    if name is None:
+                        raise future
+                    try:
+                        batch.append((name, future.result()))
+                        output.append(None)
+                    except Exception as e:
+                        output.append({'source': name, 'success': False, 'error': str(e)})
+                if not output:
+                    continue
+                errors = sum(1 for entry in output if entry is not None)
+                if batch:
+                    try:
+                        results = iter(self._results(batch))
+                    except Exception as e:
+                        errors = len(output)
+                        results = iter([{'source': name, 'success': False, 'error': str(e)}
+                                        for name, _ in batch])
+                    output = [entry or next(results) for entry in output]
+                # Soltar los píxeles (y sus ranuras de memoria compartida) antes del próximo lote
+                del batch
+                write(output)
+                if on_progress is not None:
+                    on_progress(len(output), errors)
+        finally:
+            stop.set()
+            # Vaciar la cola para que el hilo de lectura no quede bloqueado
+            while feeder.is_alive():
+                try:
+                    pending.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self.decode_pool is not None:
+                self.decode_pool.close()
+
+
+def skip(items, count):
+    """Descarta las primeras `count` imágenes del origen (ya clasificadas)."""
+    for _ in range(count):
+        if next(items, None) is None:
+            break
+    return items
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='Directorio, archivo tar o lista de URLs')
+    parser.add_argument('--output', required=True, help='Archivo JSONL de resultados')
+    parser.add_argument('--source-type', choices=('auto', 'dir', 'tar', 'urls'), default='auto')
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'plant_species.tflite'))
+    parser.add_argument('--labels', default=os.getenv('LABELS_PATH', DEFAULT_LABELS_PATH))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Hilos de lectura/descarga y decodificación')
+    parser.add_argument('--decode-processes', type=int, default=0,
+                        help='Decodificar en N procesos en lugar de en los hilos de carga')
+    parser.add_argument('--prefetch', type=int, default=None,
+                        help='Imágenes en vuelo como máximo (por defecto, 4 lotes)')
+    parser.add_argument('--top-k', type=int, default=1)
+    parser.add_argument('--no-fast-decode', action='store_true',
+                        help='Decodificar a resolución completa')
+    parser.add_argument('--resize', choices=RESIZE_STRATEGIES,
+                        default=os.getenv('RESIZE_STRATEGY', DEFAULT_RESIZE_STRATEGY),
+                        help='Estrategia de redimensionado')
+    parser.add_argument('--checkpoint-interval', type=float, default=10.0,
+                        help='Segundos entre checkpoints')
+    parser.add_argument('--progress-interval', type=float, default=5.0,
+                        help='Segundos entre reportes de avance')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignorar el checkpoint y empezar desde el principio')
+    args = parser.parse_args(argv)
+
+    if args.restart and os.path.exists(f'{args.output}.checkpoint'):
+        os.remove(f'{args.output}.checkpoint')
+    done = load_checkpoint(args.output, args.source)
+    if done:
+        print(f"Retomando desde el checkpoint: {done} imágenes ya clasificadas", file=sys.stderr)
+
+    # Un intérprete con todos los hilos: los lotes grandes paralelizan dentro de invoke()
+    loader = ModelLoader(args.model, pool_size=1)
+    classifier = BulkClassifier(
+        loader, LabelRegistry(args.labels), batch_size=args.batch_size,
+        workers=args.workers, prefetch=args.prefetch, top_k=args.top_k,
+        decode_processes=args.decode_processes, fast_decode=not args.no_fast_decode,
+        resize=args.resize,
+    )
+    items = skip(open_source(args.source, args.source_type), done)
+    progress = Progress(args.progress_interval, skipped=done)
+    last_checkpoint = time.monotonic()
+
+    with open(args.output, 'a', encoding='utf-8') as out:
+        def write(results):
+            nonlocal done, last_checkpoint
+            for result in results:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            done += len(results)
+            if time.monotonic() - last_checkpoint >= args.checkpoint_interval:
+                out.flush()
+                os.fsync(out.fileno())
+                save_checkpoint(args.output, args.source, done, out.tell())
+                last_checkpoint = time.monotonic()
+
+        try:
+            classifier.run(items, write, on_progress=progress.update)
+        finally:
+            out.flush()
+            os.fsync(out.fileno())
+            save_checkpoint(args.output, args.source, done, out.tell())
+            progress.report(final=True)
+
+
+if __name__ == '__main__':
+    main()
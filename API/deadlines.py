@@ -0,0 +1,124 @@
+"""
+Plazos (deadlines) de las solicitudes a /predict.
+
+Un cliente que abandona a los 2 s no necesita que el servidor siga
+descargando, decodificando y clasificando su imagen. Cada solicitud lleva
+un Deadline (el plazo que envía el cliente en X-Request-Timeout o en el
+parámetro timeout, acotado por el del servidor) que se pasa por el
+pipeline junto al modelo elegido:
+
+- Antes de cada etapa costosa (descarga, decodificación, redimensionado,
+  inferencia) se comprueba el plazo y, si ya venció, la solicitud termina
+  con DeadlineExceededError (HTTP 504) sin hacer el trabajo.
+- Las esperas (cola de admisión, ranura de decode_pool, intérprete libre,
+  cola del micro-batcher) se acotan al tiempo restante.
+- El micro-batcher descarta las imágenes vencidas antes de invocar al intérprete.
+"""
+
+import time
+
+from .metrics import DEADLINE_EXCEEDED
+
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+
+class DeadlineExceededError(RuntimeError):
+    """Se lanza cuando vence el plazo de una solicitud (HTTP 504)."""
+
+    def __init__(self, message, stage):
+        super().__init__(message)
+        self.stage = stage
+
+
+class Deadline:
+    """Instante límite de una solicitud, sobre el reloj de time.perf_counter."""
+
+    __slots__ = ('timeout', 'expires_at')
+
+    def __init__(self, timeout, start=None):
+        """
+        Args:
+            timeout (float): Segundos de plazo
+            start (float): Llegada de la solicitud (time.perf_counter); por defecto, ahora
+        """
+        self.timeout = timeout
+        self.expires_at = (time.perf_counter() if start is None else start) + timeout
+
+    def remaining(self):
+        """Segundos que quedan (negativo si ya venció)."""
+        return self.expires_at - time.perf_counter()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def wait_timeout(self, timeout=None):
+        """
+        Tiempo máximo de una espera: `timeout` acotado al plazo restante.
+
+        Args:
+            timeout (float): Espera máxima propia de la etapa, None si no tiene
+
+        Returns:
+            float: Segundos (0 si el plazo ya venció)
+        """
+        remaining = max(0.0, self.remaining())
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def exceeded(self, stage):
+        """
+        Registra el vencimiento en `stage` y retorna el error para lanzarlo.
+
+        Returns:
+            DeadlineExceededError: Error con la etapa en la que venció el plazo
+        """
+        DEADLINE_EXCEEDED.inc(stage=stage)
+        return DeadlineExceededError(
+            f"Se agotó el plazo de la solicitud ({self.timeout:g}s) en la etapa {stage}.", stage
+        )
+
+    def check(self, stage):
+        """
+        Comprueba el plazo antes de empezar una etapa.
+
+        Raises:
+            DeadlineExceededError: Si el plazo ya venció
+        """
+        if self.expired():
+            raise self.exceeded(stage)
+
+
+def check_deadline(deadline, stage):
+    """Como Deadline.check, sin efecto si la solicitud no tiene plazo (None)."""
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def wait_timeout(deadline, timeout=None):
+    """Como Deadline.wait_timeout; sin plazo retorna `timeout` tal cual."""
+    return timeout if deadline is None else deadline.wait_timeout(timeout)
+
+
+def parse_timeout(value, default=None, maximum=None):
+    """
+    Valida el plazo pedido por el cliente.
+
+    Args:
+        value: Segundos (str, int, float o None)
+        default (float): Plazo si el cliente no envía ninguno (None = sin plazo)
+        maximum (float): Plazo máximo admitido (None = sin máximo)
+
+    Returns:
+        float: Segundos de plazo, o None si la solicitud no tiene plazo
+
+    Raises:
+        ValueError: Si el valor no es un número positivo
+    """
+    if value is None or value == '':
+        return default
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("timeout debe ser un número positivo de segundos.")
+    if not timeout > 0 or timeout == float('inf'):
+        raise ValueError("timeout debe ser un número positivo de segundos.")
+    return timeout if maximum is None else min(timeout, maximum)
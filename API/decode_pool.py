@@ -0,0 +1,211 @@
+"""
+Etapa opcional de decodificación y preprocesamiento en procesos separados.
+
+La decodificación de Pillow y el redimensionado LANCZOS retienen el GIL
+durante buena parte de su trabajo, de modo que en un worker multihilo no
+escalan con los núcleos. DecodePool ejecuta esa etapa en un pool de procesos:
+
+- Los bytes codificados viajan al proceso hijo (son pequeños); los píxeles
+  resultantes vuelven a través de un bloque de memoria compartida dividido
+  en ranuras del tamaño de entrada del modelo, sin serializar arrays.
+- El número de ranuras acota las imágenes en vuelo (backpressure): si no
+  hay una libre a tiempo se lanza DecodePoolBusyError.
+- Si un proceso hijo muere (p. ej. por una imagen que hace fallar al
+  decodificador), el pool se reconstruye y la solicitud se reintenta una vez.
+"""
+
+import ctypes
+import multiprocessing
+import queue
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .image_utils import DEFAULT_RESIZE_STRATEGY, load_image_from_bytes, resize_image
+
+
+class DecodePoolBusyError(RuntimeError):
+    """Se lanza cuando no hay una ranura de memoria compartida libre a tiempo."""
+
+
+class DecodeWorkerError(RuntimeError):
+    """Se lanza cuando los procesos de decodificación fallan repetidamente."""
+
+
+# Memoria compartida del lado del proceso hijo (asignada en _init_worker)
+_worker_shm = None
+
+
+def _init_worker(shm_name):
+    """Conecta el proceso hijo al bloque de memoria compartida del pool."""
+    global _worker_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+
+
+def _decode_into(offset, content, target_size, decode_options, resize):
+    """
+    Decodifica y redimensiona una imagen dentro de su ranura compartida.
+
+    Se ejecuta en el proceso hijo; las excepciones (IOError para imágenes
+    inválidas) se propagan al proceso principal.
+    """
+    image = load_image_from_bytes(content, **decode_options)
+    pixels = resize_image(image, target_size, resize)
+    slot = np.ndarray(pixels.shape, dtype=np.uint8, buffer=_worker_shm.buf, offset=offset)
+    slot[...] = pixels
+    del slot
+
+
+class DecodePool:
+    """Pool de procesos que decodifica imágenes hacia ranuras de memoria compartida."""
+
+    def __init__(self, target_size, processes, slots=None, decode_options=None,
+                 acquire_timeout=30.0, task_timeout=60.0):
+        """
+        Crea el bloque de memoria compartida y arranca los procesos.
+
+        Args:
+            target_size (tuple): Tamaño de entrada del modelo (ancho, alto)
+            processes (int): Número de procesos de decodificación
+            slots (int): Imágenes en vuelo como máximo; por defecto 4 por proceso
+            decode_options (dict): Argumentos adicionales de load_image_from_bytes
+            acquire_timeout (float): Segundos máximos de espera por una ranura libre
+            task_timeout (float): Segundos máximos de decodificación de una imagen
+        """
+        if processes < 1:
+            raise ValueError("El pool de decodificación necesita al menos 1 proceso")
+        self.target_size = tuple(target_size)
+        self.processes = processes
+        self.slots = slots or processes * 4
+        self.decode_options = dict(decode_options or {})
+        self.acquire_timeout = acquire_timeout
+        self.task_timeout = task_timeout
+        width, height = self.target_size
+        self.slot_shape = (height, width, 3)
+        self.slot_bytes = height * width * 3
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slots)
+        # Tipo ctypes de una ranura: admite weakref, a diferencia de memoryview
+        self._slot_type = type('SlotBuffer', (ctypes.c_uint8 * self.slot_bytes,), {})
+        self._free = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self.restarts = 0
+        self._executor_lock = threading.Lock()
+        self._executor = self._start_executor()
+
+    def _start_executor(self):
+        # spawn: el proceso padre tiene hilos e intérpretes cargados, que no
+        # deben heredarse con fork
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.shm.name,),
+        )
+
+    def _restart(self, broken, reason):
+        """Reemplaza el executor roto, salvo que otro hilo ya lo haya hecho."""
+        with self._executor_lock:
+            if self._executor is broken:
+                print(f"Reiniciando el pool de decodificación: {reason}")
+                # Terminar los procesos que sigan vivos (p. ej. tras un timeout)
+                # para que ninguno escriba después en una ranura ya liberada
+                for process in list((broken._processes or {}).values()):
+                    process.terminate()
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._start_executor()
+                self.restarts += 1
+
+    def _acquire(self, timeout=None):
+        if timeout is None:
+            timeout = self.acquire_timeout
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise DecodePoolBusyError(
+                f"No hay capacidad de decodificación libre tras {timeout:.1f}s "
+                f"({self.slots} imágenes en vuelo)."
+            )
+
+    def _lease(self, slot):
+        """
+        Retorna la vista de una ranura; la ranura se libera al recolectarse
+        el último array que la referencia (incluidas vistas derivadas).
+        """
+        offset = slot * self.slot_bytes
+        owner = self._slot_type.from_buffer(self.shm.buf, offset)
+        weakref.finalize(owner, self._free.put, slot)
+        return np.frombuffer(owner, dtype=np.uint8).reshape(self.slot_shape)
+
+    def decode(self, content, acquire_timeout=None, resize=DEFAULT_RESIZE_STRATEGY):
+        """
+        Decodifica y redimensiona una imagen en un proceso del pool.
+
+        Args:
+            content (bytes): Imagen codificada
+            acquire_timeout (float): Segundos máximos de espera por una ranura;
+                por defecto el del pool
+            resize (str): Estrategia de redimensionado (ver image_utils.resize_image)
+
+        Returns:
+            np.ndarray: Píxeles uint8 (alto, ancho, 3) sobre memoria compartida.
+                La ranura queda reservada mientras exista alguna referencia al array.
+
+        Raises:
+            IOError: Si la imagen no se puede abrir o procesar
+            DecodePoolBusyError: Si no hay ranuras libres a tiempo
+            DecodeWorkerError: Si los procesos del pool fallan dos veces seguidas
+                o la imagen excede task_timeout
+        """
+        slot = self._acquire(acquire_timeout)
+        try:
+            for _ in range(2):
+                executor = self._executor
+                try:
+                    executor.submit(
+                        _decode_into, slot * self.slot_bytes, content,
+                        self.target_size, self.decode_options, resize,
+                    ).result(timeout=self.task_timeout)
+                    break
+                except BrokenProcessPool:
+                    self._restart(executor, "un proceso terminó inesperadamente")
+                except FutureTimeoutError:
+                    self._restart(executor, f"decodificación de más de {self.task_timeout:.0f}s")
+                    raise DecodeWorkerError(
+                        f"La decodificación de la imagen excedió {self.task_timeout:.0f}s."
+                    )
+            else:
+                raise DecodeWorkerError("Los procesos de decodificación fallaron al procesar la imagen.")
+        except BaseException:
+            self._free.put(slot)
+            raise
+        return self._lease(slot)
+
+    def stats(self):
+        """
+        Retorna el estado del pool.
+
+        Returns:
+            dict: processes, slots, slots_in_use y restarts
+        """
+        return {
+            'processes': self.processes,
+            'slots': self.slots,
+            'slots_in_use': self.slots - self._free.qsize(),
+            'restarts': self.restarts,
+        }
+
+    def close(self):
+        """Detiene los procesos y libera la memoria compartida."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        try:
+            self.shm.close()
+        except BufferError:
+            # Aún hay arrays vivos sobre alguna ranura; el bloque se libera al salir
+            pass
+        self.shm.unlink()
+
@@ -0,0 +1,290 @@
+"""
+Descarga de imágenes por URL con conexiones reutilizables y límites estrictos.
+
+- Una sesión de requests compartida con pool de conexiones por host, para no
+  repetir el handshake TCP/TLS en cada solicitud.
+- Timeouts separados de conexión y de lectura.
+- Descarga en streaming con un tope de bytes: se aborta antes de leer el
+  cuerpo si Content-Length lo supera, y en cuanto se supera durante la lectura.
+- Detección del formato por los primeros bytes (magic numbers): una respuesta
+  que no empieza como una imagen se descarta sin descargarla completa.
+- Plazo opcional de la solicitud (ver deadlines.py): los timeouts se acotan
+  al tiempo restante y la descarga se abandona en cuanto vence.
+"""
+
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Firmas de los formatos de imagen aceptados: (formato, desplazamiento, bytes)
+IMAGE_SIGNATURES = (
+    ('JPEG', 0, b'\xff\xd8\xff'),
+    ('PNG', 0, b'\x89PNG\r\n\x1a\n'),
+    ('GIF', 0, b'GIF87a'),
+    ('GIF', 0, b'GIF89a'),
+    ('WEBP', 8, b'WEBP'),
+    ('BMP', 0, b'BM'),
+    ('TIFF', 0, b'II*\x00'),
+    ('TIFF', 0, b'MM\x00*'),
+)
+
+# Bytes necesarios para reconocer cualquiera de las firmas
+SNIFF_BYTES = 12
+
+
+def sniff_image_format(header):
+    """
+    Identifica el formato de una imagen a partir de sus primeros bytes.
+
+    Args:
+        header (bytes): Al menos los primeros SNIFF_BYTES bytes del archivo
+
+    Returns:
+        str: Nombre del formato (JPEG, PNG, ...) o None si no es reconocido
+    """
+    for image_format, offset, signature in IMAGE_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            if image_format == 'WEBP' and header[:4] != b'RIFF':
+                continue
+            return image_format
+    return None
+
+
+def check_content_length(headers, max_bytes):
+    """
+    Rechaza una respuesta antes de leer el cuerpo si anuncia un tamaño excesivo.
+
+    Raises:
+        ValueError: Si Content-Length supera max_bytes
+    """
+    content_length = headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise ValueError(f"La imagen excede el tamaño máximo de {max_bytes} bytes.")
+
+
+def append_chunk(buffer, chunk, max_bytes):
+    """
+    Agrega un fragmento descargado al buffer aplicando los límites.
+
+    El primer fragmento se verifica contra las firmas de imagen para abortar
+    cuanto antes las respuestas que no son imágenes.
+
+    Raises:
+        ValueError: Si el contenido no es una imagen o supera max_bytes
+    """
+    if not buffer and len(chunk) >= SNIFF_BYTES and sniff_image_format(chunk) is None:
+        raise ValueError("El contenido de la URL no es una imagen reconocida.")
+    buffer += chunk
+    if len(buffer) > max_bytes:
+        raise ValueError(f"La imagen excede el tamaño máximo de {max_bytes} bytes.")
+
+
+def finish_download(buffer):
+    """
+    Verifica el formato de una descarga completa y retorna sus bytes.
+
+    Raises:
+        ValueError: Si el contenido no es una imagen reconocida
+    """
+    if sniff_image_format(bytes(buffer[:SNIFF_BYTES])) is None:
+        raise ValueError("El contenido de la URL no es una imagen reconocida.")
+    return bytes(buffer)
+
+
+def deadline_timeouts(timeouts, deadline):
+    """
+    Acota los timeouts (conexión, lectura) al plazo restante de la solicitud.
+
+    Args:
+        timeouts (tuple): (connect_timeout, read_timeout) configurados
+        deadline (Deadline): Plazo de la solicitud, o None
+
+    Returns:
+        tuple: (connect_timeout, read_timeout)
+    """
+    if deadline is None:
+        return timeouts
+    # Las bibliotecas HTTP no aceptan un timeout de 0
+    return tuple(max(0.001, deadline.wait_timeout(timeout)) for timeout in timeouts)
+
+
+def check_url(url):
+    """
+    Valida que la URL sea un texto que use http o https.
+
+    Raises:
+        ValueError: Si no es un texto o el esquema no es http(s)
+    """
+    if not isinstance(url, str) or urlparse(url).scheme not in ('http', 'https'):
+        raise ValueError("Error al descargar imagen desde URL: solo se admiten URLs http(s).")
+
+
+class ImageFetcher:
+    """Descargador de imágenes con sesión compartida y límites de tamaño y tiempo."""
+
+    def __init__(self, max_bytes=20 * 1024 * 1024, connect_timeout=3.05, read_timeout=10.0,
+                 pool_connections=16, pool_maxsize=16, chunk_size=64 * 1024, session=None):
+        """
+        Args:
+            max_bytes (int): Tamaño máximo de la imagen descargada
+            connect_timeout (float): Segundos máximos para establecer la conexión
+            read_timeout (float): Segundos máximos entre bytes recibidos
+            pool_connections (int): Número de hosts distintos con pool propio
+            pool_maxsize (int): Conexiones reutilizables por host
+            chunk_size (int): Tamaño de lectura del cuerpo en streaming
+            session (requests.Session): Sesión a usar (por defecto se crea una)
+        """
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.chunk_size = chunk_size
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+    def fetch(self, url, deadline=None):
+        """
+        Descarga una imagen respetando los límites configurados.
+
+        Args:
+            url (str): URL http(s) de la imagen
+            deadline (Deadline): Plazo de la solicitud (opcional)
+
+        Returns:
+            bytes: Contenido de la imagen
+
+        Raises:
+            ValueError: Si la URL es inválida, la descarga falla, excede el
+                tamaño máximo o el contenido no es una imagen reconocida
+            DeadlineExceededError: Si el plazo vence durante la descarga
+        """
+        check_url(url)
+        if deadline is not None:
+            deadline.check('fetch')
+        timeout = deadline_timeouts(self.timeout, deadline)
+        try:
+            with self.session.get(url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+
+                check_content_length(response.headers, self.max_bytes)
+                buffer = bytearray()
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    append_chunk(buffer, chunk, self.max_bytes)
+                    if deadline is not None:
+                        deadline.check('fetch')
+                return finish_download(buffer)
+        except requests.RequestException as e:
+            # Un timeout acotado por el plazo es un plazo vencido, no un error de la URL
+            if deadline is not None:
+                deadline.check('fetch')
+            raise ValueError(f"Error al descargar imagen desde URL: {str(e)}")
+
+
+class AsyncImageFetcher:
+    """
+    Versión asyncio de ImageFetcher basada en httpx, para el modo ASGI.
+
+    Aplica los mismos límites: timeouts separados, tope de bytes en streaming
+    y verificación del formato por los primeros bytes.
+    """
+
+    def __init__(self, max_bytes=20 * 1024 * 1024, connect_timeout=3.05, read_timeout=10.0,
+                 max_connections=100, max_keepalive_connections=20, chunk_size=64 * 1024,
+                 client=None):
+        """
+        Args:
+            max_bytes (int): Tamaño máximo de la imagen descargada
+            connect_timeout (float): Segundos máximos para establecer la conexión
+            read_timeout (float): Segundos máximos entre bytes recibidos
+            max_connections (int): Conexiones simultáneas máximas del cliente
+            max_keepalive_connections (int): Conexiones reutilizables en reposo
+            chunk_size (int): Tamaño de lectura del cuerpo en streaming
+            client (httpx.AsyncClient): Cliente a usar (por defecto se crea uno)
+        """
+        import httpx
+
+        self._httpx = httpx
+        self.max_bytes = max_bytes
+        self.timeout = (connect_timeout, read_timeout)
+        self.chunk_size = chunk_size
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                ),
+                follow_redirects=True,
+            )
+        self.client = client
+
+    async def fetch(self, url, deadline=None):
+        """
+        Descarga una imagen sin bloquear el event loop.
+
+        Args:
+            url (str): URL http(s) de la imagen
+            deadline (Deadline): Plazo de la solicitud (opcional)
+
+        Returns:
+            bytes: Contenido de la imagen
+
+        Raises:
+            ValueError: Mismos casos que ImageFetcher.fetch
+            DeadlineExceededError: Si el plazo vence durante la descarga
+        """
+        check_url(url)
+        options = {}
+        if deadline is not None:
+            deadline.check('fetch')
+            connect_timeout, read_timeout = deadline_timeouts(self.timeout, deadline)
+            options['timeout'] = self._httpx.Timeout(read_timeout, connect=connect_timeout)
+        try:
+            async with self.client.stream('GET', url, **options) as response:
+                response.raise_for_status()
+                check_content_length(response.headers, self.max_bytes)
+                buffer = bytearray()
+                async for chunk in response.aiter_bytes(chunk_size=self.chunk_size):
+                    append_chunk(buffer, chunk, self.max_bytes)
+                    if deadline is not None:
+                        deadline.check('fetch')
+                return finish_download(buffer)
+        except self._httpx.HTTPError as e:
+            if deadline is not None:
+                deadline.check('fetch')
+            raise ValueError(f"Error al descargar imagen desde URL: {str(e)}")
+
+    async def aclose(self):
+        """Cierra las conexiones del cliente."""
+        await self.client.aclose()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def configure_default_fetcher(**kwargs):
+    """
+    Reemplaza el descargador compartido por uno con la configuración indicada.
+
+    Args:
+        **kwargs: Argumentos de ImageFetcher
+    """
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = ImageFetcher(**kwargs)
+    return _default_fetcher
+
+
+def get_default_fetcher():
+    """Retorna el descargador compartido del proceso, creándolo si no existe."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        with _default_lock:
+            if _default_fetcher is None:
+                _default_fetcher = ImageFetcher()
+    return _default_fetcher
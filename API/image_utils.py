@@ -4,17 +4,138 @@ Utilidades para cargar y preprocesar imágenes para el modelo TensorFlow Lite.
 
 import numpy as np
 from PIL import Image
-import requests
 from io import BytesIO
-from tensorflow.keras.applications.efficientnet import preprocess_input
 
+from .image_fetcher import get_default_fetcher
 
-def load_image_from_url(url):
+# Estrategias de redimensionado al tamaño de entrada del modelo (ver resize_image)
+RESIZE_STRATEGIES = ('lanczos', 'bilinear', 'reduce_bilinear', 'center_crop', 'training')
+DEFAULT_RESIZE_STRATEGY = 'lanczos'
+
+# Filtro y reducing_gap de Image.resize para las estrategias de Pillow.
+# reducing_gap=2.0 reduce primero por un factor entero con reduce() (barato)
+# y aplica el filtro solo sobre una imagen a menos del doble del tamaño final
+_PIL_RESIZE_OPTIONS = {
+    'lanczos': {'resample': Image.Resampling.LANCZOS},
+    'bilinear': {'resample': Image.Resampling.BILINEAR},
+    'reduce_bilinear': {'resample': Image.Resampling.BILINEAR, 'reducing_gap': 2.0},
+    'center_crop': {'resample': Image.Resampling.BILINEAR, 'reducing_gap': 2.0},
+}
+
+
+def preprocess_input(image_array):
+    """
+    Implementación en NumPy de tf.keras.applications.efficientnet.preprocess_input.
+    
+    En Keras 2.x/3.x esa función no transforma los píxeles: la normalización
+    forma parte del propio modelo EfficientNet (capas Rescaling/Normalization),
+    que espera valores en [0, 255]. Replicarla aquí evita importar TensorFlow
+    solo para preprocesar.
+    
+    Args:
+        image_array (np.ndarray): Píxeles RGB en [0, 255]
+        
+    Returns:
+        np.ndarray: Los mismos píxeles como float32
+    """
+    return image_array.astype(np.float32, copy=False)
+
+
+def reduce_image_for_target(image, target_size):
+    """
+    Reduce una imagen recién abierta a la escala más pequeña que siga siendo
+    mayor o igual que el tamaño objetivo, antes de decodificarla por completo.
+    
+    En JPEG usa draft(), que decodifica directamente a 1/2, 1/4 o 1/8 de la
+    resolución sin materializar los píxeles descartados. En otros formatos
+    usa reduce() con un factor entero.
+    
+    Args:
+        image (PIL.Image.Image): Imagen abierta con Image.open (aún sin cargar)
+        target_size (tuple): Tamaño objetivo (ancho, alto)
+        
+    Returns:
+        PIL.Image.Image: Imagen reducida (o la misma si no se puede reducir)
+    """
+    target_w, target_h = target_size
+    if image.format == 'JPEG':
+        image.draft('RGB', (target_w, target_h))
+        return image
+    factor = min(image.width // target_w, image.height // target_h)
+    if factor >= 2:
+        # reduce() no admite imágenes con paleta (GIF, PNG indexado) ni de 1 bit
+        if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            image = image.convert('RGB')
+        return image.reduce(factor)
+    return image
+
+
+def image_dimensions(content):
+    """
+    Lee el ancho y alto de una imagen codificada sin decodificar sus píxeles.
+    
+    Args:
+        content (bytes): Imagen codificada
+        
+    Returns:
+        tuple: (ancho, alto), o None si la cabecera no es reconocible
+    """
+    try:
+        with Image.open(BytesIO(content)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def decode_image(source, target_size=None):
+    """
+    Decodifica una imagen a PIL RGB, opcionalmente reducida para target_size.
+    
+    Args:
+        source: Objeto tipo archivo o bytes con la imagen codificada
+        target_size (tuple): Si se indica, decodifica a la menor escala que
+            sea mayor o igual que este tamaño (ancho, alto)
+        
+    Returns:
+        PIL.Image.Image: Imagen RGB
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    image = Image.open(source)
+    if target_size is not None:
+        image = reduce_image_for_target(image, target_size)
+    return image.convert('RGB')
+
+
+def fetch_image_bytes(url, deadline=None):
+    """
+    Descarga el contenido crudo de una imagen desde una URL.
+    
+    Usa el descargador compartido (ver image_fetcher.py): conexiones
+    reutilizables, timeouts de conexión y lectura, y un tope de tamaño.
+    
+    Args:
+        url (str): URL de la imagen a descargar
+        deadline (Deadline): Plazo de la solicitud (opcional)
+        
+    Returns:
+        bytes: Contenido de la imagen
+        
+    Raises:
+        ValueError: Si la URL es inválida o la imagen no se puede descargar
+    """
+    return get_default_fetcher().fetch(url, deadline)
+
+
+def load_image_from_url(url, target_size=None, as_array=True):
     """
     Descarga una imagen desde una URL y la convierte a un array numpy RGB.
     
     Args:
         url (str): URL de la imagen a descargar
+        target_size (tuple): Si se indica, decodifica directamente a la menor
+            escala mayor o igual que este tamaño (ver decode_image)
+        as_array (bool): Si False, retorna la imagen PIL sin pasar por numpy
         
     Returns:
         np.ndarray: Array numpy con la imagen en formato RGB (H, W, 3)
@@ -23,26 +144,46 @@ def load_image_from_url(url):
         ValueError: Si la URL es inválida o la imagen no se puede descargar
         IOError: Si la imagen no se puede abrir o procesar
     """
+    content = fetch_image_bytes(url)
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        image = decode_image(content, target_size)
+        return np.array(image) if as_array else image
+    except Exception as e:
+        raise IOError(f"Error al procesar imagen desde URL: {str(e)}")
+
+
+def load_image_from_bytes(content, target_size=None, as_array=True):
+    """
+    Decodifica una imagen a partir de sus bytes crudos ya leídos o descargados.
+    
+    Args:
+        content (bytes): Imagen codificada
+        target_size (tuple): Si se indica, decodifica directamente a la menor
+            escala mayor o igual que este tamaño (ver decode_image)
+        as_array (bool): Si False, retorna la imagen PIL sin pasar por numpy
         
-        image = Image.open(BytesIO(response.content))
-        image = image.convert('RGB')
+    Returns:
+        np.ndarray: Array numpy con la imagen en formato RGB (H, W, 3)
         
-        return np.array(image)
-    except requests.RequestException as e:
-        raise ValueError(f"Error al descargar imagen desde URL: {str(e)}")
+    Raises:
+        IOError: Si la imagen no se puede abrir o procesar
+    """
+    try:
+        image = decode_image(content, target_size)
+        return np.array(image) if as_array else image
     except Exception as e:
-        raise IOError(f"Error al procesar imagen desde URL: {str(e)}")
+        raise IOError(f"Error al procesar imagen: {str(e)}")
 
 
-def load_image_from_file(file):
+def load_image_from_file(file, target_size=None, as_array=True):
     """
     Lee un archivo de imagen y lo convierte a un array numpy RGB.
     
     Args:
         file: Objeto de archivo (como el de Flask request.files)
+        target_size (tuple): Si se indica, decodifica directamente a la menor
+            escala mayor o igual que este tamaño (ver decode_image)
+        as_array (bool): Si False, retorna la imagen PIL sin pasar por numpy
         
     Returns:
         np.ndarray: Array numpy con la imagen en formato RGB (H, W, 3)
@@ -51,39 +192,141 @@ def load_image_from_file(file):
         IOError: Si el archivo no se puede abrir o procesar
     """
     try:
-        image = Image.open(file)
-        image = image.convert('RGB')
-        
-        return np.array(image)
+        image = decode_image(file, target_size)
+        return np.array(image) if as_array else image
     except Exception as e:
         raise IOError(f"Error al procesar archivo de imagen: {str(e)}")
 
 
-def preprocess_image(image_array, target_size=(256, 256), use_efficientnet_preprocess=True):
+def center_crop_box(size, target_size):
     """
-    Preprocesa una imagen para el modelo TensorFlow Lite.
-    IMPORTANTE: Usa el mismo preprocesamiento que EfficientNet si el modelo fue entrenado con EfficientNet.
+    Recorte centrado más grande con la proporción del tamaño objetivo.
     
     Args:
-        image_array (np.ndarray): Array numpy de la imagen en formato RGB (H, W, 3)
+        size (tuple): Tamaño de la imagen (ancho, alto)
+        target_size (tuple): Tamaño objetivo (ancho, alto)
+        
+    Returns:
+        tuple: Caja (izquierda, arriba, derecha, abajo) para Image.resize(box=...)
+    """
+    width, height = size
+    target_w, target_h = target_size
+    if width * target_h > height * target_w:
+        # Más ancha que el objetivo: se recortan los lados
+        crop_w = height * target_w / target_h
+        left = (width - crop_w) / 2
+        return (left, 0, left + crop_w, height)
+    crop_h = width * target_h / target_w
+    top = (height - crop_h) / 2
+    return (0, top, width, top + crop_h)
+
+
+def _bilinear_axis(out_size, in_size):
+    """Índices vecinos y pesos de un eje, como tf.image.resize (half_pixel_centers)."""
+    position = (np.arange(out_size, dtype=np.float64) + 0.5) * (in_size / out_size) - 0.5
+    floor = np.floor(position)
+    lower = np.clip(floor, 0, in_size - 1).astype(np.intp)
+    upper = np.clip(np.ceil(position), 0, in_size - 1).astype(np.intp)
+    return lower, upper, (position - floor).astype(np.float32)
+
+
+def resize_like_training(pixels, target_size):
+    """
+    Redimensiona como el notebook de entrenamiento: tf.image.resize con
+    interpolación bilineal, sin antialiasing y sin conservar la proporción.
+    
+    Sin antialiasing, cada píxel de salida solo lee sus 4 vecinos de la
+    entrada, así que el costo no depende del tamaño de la imagen original.
+    
+    Args:
+        pixels (np.ndarray): Píxeles RGB uint8 (H, W, 3)
+        target_size (tuple): Tamaño objetivo (ancho, alto)
+        
+    Returns:
+        np.ndarray: Píxeles uint8 con forma (alto, ancho, 3), redondeados
+    """
+    target_w, target_h = target_size
+    y0, y1, fy = _bilinear_axis(target_h, pixels.shape[0])
+    x0, x1, fx = _bilinear_axis(target_w, pixels.shape[1])
+    fx = fx[np.newaxis, :, np.newaxis]
+    fy = fy[:, np.newaxis, np.newaxis]
+    top_left = pixels[y0[:, None], x0].astype(np.float32)
+    top_right = pixels[y0[:, None], x1].astype(np.float32)
+    bottom_left = pixels[y1[:, None], x0].astype(np.float32)
+    bottom_right = pixels[y1[:, None], x1].astype(np.float32)
+    top = top_left + (top_right - top_left) * fx
+    bottom = bottom_left + (bottom_right - bottom_left) * fx
+    resized = top + (bottom - top) * fy
+    return np.clip(np.rint(resized), 0, 255).astype(np.uint8)
+
+
+def resize_image(image, target_size=(256, 256), strategy=DEFAULT_RESIZE_STRATEGY):
+    """
+    Convierte una imagen a RGB y la redimensiona al tamaño de entrada del modelo.
+    
+    Los píxeles quedan como uint8 en [0, 255]: ModelLoader.predict_batch los
+    escribe directamente en el buffer de entrada del intérprete, aplicando allí
+    la conversión de tipo (o la cuantización), sin arrays float intermedios.
+    
+    Estrategias:
+        lanczos          Filtro LANCZOS de Pillow (la más cara)
+        bilinear         Filtro BILINEAR de Pillow
+        reduce_bilinear  reduce() por un factor entero y luego BILINEAR
+        center_crop      Recorte centrado a la proporción del modelo y luego
+                         como reduce_bilinear
+        training         Como el notebook de entrenamiento (ver resize_like_training)
+    
+    Args:
+        image (np.ndarray | PIL.Image.Image): Imagen RGB (H, W, 3)
         target_size (tuple): Tamaño objetivo (ancho, alto). Default: (256, 256)
-        use_efficientnet_preprocess (bool): Si True, usa preprocess_input de EfficientNet. Default: True
+        strategy (str): Una de RESIZE_STRATEGIES. Default: lanczos
         
     Returns:
-        np.ndarray: Array numpy preprocesado listo para el modelo
+        np.ndarray: Píxeles uint8 con forma (alto, ancho, 3)
+        
+    Raises:
+        ValueError: Si la estrategia no existe
     """
+    if strategy not in RESIZE_STRATEGIES:
+        raise ValueError(
+            f"Estrategia de redimensionado inválida: {strategy!r}. "
+            f"Use una de: {', '.join(RESIZE_STRATEGIES)}."
+        )
     # Convertir a PIL Image si es necesario
-    if isinstance(image_array, np.ndarray):
-        image = Image.fromarray(image_array)
-    else:
-        image = image_array
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    
+    # Asegurar que sea RGB (sin copiar si ya lo es)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
     
-    # Asegurar que sea RGB
-    image = image.convert('RGB')
+    if strategy == 'training':
+        return resize_like_training(np.asarray(image), target_size)
+    options = _PIL_RESIZE_OPTIONS[strategy]
+    if strategy == 'center_crop':
+        options = {**options, 'box': center_crop_box(image.size, target_size)}
     
     # Redimensionar la imagen
-    image = image.resize(target_size, Image.Resampling.LANCZOS)
-    image_array = np.array(image, dtype=np.float32)
+    image = image.resize(target_size, **options)
+    return np.asarray(image)
+
+
+def preprocess_image(image_array, target_size=(256, 256), use_efficientnet_preprocess=True,
+                     strategy=DEFAULT_RESIZE_STRATEGY):
+    """
+    Preprocesa una imagen para el modelo TensorFlow Lite.
+    IMPORTANTE: Usa el mismo preprocesamiento que EfficientNet si el modelo fue entrenado con EfficientNet.
+    
+    Args:
+        image_array (np.ndarray | PIL.Image.Image): Imagen en formato RGB (H, W, 3)
+        target_size (tuple): Tamaño objetivo (ancho, alto). Default: (256, 256)
+        use_efficientnet_preprocess (bool): Si True, usa preprocess_input de EfficientNet. Default: True
+        strategy (str): Estrategia de redimensionado (ver resize_image). Default: lanczos
+        
+    Returns:
+        np.ndarray: Array numpy preprocesado listo para el modelo
+    """
+    image_array = resize_image(image_array, target_size, strategy).astype(np.float32)
     
     # IMPORTANTE: Usar el mismo preprocesamiento que EfficientNet
     # Esto normaliza usando media y desviación estándar de ImageNet
@@ -91,7 +334,7 @@ def preprocess_image(image_array, target_size=(256, 256), use_efficientnet_prepr
         image_array = preprocess_input(image_array)
     else:
         # Fallback: normalización simple [0, 1]
-        image_array = image_array / 255.0
+        image_array /= 255.0
     
     # La dimensión de batch se agregará en model_loader si es necesario
     return image_array
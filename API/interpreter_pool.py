@@ -0,0 +1,139 @@
+"""
+Pool de intérpretes TensorFlow Lite independientes para inferencia en paralelo.
+"""
+
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import observe_stage
+
+
+class PoolTimeoutError(RuntimeError):
+    """Se lanza cuando no hay un intérprete libre dentro del tiempo de espera."""
+
+
+def available_cpus():
+    """
+    Número de CPUs que este proceso puede usar.
+
+    Returns:
+        int: CPUs de la afinidad del proceso si está disponible, si no os.cpu_count()
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def threads_per_interpreter(pool_size, cpus=None):
+    """
+    Calcula num_threads para que el pool completo no sobresuscriba la CPU.
+
+    Args:
+        pool_size (int): Número de intérpretes del pool
+        cpus (int): CPUs disponibles, por defecto las del proceso
+
+    Returns:
+        int: Hilos por intérprete (al menos 1)
+    """
+    cpus = cpus or available_cpus()
+    return max(1, cpus // max(1, pool_size))
+
+
+class PooledInterpreter:
+    """Un intérprete del pool junto con sus detalles de entrada y salida."""
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.interpreter.allocate_tensors()
+        self.input_details = interpreter.get_input_details()
+        self.output_details = interpreter.get_output_details()
+        # Dimensión de batch con la que está asignado actualmente el tensor de entrada
+        self.batch_size = int(self.input_details[0]['shape'][0])
+
+    def resize_input_if_needed(self, batch_size):
+        """
+        Ajusta la dimensión de batch del tensor de entrada del intérprete.
+
+        Args:
+            batch_size (int): Número de imágenes del lote a ejecutar
+        """
+        if batch_size == self.batch_size:
+            return
+        shape = list(self.input_details[0]['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self.input_details[0]['index'], shape)
+        self.interpreter.allocate_tensors()
+        self.batch_size = batch_size
+
+
+class InterpreterPool:
+    """Pool acotado de intérpretes que se prestan a un hilo a la vez."""
+
+    def __init__(self, interpreter_factory, size, checkout_timeout=30.0):
+        """
+        Crea y asigna los intérpretes del pool.
+
+        Args:
+            interpreter_factory (callable): Función sin argumentos que retorna
+                un intérprete nuevo sin asignar
+            size (int): Número de intérpretes
+            checkout_timeout (float): Segundos máximos de espera por un intérprete libre
+        """
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._in_use = 0
+        self._counter_lock = threading.Lock()
+        self.members = [PooledInterpreter(interpreter_factory()) for _ in range(size)]
+        for member in self.members:
+            self._idle.put(member)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """
+        Presta un intérprete libre durante el bloque `with`.
+
+        Args:
+            timeout (float): Segundos máximos de espera; por defecto checkout_timeout
+
+        Yields:
+            PooledInterpreter: Intérprete de uso exclusivo del hilo actual
+
+        Raises:
+            PoolTimeoutError: Si no se libera ningún intérprete a tiempo
+        """
+        if timeout is None:
+            timeout = self.checkout_timeout
+        start = time.perf_counter()
+        try:
+            member = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            observe_stage('pool_wait', time.perf_counter() - start)
+            raise PoolTimeoutError(
+                f"No hay intérpretes libres tras {timeout:.1f}s ({self.size} en uso)."
+            )
+        observe_stage('pool_wait', time.perf_counter() - start)
+        with self._counter_lock:
+            self._in_use += 1
+        try:
+            yield member
+        finally:
+            with self._counter_lock:
+                self._in_use -= 1
+            self._idle.put(member)
+
+    def stats(self):
+        """
+        Retorna el estado de ocupación del pool.
+
+        Returns:
+            dict: size, in_use y available
+        """
+        in_use = self._in_use
+        return {'size': self.size, 'in_use': in_use, 'available': self.size - in_use}
@@ -0,0 +1,287 @@
+"""
+Ajuste automático de los intérpretes de TensorFlow Lite al host.
+
+El mejor num_threads y el mejor delegado de CPU dependen del modelo, de la
+CPU y de cuántos workers la comparten, así que se miden en el host real:
+
+- Cada worker dispone de CPUs / workers núcleos. Los candidatos reparten
+  ese presupuesto entre intérpretes del pool y hilos por intérprete
+  (num_threads = 1, 2, 4, ... y pool = núcleos // num_threads), con
+  XNNPACK y sin delegados por defecto.
+- Cada candidato se mide unos instantes con todos sus intérpretes
+  ejecutando inferencias de una imagen a la vez, como en las solicitudes
+  concurrentes, y gana el de más imágenes por segundo.
+- El resultado se guarda en un archivo JSON por hash del modelo, firma de
+  la CPU, runtime, workers y tamaño del pool, y se aplica directamente en
+  los siguientes arranques. Un lock de archivo hace que, si varios workers
+  arrancan a la vez, mida solo uno y los demás usen su resultado.
+
+También se puede ejecutar antes del despliegue:
+
+    python -m API.interpreter_tuning plant_species.tflite --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .interpreter_pool import PooledInterpreter, available_cpus
+from .lite_runtime import DELEGATES, available_delegates
+from .model_fetcher import DEFAULT_CACHE_DIR, FileLock
+
+DEFAULT_TUNING_PATH = os.path.join(DEFAULT_CACHE_DIR, 'interpreter_tuning.json')
+
+
+def cpu_signature():
+    """
+    Identifica la CPU del host: arquitectura, modelo, extensiones y núcleos disponibles.
+
+    Returns:
+        str: Firma estable entre arranques en el mismo tipo de máquina
+    """
+    model, flags = platform.processor(), ''
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                key = key.strip()
+                if key in ('model name', 'Hardware') and not model:
+                    model = value.strip()
+                elif key in ('flags', 'Features') and not flags:
+                    flags = value.strip()
+                if model and flags:
+                    break
+    except OSError:
+        pass
+    digest = hashlib.sha256(f'{model}|{flags}'.encode('utf-8')).hexdigest()[:12]
+    return f'{platform.machine()}-{digest}-{available_cpus()}cpu'
+
+
+def configured_workers():
+    """Workers del servidor: GUNICORN_WORKERS (lo exporta gunicorn.conf.py) o 1."""
+    return max(1, int(os.getenv('GUNICORN_WORKERS', '1')))
+
+
+def candidate_settings(cpus, workers, pool_size=None, delegates=DELEGATES):
+    """
+    Configuraciones a medir para un worker.
+
+    Args:
+        cpus (int): CPUs disponibles en el host
+        workers (int): Procesos worker que las comparten
+        pool_size (int): Tamaño del pool fijado por configuración, o None
+            para repartirlo según num_threads
+        delegates (tuple): Delegados de CPU a probar
+
+    Returns:
+        list: Diccionarios con num_threads, pool_size y delegate
+    """
+    budget = max(1, cpus // max(1, workers))
+    # Con el pool fijo solo se reparten los núcleos que le tocan a cada intérprete
+    max_threads = max(1, budget // pool_size) if pool_size else budget
+    threads = []
+    t = 1
+    while t <= max_threads:
+        threads.append(t)
+        t *= 2
+    if threads[-1] != max_threads:
+        threads.append(max_threads)
+    return [
+        {
+            'num_threads': t,
+            'pool_size': pool_size or max(1, budget // t),
+            'delegate': delegate,
+        }
+        for delegate in delegates for t in threads
+    ]
+
+
+def measure_setting(loader, num_threads, pool_size, delegate, duration=1.0):
+    """
+    Mide el throughput de una configuración con inferencias de una imagen.
+
+    Args:
+        loader (ModelLoader): Modelo cargado
+        num_threads (int): Hilos por intérprete
+        pool_size (int): Intérpretes ejecutando a la vez
+        delegate (str): Delegado de CPU ('xnnpack' o 'none')
+        duration (float): Segundos de medición (después de una inferencia de calentamiento)
+
+    Returns:
+        dict: throughput (imágenes/s) y p50_ms (latencia de invoke)
+    """
+    height, width, channels = loader.get_input_shape()
+    blank = np.zeros((height, width, channels), dtype=np.uint8)
+    members = [
+        PooledInterpreter(loader.new_interpreter(num_threads, delegate)) for _ in range(pool_size)
+    ]
+    for member in members:
+        member.resize_input_if_needed(1)
+        loader.input_writer.write(member.interpreter, blank)
+        member.interpreter.invoke()
+
+    latencies = [[] for _ in members]
+    barrier = threading.Barrier(len(members) + 1)
+    stop_at = [0.0]
+
+    def run(index, member):
+        barrier.wait()
+        while True:
+            start = time.perf_counter()
+            if start >= stop_at[0]:
+                return
+            loader.input_writer.write(member.interpreter, blank)
+            member.interpreter.invoke()
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=run, args=(i, member), daemon=True)
+        for i, member in enumerate(members)
+    ]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    stop_at[0] = start + duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    all_latencies = [lat for per_member in latencies for lat in per_member]
+    return {
+        'throughput': round(len(all_latencies) / elapsed, 2),
+        'p50_ms': round(float(np.median(all_latencies)) * 1000.0, 3) if all_latencies else None,
+    }
+
+
+class InterpreterTuner:
+    """Elige y recuerda num_threads, tamaño del pool y delegado de cada modelo."""
+
+    def __init__(self, path=None, workers=None, duration=1.0):
+        """
+        Args:
+            path (str): Archivo JSON con los resultados guardados
+            workers (int): Procesos worker que comparten la CPU; por defecto
+                configured_workers() en el momento de ajustar
+            duration (float): Segundos de medición de cada candidato
+        """
+        self.path = path or DEFAULT_TUNING_PATH
+        self.workers = workers
+        self.duration = duration
+
+    def key(self, loader, workers, pool_size=None):
+        """Clave del resultado: modelo, CPU, runtime, workers y pool fijado."""
+        return '/'.join((
+            loader.model_hash[:16], cpu_signature(), loader.runtime,
+            f'{workers}w', f'pool{pool_size or "auto"}',
+        ))
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, results):
+        # Rename atómico: un proceso nunca lee el archivo a medio escribir
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tuning-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, loader, pool_size=None):
+        """
+        Resultado guardado para este modelo y host, sin medir nada.
+
+        Returns:
+            dict: Configuración elegida, o None si no se ha ajustado
+        """
+        workers = self.workers or configured_workers()
+        return self._read().get(self.key(loader, workers, pool_size))
+
+    def tune(self, loader, pool_size=None, force=False):
+        """
+        Configuración para un modelo: la guardada o, si no hay, la mejor medida.
+
+        Args:
+            loader (ModelLoader): Modelo cargado
+            pool_size (int): Tamaño del pool fijado por configuración, o None
+            force (bool): Medir de nuevo aunque haya un resultado guardado
+
+        Returns:
+            dict: num_threads, pool_size, delegate, throughput, source
+                ('stored' o 'measured') y los candidatos medidos
+        """
+        workers = self.workers or configured_workers()
+        key = self.key(loader, workers, pool_size)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with FileLock(self.path + '.lock'):
+            results = self._read()
+            if key in results and not force:
+                return {**results[key], 'source': 'stored'}
+            print(f"Ajustando intérpretes de {loader.model_path} para {workers} worker(s)...")
+            candidates = []
+            for setting in candidate_settings(
+                available_cpus(), workers, pool_size, available_delegates()
+            ):
+                try:
+                    measured = measure_setting(loader, duration=self.duration, **setting)
+                except Exception as e:
+                    # Un delegado que no admite el modelo no impide probar los demás
+                    print(f"  {setting}: error ({e})")
+                    continue
+                candidates.append({**setting, **measured})
+                print(f"  {setting}: {measured['throughput']} img/s")
+            if not candidates:
+                raise RuntimeError("No se pudo medir ninguna configuración de intérpretes.")
+            best = max(candidates, key=lambda c: c['throughput'])
+            record = {
+                'num_threads': best['num_threads'],
+                'pool_size': best['pool_size'],
+                'delegate': best['delegate'],
+                'throughput': best['throughput'],
+                'workers': workers,
+                'measured_at': time.time(),
+                'candidates': candidates,
+            }
+            results[key] = record
+            self._write(results)
+        return {**record, 'source': 'measured'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('model', help='Archivo .tflite')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Workers que comparten la CPU (por defecto GUNICORN_WORKERS o 1)')
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='Tamaño del pool fijo (INTERPRETER_POOL_SIZE); por defecto se ajusta')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Medición de cada candidato')
+    parser.add_argument('--path', default=os.getenv('INTERPRETER_TUNING_PATH') or None,
+                        help='Archivo de resultados')
+    parser.add_argument('--force', action='store_true', help='Medir aunque haya un resultado')
+    args = parser.parse_args()
+
+    from .model_loader import ModelLoader
+
+    loader = ModelLoader(args.model)
+    tuner = InterpreterTuner(args.path, workers=args.workers, duration=args.seconds)
+    record = tuner.tune(loader, pool_size=args.pool_size, force=args.force)
+    for candidate in record['candidates']:
+        print(json.dumps(candidate))
+    print(
+        f"Elegido ({record['source']}): {record['num_threads']} hilos x {record['pool_size']} "
+        f"intérpretes, delegado {record['delegate']}, {record['throughput']} img/s -> {tuner.path}"
+    )
+
+
+if __name__ == '__main__':
+    main()
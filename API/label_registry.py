@@ -0,0 +1,102 @@
+"""
+Registro en memoria de los nombres de clase definidos en labels.json.
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class LabelRegistry:
+    """Nombres de clase indexados, recargados cuando cambia el archivo."""
+
+    def __init__(self, labels_path, check_interval=1.0):
+        """
+        Carga el archivo de etiquetas.
+
+        Args:
+            labels_path (str): Ruta a labels.json con formato {"0": ..., "1": ..., ...}
+            check_interval (float): Segundos mínimos entre comprobaciones del mtime
+        """
+        self.labels_path = labels_path
+        self.check_interval = check_interval
+        self._names = np.array([], dtype=object)
+        self._mtime = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._maybe_reload(force=True)
+
+    def _load(self):
+        """
+        Lee labels.json y lo convierte en un array indexado por clase.
+
+        Returns:
+            np.ndarray: Array de nombres; los índices sin etiqueta quedan como "Clase N"
+        """
+        with open(self.labels_path, 'r', encoding='utf-8') as f:
+            labels = json.load(f)
+        indexed = {int(k): v for k, v in labels.items()}
+        size = max(indexed, default=-1) + 1
+        return np.array(
+            [indexed.get(idx, f"Clase {idx}") for idx in range(size)], dtype=object
+        )
+
+    def _maybe_reload(self, force=False):
+        """Recarga las etiquetas si el mtime del archivo cambió."""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._reload_lock:
+            if not force and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.labels_path).st_mtime_ns
+                if mtime != self._mtime:
+                    # Reemplazo atómico de la referencia: los lectores ven el
+                    # array anterior o el nuevo, nunca uno a medio construir
+                    self._names = self._load()
+                    self._mtime = mtime
+            except (OSError, ValueError) as e:
+                # Conservar las etiquetas anteriores si el archivo no es legible
+                print(f"No se pudieron cargar las etiquetas desde {self.labels_path}: {e}")
+
+    def __len__(self):
+        self._maybe_reload()
+        return len(self._names)
+
+    def name(self, class_idx):
+        """
+        Retorna el nombre de una clase.
+
+        Args:
+            class_idx (int): Índice de la clase
+
+        Returns:
+            str: Nombre de la clase, o "Clase N" si no tiene etiqueta
+        """
+        self._maybe_reload()
+        names = self._names
+        if 0 <= class_idx < len(names):
+            return names[class_idx]
+        return f"Clase {class_idx}"
+
+    def names(self, class_indices):
+        """
+        Retorna los nombres de varias clases con una sola indexación.
+
+        Args:
+            class_indices (np.ndarray): Índices de clase de cualquier forma
+
+        Returns:
+            list: Nombres con la misma estructura que class_indices
+        """
+        self._maybe_reload()
+        names = self._names
+        class_indices = np.asarray(class_indices)
+        if class_indices.size and 0 <= class_indices.min() and class_indices.max() < len(names):
+            return names[class_indices].tolist()
+        return np.vectorize(self.name, otypes=[object])(class_indices).tolist()
@@ -0,0 +1,152 @@
+"""
+Selección del intérprete TensorFlow Lite sin importar TensorFlow completo.
+
+Importar `tensorflow` domina el tiempo de arranque de cada worker y agrega
+cientos de MB de RSS. Este módulo usa, en orden de preferencia, el paquete
+`ai_edge_litert` (LiteRT), `tflite_runtime` y, solo como último recurso,
+`tensorflow.lite`, que se importa de forma perezosa.
+
+La variable de entorno TFLITE_RUNTIME fuerza un runtime concreto:
+auto (por defecto), litert, tflite_runtime o tensorflow.
+
+También resuelve las opciones de delegado de CPU que acepta el intérprete:
+'xnnpack' (el delegado por defecto de los runtimes actuales) o 'none'
+(solo los kernels integrados, sin delegados por defecto).
+"""
+
+import importlib
+import os
+
+RUNTIME_PREFERENCE = ('litert', 'tflite_runtime', 'tensorflow')
+
+_RUNTIME_MODULES = {
+    'litert': 'ai_edge_litert.interpreter',
+    'tflite_runtime': 'tflite_runtime.interpreter',
+}
+
+# Delegados de CPU seleccionables (ver interpreter_options)
+DELEGATES = ('xnnpack', 'none')
+
+_resolved = None
+
+
+def _import_runtime(name):
+    """
+    Importa el módulo de un runtime concreto.
+
+    Args:
+        name (str): litert, tflite_runtime o tensorflow
+
+    Returns:
+        module: Módulo que expone Interpreter (y OpResolverType si existe)
+    """
+    if name == 'tensorflow':
+        import tensorflow as tf
+        return tf.lite
+    return importlib.import_module(_RUNTIME_MODULES[name])
+
+
+def resolve_runtime(preference=None):
+    """
+    Resuelve el runtime a usar y lo memoriza para el resto del proceso.
+
+    Args:
+        preference (str): auto, litert, tflite_runtime o tensorflow.
+            Por defecto el valor de TFLITE_RUNTIME
+
+    Returns:
+        tuple: (nombre del runtime, módulo con Interpreter)
+
+    Raises:
+        RuntimeError: Si ningún runtime está instalado
+    """
+    global _resolved
+    if _resolved is not None and preference is None:
+        return _resolved
+
+    preference = preference or os.getenv('TFLITE_RUNTIME', 'auto')
+    if preference == 'auto':
+        candidates = RUNTIME_PREFERENCE
+    elif preference in RUNTIME_PREFERENCE:
+        candidates = (preference,)
+    else:
+        raise ValueError(
+            f"TFLITE_RUNTIME inválido: {preference!r}. "
+            f"Use auto o uno de {', '.join(RUNTIME_PREFERENCE)}."
+        )
+
+    errors = []
+    for name in candidates:
+        try:
+            module = _import_runtime(name)
+        except ImportError as e:
+            errors.append(f"{name}: {e}")
+            continue
+        _resolved = (name, module)
+        return _resolved
+    raise RuntimeError(
+        "No hay ningún runtime de TensorFlow Lite disponible "
+        f"({'; '.join(errors)}). Instale ai-edge-litert o tensorflow-cpu."
+    )
+
+
+def get_interpreter_class():
+    """Retorna la clase Interpreter del runtime seleccionado."""
+    return resolve_runtime()[1].Interpreter
+
+
+def get_runtime_name():
+    """Retorna el nombre del runtime seleccionado (litert, tflite_runtime o tensorflow)."""
+    return resolve_runtime()[0]
+
+
+def get_op_resolver_type():
+    """
+    Enumeración OpResolverType del runtime seleccionado.
+
+    Returns:
+        enum: OpResolverType, o None si el runtime no permite elegirlo
+    """
+    module = resolve_runtime()[1]
+    resolver_type = getattr(module, 'OpResolverType', None)
+    if resolver_type is None:
+        # tf.lite la expone en tf.lite.experimental
+        resolver_type = getattr(getattr(module, 'experimental', None), 'OpResolverType', None)
+    return resolver_type
+
+
+def available_delegates():
+    """
+    Delegados de CPU que el runtime seleccionado permite elegir.
+
+    Returns:
+        tuple: Subconjunto de DELEGATES ('xnnpack' siempre está)
+    """
+    if get_op_resolver_type() is None:
+        return ('xnnpack',)
+    return DELEGATES
+
+
+def interpreter_options(delegate):
+    """
+    Argumentos del constructor de Interpreter para un delegado de CPU.
+
+    Args:
+        delegate (str): 'xnnpack' o 'none'
+
+    Returns:
+        dict: Argumentos adicionales (vacío para el comportamiento por defecto)
+
+    Raises:
+        ValueError: Si el delegado no existe o el runtime no permite elegirlo
+    """
+    if delegate == 'xnnpack':
+        return {}
+    if delegate not in available_delegates():
+        raise ValueError(
+            f"Delegado inválido o no disponible en {get_runtime_name()}: {delegate!r}. "
+            f"Use uno de {', '.join(available_delegates())}."
+        )
+    return {
+        'experimental_op_resolver_type': get_op_resolver_type().BUILTIN_WITHOUT_DEFAULT_DELEGATES,
+    }
@@ -0,0 +1,477 @@
+"""
+Métricas de latencia por etapa en formato de texto de Prometheus.
+
+Cada proceso acumula contadores e histogramas en memoria (un lock y una
+búsqueda binaria por observación) y los vuelca cada METRICS_FLUSH_INTERVAL
+segundos a un archivo JSON propio dentro de METRICS_DIR. GET /metrics suma
+los archivos de todos los procesos, de modo que el resultado es el total de
+todos los workers de gunicorn (o uvicorn) con independencia de cuál atienda
+la solicitud. Los archivos de workers ya terminados se conservan para que
+los contadores no retrocedan (sus gauges, en cambio, se descartan).
+
+Sin METRICS_DIR, el directorio es uno temporal por proceso dueño (el
+master de gunicorn, o el propio proceso si no hay master), compartido por
+todos sus workers. El dueño lo vacía al arrancar; con gunicorn lo hace
+on_starting (gunicorn.conf.py), también con METRICS_DIR.
+
+El volcado se hace siempre en un hilo temporizador, nunca en el hilo de una
+solicitud.
+"""
+
+import atexit
+import bisect
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from .profiling import current_trace
+
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+
+# Límites superiores de los buckets (el bucket +Inf es implícito)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (10e3, 50e3, 100e3, 250e3, 500e3, 1e6, 2.5e6, 5e6, 10e6, 20e6, 50e6)
+PIXELS_BUCKETS = (65536, 262144, 1e6, 2e6, 4e6, 8e6, 12e6, 16e6, 25e6, 50e6)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def metrics_owner_pid():
+    """
+    PID del proceso dueño del directorio de métricas por defecto.
+
+    Returns:
+        int: El master de gunicorn (lo publica gunicorn.conf.py en
+            METRICS_OWNER_PID), el supervisor si este proceso es un worker
+            creado con multiprocessing (uvicorn --workers) o, si no, el
+            propio proceso
+    """
+    owner = os.getenv('METRICS_OWNER_PID')
+    if owner and owner.isdigit():
+        return int(owner)
+    if multiprocessing.parent_process() is not None:
+        return os.getppid()
+    return os.getpid()
+
+
+def _process_alive(file_name):
+    """Indica si sigue vivo el proceso que escribió <pid>-<arranque>.json."""
+    try:
+        os.kill(int(file_name.split('-', 1)[0]), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    kind = 'counter'
+
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Incrementa el contador de la combinación de etiquetas indicada."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+    def reset(self):
+        # Tras un fork el lock pudo quedar tomado por un hilo que no existe en el hijo
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def merge(total, values):
+        for key, value in values.items():
+            total[key] = total.get(key, 0) + value
+
+    def render(self, merged):
+        lines = []
+        for key, value in sorted(merged.items()):
+            lines.append(f'{self.name}{_format_labels(json.loads(key))} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """
+    Valor instantáneo con etiquetas (p. ej. solicitudes en cola).
+
+    /metrics suma los valores de los procesos vivos; los de workers ya
+    terminados se descartan, a diferencia de los contadores.
+    """
+
+    kind = 'gauge'
+    live_only = True
+
+    def set(self, value, **labels):
+        """Fija el valor de la combinación de etiquetas indicada."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+        self.registry.maybe_flush()
+
+
+class Histogram:
+    """Histograma de buckets fijos con etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # Por combinación de etiquetas: [conteo por bucket..., +Inf, suma]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Registra una observación."""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        self.registry.maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque `with` en segundos."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): list(counts) for key, counts in self._values.items()}
+
+    def reset(self):
+        # Tras un fork el lock pudo quedar tomado por un hilo que no existe en el hijo
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def merge(total, values):
+        for key, counts in values.items():
+            current = total.get(key)
+            if current is None or len(current) != len(counts):
+                total[key] = list(counts)
+            else:
+                total[key] = [a + b for a, b in zip(current, counts)]
+
+    def render(self, merged):
+        lines = []
+        for key, counts in sorted(merged.items()):
+            pairs = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_value(float(bound))
+                lines.append(
+                    f'{self.name}_bucket{_format_labels(pairs + [["le", le]])} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{_format_labels(pairs)} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(pairs)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas del proceso y su volcado al directorio compartido."""
+
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        """
+        Args:
+            directory (str): Directorio compartido entre procesos; None = uno
+                temporal por proceso dueño (ver metrics_owner_pid)
+            flush_interval (float): Segundos mínimos entre volcados a disco
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._file_name = None
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def reset(self):
+        """
+        Descarta los valores heredados; se llama en cada proceso hijo tras un
+        fork (p. ej. con preload_app), que si no los reportaría como propios.
+        """
+        for metric in self.metrics.values():
+            metric.reset()
+        self._file_name = None
+        self._next_flush = 0.0
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self.metrics.setdefault(name, Counter(self, name, help_text))
+
+    def gauge(self, name, help_text):
+        return self.metrics.setdefault(name, Gauge(self, name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, help_text, buckets))
+
+    def _directory(self):
+        # Resuelto en el momento del volcado: gunicorn publica el PID del
+        # master en on_starting, después de importar la aplicación con preload_app
+        if self.directory:
+            return self.directory
+        return os.path.join(tempfile.gettempdir(), f'plant-api-metrics-{metrics_owner_pid()}')
+
+    def clear(self):
+        """
+        Borra los archivos de métricas del directorio compartido.
+
+        Lo llama el proceso dueño al arrancar, antes de que los workers
+        vuelquen nada: un PID reutilizado (el master es el PID 1 en cada
+        reinicio de un contenedor) no debe sumar los contadores de una
+        ejecución anterior.
+        """
+        directory = self._directory()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for file_name in names:
+            if file_name.endswith(('.json', '.json.tmp')):
+                try:
+                    os.remove(os.path.join(directory, file_name))
+                except OSError:
+                    pass
+
+    def maybe_flush(self):
+        """
+        Programa un volcado en el hilo temporizador, como muy pronto al
+        cumplirse el intervalo desde el anterior. La serialización y la
+        escritura del archivo quedan fuera del hilo que observa.
+        """
+        if self._timer is not None:
+            return
+        with self._timer_lock:
+            if self._timer is not None:
+                return
+            delay = max(0.0, self._next_flush - time.monotonic())
+            timer = threading.Timer(delay, self._deferred_flush)
+            timer.daemon = True
+            self._timer = timer
+            timer.start()
+
+    def _deferred_flush(self):
+        self._timer = None
+        self.flush()
+
+    def flush(self, wait=False):
+        """
+        Escribe las métricas del proceso en <directorio>/<pid>-<arranque>.json de forma atómica.
+
+        Args:
+            wait (bool): Si otro hilo está volcando, esperarlo y volcar de
+                nuevo en lugar de omitir este volcado
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return  # Otro hilo ya está volcando
+        try:
+            self._next_flush = time.monotonic() + self.flush_interval
+            directory = self._directory()
+            payload = {name: metric.snapshot() for name, metric in self.metrics.items()}
+            if not any(payload.values()):
+                return
+            os.makedirs(directory, exist_ok=True)
+            if self._file_name is None:
+                # PID más instante de arranque: un worker nuevo que reutilice
+                # el PID de uno terminado no pisa sus contadores
+                self._file_name = f'{os.getpid()}-{time.time_ns()}.json'
+            path = os.path.join(directory, self._file_name)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"No se pudieron volcar las métricas: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """
+        Suma las métricas de todos los procesos del directorio compartido.
+
+        Returns:
+            dict: Valores agregados por métrica
+        """
+        # El archivo propio debe reflejar las últimas observaciones, aunque
+        # el temporizador esté volcando en este momento
+        self.flush(wait=True)
+        merged = {name: {} for name in self.metrics}
+        directory = self._directory()
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            names = []
+        for file_name in names:
+            if not file_name.endswith('.json'):
+                continue
+            alive = None
+            try:
+                with open(os.path.join(directory, file_name), 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, values in payload.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                if getattr(metric, 'live_only', False):
+                    if alive is None:
+                        alive = _process_alive(file_name)
+                    if not alive:
+                        continue
+                metric.merge(merged[name], values)
+        return merged
+
+    def render(self):
+        """Retorna todas las métricas agregadas en formato de texto de Prometheus."""
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.render(merged[name]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+if METRICS_DIR is None and metrics_owner_pid() == os.getpid():
+    # Proceso sin master (flask run, python -m API.app, uvicorn sin --workers)
+    # o master de gunicorn con preload_app: el directorio es suyo
+    REGISTRY.clear()
+atexit.register(REGISTRY.flush)
+os.register_at_fork(after_in_child=REGISTRY.reset)
+
+# Tipo de contenido del formato de texto de Prometheus
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUESTS = REGISTRY.counter(
+    'plant_api_requests_total', 'Solicitudes HTTP atendidas por endpoint y código de estado.'
+)
+REQUEST_DURATION = REGISTRY.histogram(
+    'plant_api_request_duration_seconds', 'Duración total de las solicitudes HTTP por endpoint.'
+)
+ERRORS = REGISTRY.counter(
+    'plant_api_errors_total', 'Errores por endpoint y clase de excepción.'
+)
+STAGE_DURATION = REGISTRY.histogram(
+    'plant_api_stage_duration_seconds',
+    'Duración de cada etapa del pipeline (fetch, decode, resize, pool_wait, invoke, ...).'
+)
+BATCH_SIZE = REGISTRY.histogram(
+    'plant_api_batch_size', 'Imágenes por invocación del intérprete.', BATCH_SIZE_BUCKETS
+)
+CACHE_EVENTS = REGISTRY.counter(
+    'plant_api_cache_events_total',
+    'Eventos de la caché de resultados (local_hits, shared_hits, misses, stores).'
+)
+IMAGE_BYTES = REGISTRY.histogram(
+    'plant_api_image_bytes', 'Tamaño de las imágenes recibidas, en bytes.', BYTES_BUCKETS
+)
+IMAGE_PIXELS = REGISTRY.histogram(
+    'plant_api_image_pixels', 'Resolución original de las imágenes decodificadas, en píxeles.',
+    PIXELS_BUCKETS
+)
+ADMISSION_SHED = REGISTRY.counter(
+    'plant_api_shed_requests_total',
+    'Solicitudes rechazadas con 503 por el control de admisión, por motivo (queue_full, queue_timeout).'
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    'plant_api_admission_queue_depth', 'Solicitudes esperando plaza en el control de admisión.'
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    'plant_api_admission_in_flight', 'Solicitudes admitidas en curso.'
+)
+ADMISSION_LIMIT = REGISTRY.gauge(
+    'plant_api_admission_limit', 'Límite adaptativo de solicitudes en curso (suma de todos los workers).'
+)
+IMAGE_REJECTIONS = REGISTRY.counter(
+    'plant_api_image_rejections_total',
+    'Imágenes rechazadas antes de decodificarlas, por motivo (bytes, pixels, format).'
+)
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    'plant_api_deadline_exceeded_total',
+    'Solicitudes abandonadas por vencer su plazo, por etapa en la que se detectó.'
+)
+
+
+def observe_request(endpoint, status, seconds):
+    """Registra una solicitud HTTP terminada."""
+    REQUESTS.inc(endpoint=endpoint, status=str(status))
+    REQUEST_DURATION.observe(seconds, endpoint=endpoint)
+
+
+def observe_error(endpoint, error):
+    """Registra la clase de una excepción atendida por un endpoint."""
+    ERRORS.inc(endpoint=endpoint, error=type(error).__name__)
+
+
+def observe_stage(stage, seconds):
+    """Registra la duración de una etapa del pipeline (y en la traza de la solicitud, si la hay)."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Context manager que mide una etapa del pipeline."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
@@ -0,0 +1,197 @@
+"""
+Descarga verificada y reanudable del archivo del modelo.
+
+- Un lock de archivo (flock) por versión: si varios workers arrancan a la
+  vez, uno descarga y los demás esperan y usan su resultado.
+- Descarga en streaming con buffers grandes a un archivo .part, que se
+  reanuda con una solicitud Range si un proceso anterior murió a mitad.
+- Verificación del tamaño anunciado y del SHA-256 (si se conoce) antes de
+  publicar el archivo con un rename atómico. Un archivo en su ruta final
+  está siempre completo y verificado.
+- Caché local versionada: cada versión va en su propio directorio, con el
+  nombre del SHA-256 esperado (o, si no se conoce, de la URL).
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from urllib.parse import urlparse
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'plant-models')
+CHUNK_SIZE = 1024 * 1024
+PART_SUFFIX = '.part'
+
+
+class ModelFetchError(RuntimeError):
+    """Se lanza cuando el modelo no se puede descargar o no pasa la verificación."""
+
+
+def cached_model_path(url, cache_dir=DEFAULT_CACHE_DIR, sha256=None, filename=None):
+    """
+    Ruta local de una versión del modelo en la caché.
+
+    Args:
+        url (str): URL del modelo
+        cache_dir (str): Directorio raíz de la caché
+        sha256 (str): SHA-256 esperado, si se conoce
+        filename (str): Nombre del archivo (por defecto, el de la URL)
+
+    Returns:
+        str: <cache_dir>/<versión>/<archivo>
+    """
+    version = (sha256 or hashlib.sha256(url.encode('utf-8')).hexdigest()).lower()[:16]
+    filename = filename or os.path.basename(urlparse(url).path) or 'model.tflite'
+    return os.path.join(cache_dir, version, filename)
+
+
+class FileLock:
+    """
+    Lock exclusivo entre procesos sobre un archivo (flock). Lo usan la
+    descarga del modelo y la medición de interpreter_tuning.py.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _hash_file(path, hasher):
+    """Agrega al hasher el contenido de un archivo existente (lo ya descargado)."""
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+
+
+def _total_size(response):
+    """
+    Tamaño total del archivo según la respuesta, o None si no lo anuncia.
+
+    En una respuesta 206 o 416 se lee de Content-Range ("bytes a-b/total" o
+    "bytes */total"); en una 200, de Content-Length.
+    """
+    if response.status_code in (206, 416):
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def _download(url, part_path, session, chunk_size, timeout):
+    """
+    Descarga (o completa) el archivo .part.
+
+    Returns:
+        tuple: (hasher con todo el contenido, tamaño total anunciado o None)
+    """
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code == 416 and offset:
+            # El .part ya tiene todo el archivo (o más): se verifica tal cual
+            hasher = hashlib.sha256()
+            _hash_file(part_path, hasher)
+            return hasher, _total_size(response)
+        response.raise_for_status()
+        hasher = hashlib.sha256()
+        if response.status_code == 206 and offset:
+            _hash_file(part_path, hasher)
+            mode = 'ab'
+            print(f"Reanudando la descarga del modelo desde el byte {offset}...")
+        else:
+            # El servidor ignoró Range: empezar de cero
+            mode = 'wb'
+        total = _total_size(response)
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                hasher.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    return hasher, total
+
+
+def fetch_model(url, dest_path, sha256=None, session=None, chunk_size=CHUNK_SIZE,
+                timeout=(10, 60), retries=3):
+    """
+    Descarga el modelo a dest_path si aún no está, de forma segura entre procesos.
+
+    Args:
+        url (str): URL del modelo
+        dest_path (str): Ruta final (ver cached_model_path)
+        sha256 (str): SHA-256 esperado; sin él solo se verifica el tamaño anunciado
+        session (requests.Session): Sesión HTTP (por defecto, una nueva)
+        chunk_size (int): Tamaño de los fragmentos leídos de la red
+        timeout (tuple): Timeouts de conexión y de lectura, en segundos
+        retries (int): Reintentos ante errores de red, reanudando lo descargado
+
+    Returns:
+        str: dest_path
+
+    Raises:
+        ModelFetchError: Si la descarga falla tras los reintentos o el
+            contenido no coincide con el SHA-256 esperado
+    """
+    if os.path.exists(dest_path):
+        return dest_path
+    directory = os.path.dirname(dest_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    part_path = dest_path + PART_SUFFIX
+    session = session or requests.Session()
+
+    with FileLock(dest_path + '.lock'):
+        # Otro proceso pudo terminar la descarga mientras esperábamos el lock
+        if os.path.exists(dest_path):
+            return dest_path
+        print(f"Descargando modelo desde {url} a {dest_path}...")
+        for attempt in range(retries + 1):
+            try:
+                hasher, total = _download(url, part_path, session, chunk_size, timeout)
+                size = os.path.getsize(part_path)
+                if total is None or size >= total:
+                    break
+                error = f"conexión cerrada en el byte {size} de {total}"
+            except requests.exceptions.RequestException as e:
+                error = e
+            if attempt == retries:
+                raise ModelFetchError(f"Error al descargar el modelo: {error}")
+            print(f"Descarga interrumpida ({error}); reintentando...")
+            time.sleep(min(2 ** attempt, 10))
+
+        digest = hasher.hexdigest()
+        if (total is not None and size != total) or (sha256 and digest != sha256.lower()):
+            # Un .part corrupto no se reanuda: la próxima vez se empieza de cero
+            os.remove(part_path)
+            expected = sha256.lower() if sha256 else f'{total} bytes'
+            raise ModelFetchError(
+                f"El modelo descargado no pasó la verificación "
+                f"(esperado {expected}, obtenido {digest}, {size} bytes)."
+            )
+
+        os.replace(part_path, dest_path)
+        # Persistir el rename antes de que otros procesos confíen en el archivo
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        print("Descarga completada.")
+    return dest_path
@@ -3,48 +3,83 @@ Cargador y manejador del modelo TensorFlow Lite para predicciones.
 """
 
 import numpy as np
-import tensorflow as tf
-import threading
+import hashlib
+import mmap
 import os
-import requests # Se añade para descargar el modelo
+import threading
+import time
+
+from .interpreter_pool import InterpreterPool, available_cpus, threads_per_interpreter
+from .lite_runtime import get_interpreter_class, get_runtime_name, interpreter_options
+from .metrics import BATCH_SIZE, observe_stage
+from .model_fetcher import DEFAULT_CACHE_DIR, cached_model_path, fetch_model
+from .tensor_io import InputWriter, read_scores
+
+
+# Origen del modelo publicado, usado si MODEL_PATH no existe localmente
+DEFAULT_MODEL_URL = "https://huggingface.co/cmeneses99/IA_Detection/resolve/main/plant_species.tflite?download=true"
 
 
 class ModelLoader:
     """Clase para cargar y usar modelos TensorFlow Lite."""
     
-    def __init__(self, model_path):
+    def __init__(self, model_path, pool_size=None, checkout_timeout=30.0, input_scale=1.0,
+                 use_mmap=True, model_url=None, model_sha256=None, cache_dir=None,
+                 delegate='xnnpack', tuner=None):
         """
         Inicializa el cargador de modelo.
         
         Args:
             model_path (str): Ruta al archivo .tflite
+            pool_size (int): Número de intérpretes independientes. Por defecto
+                uno por CPU disponible
+            checkout_timeout (float): Segundos máximos de espera por un intérprete libre
+            input_scale (float): Factor aplicado a los píxeles [0, 255] al escribirlos
+                en la entrada (1.0 para modelos EfficientNet, que normalizan internamente)
+            use_mmap (bool): Dejar que el runtime mapee el archivo en memoria en lugar
+                de leerlo a un buffer privado del proceso
+            model_url (str): URL de la que descargar el modelo si model_path no existe
+            model_sha256 (str): SHA-256 esperado del modelo; se verifica tanto en
+                la descarga como en un archivo local
+            cache_dir (str): Directorio de la caché de modelos descargados (ver
+                model_fetcher.py)
+            delegate (str): Delegado de CPU de los intérpretes: 'xnnpack' o 'none'
+                (ver lite_runtime.interpreter_options)
+            tuner (InterpreterTuner): Si se indica, num_threads, el tamaño del
+                pool y el delegado se ajustan al host al crear el pool de cada
+                proceso (ver interpreter_tuning.py)
         """
         self.model_path = model_path
-        self.interpreter = None
+        self.model_url = model_url
+        self.model_sha256 = model_sha256.lower() if model_sha256 else None
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.input_scale = input_scale
+        self.use_mmap = use_mmap
+        # Tamaño pedido por configuración (None = automático), para el ajuste
+        self.requested_pool_size = pool_size
+        self.pool_size = pool_size or available_cpus()
+        self.num_threads = threads_per_interpreter(self.pool_size)
+        self.delegate = delegate
+        self.tuner = tuner
+        # Configuración ajustada aplicada (ver apply_tuning), o None
+        self.tuning = None
+        self.checkout_timeout = checkout_timeout
+        # Pool de intérpretes: cada request usa uno en exclusiva, sin lock global.
+        # Se crea en el primer uso dentro de cada proceso (ver la propiedad pool)
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        # Pools heredados de un proceso padre (ver la propiedad pool)
+        self._inherited_pools = []
+        self.model_file = None
+        self.model_content = None
+        self.runtime = None
+        self.model_hash = None
         self.input_details = None
         self.output_details = None
-        # Lock para evitar problemas en requests concurrentes
-        self.interpreter_lock = threading.Lock()
+        self.input_writer = None
         self._load_model()
 
-    def _download_model_if_not_exists(self, model_url, local_path):
-        """
-        Descarga el modelo si no existe localmente.
-        """
-        if not os.path.exists(local_path):
-            print(f"Descargando modelo desde {model_url} a {local_path}...")
-            try:
-                response = requests.get(model_url, stream=True, timeout=30)
-                response.raise_for_status() # Lanza un error para códigos de estado HTTP malos
-                with open(local_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                print("Descarga completada.")
-            except requests.exceptions.RequestException as e:
-                raise RuntimeError(f"Error al descargar el modelo: {e}")
-        else:
-            print(f"El modelo ya existe localmente en {local_path}.")
-    
     def _load_model(self):
         """Carga el modelo TensorFlow Lite."""
         try:
@@ -53,34 +88,137 @@ class ModelLoader:
             if os.path.exists(self.model_path):
                 model_path_to_use = self.model_path
                 print(f"Usando modelo local: {model_path_to_use}")
-            else:
-                # Fallback: intentar descargar si el archivo local no existe
+            elif self.model_url:
+                # Fallback: descargar a la caché local (/tmp por defecto, escribible en Vercel)
                 print(f"Modelo local no encontrado en {self.model_path}, intentando descargar...")
-                MODEL_DOWNLOAD_URL = "https://huggingface.co/cmeneses99/IA_Detection/resolve/main/plant_species.tflite?download=true"
-
-                # Intentar usar /tmp primero, si no existe o falla, usar el directorio actual
-                try:
-                    os.makedirs("/tmp", exist_ok=True)
-                    local_model_path = os.path.join("/tmp", os.path.basename(self.model_path))
-                    self._download_model_if_not_exists(MODEL_DOWNLOAD_URL, local_model_path)
-                    model_path_to_use = local_model_path
-                    print(f"Usando modelo descargado en /tmp: {model_path_to_use}")
-                except (OSError, PermissionError) as tmp_error:
-                    print(f"No se pudo usar /tmp: {tmp_error}, intentando directorio actual...")
-                    # Fallback: usar el directorio actual del proyecto
-                    local_model_path = os.path.join(os.getcwd(), os.path.basename(self.model_path))
-                    self._download_model_if_not_exists(MODEL_DOWNLOAD_URL, local_model_path)
-                    model_path_to_use = local_model_path
-                    print(f"Usando modelo descargado en directorio actual: {model_path_to_use}")
-
-            self.interpreter = tf.lite.Interpreter(model_path=model_path_to_use)
-            self.interpreter.allocate_tensors()
+                model_path_to_use = fetch_model(
+                    self.model_url,
+                    cached_model_path(
+                        self.model_url, self.cache_dir, self.model_sha256,
+                        filename=os.path.basename(self.model_path),
+                    ),
+                    sha256=self.model_sha256,
+                )
+                print(f"Usando modelo descargado: {model_path_to_use}")
+            else:
+                raise FileNotFoundError(f"No existe el archivo del modelo: {self.model_path}")
+
+            self.model_file = model_path_to_use
+            with open(model_path_to_use, 'rb') as f:
+                if self.use_mmap:
+                    # Con model_path el runtime mapea el archivo: sus páginas son
+                    # del page cache, compartidas por todos los workers, en vez
+                    # de una copia privada por proceso. El mapeo propio solo
+                    # sirve para calcular el hash sin leer el archivo a memoria
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        self.model_hash = hashlib.sha256(mapped).hexdigest()
+                else:
+                    # Un solo buffer del que se construyen todos los intérpretes
+                    self.model_content = f.read()
+                    self.model_hash = hashlib.sha256(self.model_content).hexdigest()
+            if self.model_sha256 and self.model_hash != self.model_sha256:
+                raise ValueError(
+                    f"El SHA-256 del modelo ({self.model_hash}) no coincide con el esperado "
+                    f"({self.model_sha256})."
+                )
+
+            # LiteRT / tflite_runtime si están instalados; TensorFlow solo como respaldo
+            self.runtime = get_runtime_name()
             
-            # Obtener detalles de entrada y salida
-            self.input_details = self.interpreter.get_input_details()
-            self.output_details = self.interpreter.get_output_details()
+            # Detalles de entrada y salida de un intérprete sin asignar: los
+            # delegados (XNNPACK) se aplican recién en allocate_tensors, así
+            # que no se crean hilos ni se reempaquetan pesos en este proceso
+            probe = self.new_interpreter(num_threads=1)
+            self.input_details = probe.get_input_details()
+            self.output_details = probe.get_output_details()
+            del probe
+            self.input_writer = InputWriter(self.input_details[0], input_scale=self.input_scale)
         except Exception as e:
             raise RuntimeError(f"Error al cargar el modelo: {str(e)}")
+
+    def new_interpreter(self, num_threads, delegate=None):
+        """
+        Crea un intérprete sin asignar desde el archivo mapeado o el buffer.
+
+        Args:
+            num_threads (int): Hilos del intérprete
+            delegate (str): Delegado de CPU; por defecto el del modelo
+        """
+        interpreter_class = get_interpreter_class()
+        options = interpreter_options(delegate or self.delegate)
+        if self.use_mmap:
+            return interpreter_class(model_path=self.model_file, num_threads=num_threads, **options)
+        return interpreter_class(
+            model_content=self.model_content, num_threads=num_threads, **options
+        )
+
+    def apply_tuning(self):
+        """
+        Aplica la configuración del ajuste automático: la guardada para este
+        modelo y host o, si no hay, la mejor tras medir los candidatos. Si
+        el ajuste falla se mantiene la configuración por defecto.
+        """
+        try:
+            tuning = self.tuner.tune(self, pool_size=self.requested_pool_size)
+        except Exception as e:
+            print(f"No se pudo ajustar los intérpretes de {self.model_path}: {e}")
+            return
+        self.num_threads = tuning['num_threads']
+        self.pool_size = tuning['pool_size']
+        self.delegate = tuning['delegate']
+        self.tuning = tuning
+
+    @property
+    def pool(self):
+        """
+        Pool de intérpretes del proceso actual, creado en su primer uso.
+        
+        Los intérpretes (y los hilos de XNNPACK) no sobreviven a un fork: con
+        preload_app el modelo se carga en el master de gunicorn y cada worker
+        crea su propio pool después del fork. Un pool heredado del padre no
+        se destruye en el hijo (liberarlo esperaría hilos que no existen);
+        solo deja de usarse.
+        """
+        pid = os.getpid()
+        if self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool_pid != pid:
+                    if self._pool is not None:
+                        self._inherited_pools.append(self._pool)
+                    if self.tuner is not None:
+                        # Antes de crear los intérpretes: puede medir con la CPU libre
+                        self.apply_tuning()
+                    self._pool = InterpreterPool(
+                        lambda: self.new_interpreter(self.num_threads),
+                        size=self.pool_size,
+                        checkout_timeout=self.checkout_timeout,
+                    )
+                    self._pool_pid = pid
+        return self._pool
+
+    def warm_up(self):
+        """
+        Crea los intérpretes del proceso actual y ejecuta una inferencia con
+        una imagen vacía en cada uno, para que la primera solicitud no pague
+        la asignación de tensores ni la preparación de XNNPACK.
+        """
+        height, width, channels = self.get_input_shape()
+        blank = np.zeros((height, width, channels), dtype=np.uint8)
+        for member in self.pool.members:
+            member.resize_input_if_needed(1)
+            self.input_writer.write(member.interpreter, blank)
+            member.interpreter.invoke()
+
+    def pool_stats(self):
+        """
+        Retorna la ocupación del pool sin crearlo.
+        
+        Returns:
+            dict: size, in_use y available (todos libres si aún no se creó)
+        """
+        if self._pool_pid != os.getpid():
+            return {'size': self.pool_size, 'in_use': 0, 'available': self.pool_size}
+        return self._pool.stats()
     
     def get_input_shape(self):
         """
@@ -97,76 +235,129 @@ class ModelLoader:
             return tuple(shape)
         return None
     
-    def predict(self, image_array):
+    def predict_batch(self, batch_array, checkout_timeout=None):
         """
-        Ejecuta una predicción sobre una imagen preprocesada.
+        Ejecuta una única inferencia sobre un lote de imágenes.
+        
+        Los píxeles se escriben directamente en el buffer de entrada del
+        intérprete y la salida se lee de su vista con una sola copia.
         
         Args:
-            image_array (np.ndarray): Array numpy de la imagen preprocesada
+            batch_array: Lote (N, H, W, C), imagen (H, W, C) o lista de
+                imágenes (H, W, C); uint8 en [0, 255] (ver resize_image) o
+                float32 preprocesado con preprocess_image
+            checkout_timeout (float): Segundos máximos de espera por un
+                intérprete libre; por defecto el del pool
             
         Returns:
-            tuple: (clase_predicha, confianza) donde confianza es un float entre 0 y 1
+            np.ndarray: Probabilidades por clase con forma (N, num_clases)
         """
-        if self.interpreter is None:
-            raise RuntimeError("Modelo no cargado. Llame a load_model() primero.")
-        
-        # Obtener la forma esperada de entrada
-        input_shape = self.input_details[0]['shape']
-        
-        # Agregar dimensión de batch si es necesario
-        if len(image_array.shape) == 3:
-            image_array = np.expand_dims(image_array, axis=0)
-        
-        # Asegurar que el tipo de dato es correcto
-        input_dtype = self.input_details[0]['dtype']
-        if input_dtype == np.uint8:
-            # Si el modelo espera uint8, convertir de float [0,1] a uint8 [0,255]
-            if image_array.max() <= 1.0:
-                image_array = (image_array * 255).astype(np.uint8)
-            else:
-                image_array = image_array.astype(np.uint8)
+        if isinstance(batch_array, np.ndarray) and batch_array.ndim == 3:
+            batch_size = 1
         else:
-            image_array = image_array.astype(input_dtype)
+            batch_size = len(batch_array)
         
-        # Establecer el tensor de entrada y ejecutar inferencia con lock
-        # para evitar problemas de concurrencia en Flask con m?ltiples requests
-        with self.interpreter_lock:
-            self.interpreter.set_tensor(self.input_details[0]['index'], image_array)
+        # Tomar un intérprete libre del pool; cada uno se usa por un solo
+        # hilo a la vez, así que requests concurrentes se ejecutan en paralelo
+        BATCH_SIZE.observe(batch_size)
+        with self.pool.checkout(checkout_timeout) as member:
+            t0 = time.perf_counter()
+            member.resize_input_if_needed(batch_size)
+            self.input_writer.write(member.interpreter, batch_array)
+            t1 = time.perf_counter()
             
             # Ejecutar la inferencia
-            self.interpreter.invoke()
+            member.interpreter.invoke()
+            t2 = time.perf_counter()
             
-            # Obtener las predicciones
-            output_data = self.interpreter.get_tensor(self.output_details[0]['index'])
-        
-        # Procesar la salida (asumiendo que es un array de probabilidades)
-        predictions = output_data[0]  # Remover dimensi?n de batch
+            # Copiar las predicciones antes de devolver el intérprete al pool
+            scores = read_scores(member.interpreter, self.output_details[0])
+        observe_stage('tensor_write', t1 - t0)
+        observe_stage('invoke', t2 - t1)
+        observe_stage('tensor_read', time.perf_counter() - t2)
+        return scores
+    
+    def predict(self, image_array):
+        """
+        Ejecuta una predicción sobre una imagen preprocesada.
         
-        # Obtener la clase con mayor confianza
-        class_idx = np.argmax(predictions)
-        confidence = float(predictions[class_idx])
+        Args:
+            image_array (np.ndarray): Array numpy de la imagen preprocesada
+            
+        Returns:
+            tuple: (clase_predicha, confianza) donde confianza es un float entre 0 y 1
+        """
+        predictions = self.predict_batch(image_array)[0]  # Remover dimensión de batch
+        return top_prediction(predictions)
+
+
+def top_prediction(predictions):
+    """
+    Obtiene la clase con mayor confianza de un vector de probabilidades.
+    
+    Args:
+        predictions (np.ndarray): Probabilidades por clase de una sola imagen
         
-        # Si las probabilidades no est?n normalizadas, normalizarlas
-        if predictions.sum() > 1.1:  # Tolerancia para errores de punto flotante
-            predictions = predictions / predictions.sum()
-            confidence = float(predictions[class_idx])
+    Returns:
+        tuple: (clase_predicha, confianza)
+    """
+    class_idx = np.argmax(predictions)
+    return int(class_idx), float(predictions[class_idx])
+
+
+def top_k(scores, k):
+    """
+    Obtiene las k clases con mayor confianza usando argpartition.
+    
+    Args:
+        scores (np.ndarray): Probabilidades (num_clases,) o lote (N, num_clases)
+        k (int): Número de clases a retornar
         
-        return int(class_idx), confidence
+    Returns:
+        tuple: (índices, confianzas) con forma (..., k), ordenados de mayor a menor
+    """
+    num_classes = scores.shape[-1]
+    k = max(1, min(int(k), num_classes))
+    if k < num_classes:
+        # Selección parcial O(n): solo las k mayores, sin ordenar el vector completo
+        indices = np.argpartition(scores, num_classes - k, axis=-1)[..., num_classes - k:]
+    else:
+        indices = np.broadcast_to(np.arange(num_classes), scores.shape)
+    values = np.take_along_axis(scores, indices, axis=-1)
+    order = np.argsort(-values, axis=-1)
+    return np.take_along_axis(indices, order, axis=-1), np.take_along_axis(values, order, axis=-1)
     
 
 # Instancia global del modelo (se inicializará en app.py)
 _model_instance = None
 
 
-def load_model(model_path):
+def load_model(model_path, pool_size=None, checkout_timeout=30.0, use_mmap=True,
+               model_url=DEFAULT_MODEL_URL):
     """
     Carga el modelo TensorFlow Lite globalmente.
     
+    Los intérpretes se crean en el primer uso dentro de cada proceso; ver
+    init_interpreters para crearlos por adelantado.
+    
     Args:
         model_path (str): Ruta al archivo .tflite
+        pool_size (int): Número de intérpretes del pool (por defecto, uno por CPU)
+        checkout_timeout (float): Segundos máximos de espera por un intérprete libre
+        use_mmap (bool): Mapear el archivo en memoria en lugar de leerlo
+        model_url (str): URL de la que descargarlo si model_path no existe
     """
     global _model_instance
-    _model_instance = ModelLoader(model_path)
+    _model_instance = ModelLoader(
+        model_path, pool_size=pool_size, checkout_timeout=checkout_timeout, use_mmap=use_mmap,
+        model_url=model_url,
+    )
+
+
+def init_interpreters():
+    """Crea los intérpretes del proceso actual si aún no existen."""
+    if _model_instance is not None:
+        _model_instance.pool
 
 def predict(image_array):
     """
@@ -183,6 +374,21 @@ def predict(image_array):
     
     return _model_instance.predict(image_array)
 
+def predict_batch(batch_array):
+    """
+    Ejecuta una inferencia por lotes usando el modelo cargado globalmente.
+    
+    Args:
+        batch_array (np.ndarray): Lote (N, H, W, C) de imágenes preprocesadas
+        
+    Returns:
+        np.ndarray: Probabilidades por clase con forma (N, num_clases)
+    """
+    if _model_instance is None:
+        raise RuntimeError("Modelo no cargado. Llame a load_model() primero.")
+    
+    return _model_instance.predict_batch(batch_array)
+
 def is_model_loaded():
     """
     Verifica si el modelo está cargado.
@@ -205,5 +411,10 @@ def get_model_info():
     
     return {
         'model_path': _model_instance.model_path,
-        'input_shape': _model_instance.get_input_shape()
+        'input_shape': _model_instance.get_input_shape(),
+        'model_hash': _model_instance.model_hash,
+        'runtime': _model_instance.runtime,
+        'num_threads': _model_instance.num_threads,
+        'delegate': _model_instance.delegate,
+        'pool': _model_instance.pool_stats()
     }
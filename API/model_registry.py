@@ -0,0 +1,574 @@
+"""
+Registro de modelos con nombre y versión, con cambio en caliente.
+
+Cada modelo se identifica como "nombre:versión" y tiene su propio archivo de
+etiquetas, su pool de intérpretes y, si el micro-batching está activo, su
+propio MicroBatcher. Para cada nombre hay una versión activa, y uno de los
+nombres es el modelo por defecto. Una solicitud puede pedir:
+
+    None              el modelo por defecto (su versión activa)
+    "nombre"          la versión activa de ese nombre
+    "nombre:versión"  una versión concreta
+
+Las versiones nuevas se cargan y se calientan en un hilo de fondo. Solo
+después se publican y, si corresponde, pasan a ser las activas. El cambio es
+atómico. Cada solicitud toma su modelo al empezar (use) y lo conserva hasta
+terminar, de modo que las solicitudes en curso terminan con la versión
+anterior. Una versión retirada libera sus recursos cuando termina su última
+solicitud.
+
+Con un archivo de configuración (MODEL_REGISTRY_PATH), el registro lo
+vigila por su mtime y se reconcilia con él. Es la forma de cambiar de
+modelo en todos los workers de gunicorn a la vez, porque cada worker tiene
+su propio registro.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .label_registry import LabelRegistry
+from .model_loader import ModelLoader
+
+
+class ModelNotFoundError(ValueError):
+    """Se lanza cuando se pide un modelo o una versión que no está cargada."""
+
+
+def parse_model_ref(ref):
+    """
+    Separa una referencia "nombre[:versión]".
+
+    Returns:
+        tuple: (nombre, versión o None)
+    """
+    name, _, version = str(ref).partition(':')
+    return name.strip(), (version.strip() or None)
+
+
+def tuning_summary(tuning):
+    """
+    Resumen del ajuste automático de un modelo para info() (sin los candidatos).
+
+    Returns:
+        dict: source, throughput y measured_at, o None si no se ajustó
+    """
+    if tuning is None:
+        return None
+    return {key: tuning[key] for key in ('source', 'throughput', 'measured_at')}
+
+
+class ModelEntry:
+    """Una versión cargada de un modelo, con sus etiquetas y solicitudes en curso."""
+
+    def __init__(self, name, version, loader, labels, batcher_factory=None):
+        """
+        Args:
+            name (str): Nombre del modelo
+            version (str): Versión
+            loader (ModelLoader): Modelo cargado
+            labels (LabelRegistry): Nombres de sus clases
+            batcher_factory (callable): Recibe el ModelLoader y retorna un
+                MicroBatcher, o None si el micro-batching está desactivado
+        """
+        self.name = name
+        self.version = version
+        self.key = f'{name}:{version}'
+        self.loader = loader
+        self.labels = labels
+        height, width = loader.get_input_shape()[:2]
+        self.target_size = (int(width), int(height))
+        self.loaded_at = time.time()
+        self.batcher_factory = batcher_factory
+        self.retired = False
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._batcher = None
+        self._batcher_pid = None
+
+    def get_batcher(self):
+        """Micro-batcher del proceso actual para este modelo (None si está desactivado)."""
+        if self.batcher_factory is None:
+            return None
+        pid = os.getpid()
+        if self._batcher_pid != pid:
+            with self._lock:
+                if self._batcher_pid != pid:
+                    # Los hilos de un batcher heredado por fork no existen en este proceso
+                    self._batcher = self.batcher_factory(self.loader)
+                    self._batcher_pid = pid
+        return self._batcher
+
+    def init_worker(self, warm_up=True):
+        """Crea los intérpretes (y el batcher) de este modelo en el proceso actual."""
+        if warm_up:
+            self.loader.warm_up()
+        self.get_batcher()
+
+    def acquire(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            shutdown = self.retired and self._in_flight == 0
+        if shutdown:
+            self._shutdown()
+
+    def retire(self):
+        """Marca la versión como retirada; se libera al terminar su última solicitud."""
+        with self._lock:
+            self.retired = True
+            shutdown = self._in_flight == 0
+        if shutdown:
+            self._shutdown()
+
+    def _shutdown(self):
+        batcher = self._batcher if self._batcher_pid == os.getpid() else None
+        self._batcher = None
+        if batcher is not None:
+            # Desde otro hilo: close() espera a que se vacíe la cola del batcher
+            threading.Thread(target=batcher.close, daemon=True).start()
+        print(f"Modelo retirado: {self.key}")
+
+    def info(self):
+        """
+        Retorna la información del modelo (mismas claves que get_model_info, más nombre y versión).
+
+        Returns:
+            dict: Descripción del modelo
+        """
+        return {
+            'name': self.name,
+            'version': self.version,
+            'key': self.key,
+            'model_path': self.loader.model_path,
+            'labels_path': self.labels.labels_path,
+            'input_shape': [int(dim) for dim in self.loader.get_input_shape()],
+            'model_hash': self.loader.model_hash,
+            'runtime': self.loader.runtime,
+            'num_threads': self.loader.num_threads,
+            'delegate': self.loader.delegate,
+            'tuning': tuning_summary(self.loader.tuning),
+            'pool': self.loader.pool_stats(),
+            'in_flight': self._in_flight,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Modelos cargados, versión activa de cada uno y modelo por defecto."""
+
+    def __init__(self, default_labels_path, loader_options=None, batcher_factory=None,
+                 config_path=None, check_interval=5.0):
+        """
+        Args:
+            default_labels_path (str): Etiquetas de los modelos que no indican las suyas
+            loader_options (dict): Argumentos adicionales de ModelLoader
+            batcher_factory (callable): Ver ModelEntry
+            config_path (str): Archivo JSON de modelos a vigilar, o None
+            check_interval (float): Segundos mínimos entre comprobaciones del mtime
+        """
+        self.default_labels_path = default_labels_path
+        self.loader_options = dict(loader_options or {})
+        self.batcher_factory = batcher_factory
+        self.config_path = config_path
+        self.check_interval = check_interval
+        # Procesos que aún no deben crear intérpretes (master de gunicorn con preload)
+        self.warm_up_on_load = True
+        self._entries = {}   # nombre -> {versión: ModelEntry}
+        self._active = {}    # nombre -> versión activa
+        self._default = None
+        # Cargas en segundo plano: clave -> 'loading' o mensaje de error
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._config_mtime = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    # -- Consulta ---------------------------------------------------------
+
+    def _lookup(self, ref):
+        if ref is None or ref == '':
+            if self._default is None:
+                raise RuntimeError("Modelo no cargado. Revise MODEL_PATH o MODEL_REGISTRY_PATH.")
+            name, version = self._default, None
+        else:
+            name, version = parse_model_ref(ref)
+        versions = self._entries.get(name)
+        if not versions:
+            raise ModelNotFoundError(f"Modelo desconocido: {name}.")
+        version = version or self._active.get(name)
+        entry = versions.get(version)
+        if entry is None:
+            raise ModelNotFoundError(f"Versión desconocida del modelo {name}: {version}.")
+        return entry
+
+    def resolve(self, ref=None):
+        """
+        Retorna el modelo de una referencia, sin reservarlo (ver use).
+
+        Raises:
+            ModelNotFoundError: Si el modelo o la versión no están cargados
+            RuntimeError: Si no hay ningún modelo cargado
+        """
+        self.maybe_reload()
+        with self._lock:
+            return self._lookup(ref)
+
+    @contextmanager
+    def use(self, ref=None):
+        """
+        Reserva un modelo durante el bloque `with`.
+
+        Aunque el modelo por defecto cambie en el medio, el bloque usa siempre
+        la misma versión, y una versión retirada no se libera hasta que
+        termine.
+
+        Yields:
+            ModelEntry: Modelo a usar en la solicitud
+        """
+        self.maybe_reload()
+        with self._lock:
+            entry = self._lookup(ref)
+            entry.acquire()
+        try:
+            yield entry
+        finally:
+            entry.release()
+
+    def default_entry(self):
+        """Modelo por defecto, o None si no hay ninguno cargado."""
+        with self._lock:
+            try:
+                return self._lookup(None)
+            except (RuntimeError, ModelNotFoundError):
+                return None
+
+    def entries(self):
+        """Lista de todos los modelos cargados."""
+        with self._lock:
+            return [entry for versions in self._entries.values() for entry in versions.values()]
+
+    def describe(self):
+        """
+        Estado del registro para GET /models.
+
+        Returns:
+            dict: default, models (con active por versión) y loading
+        """
+        with self._lock:
+            models = []
+            for name, versions in self._entries.items():
+                for version, entry in versions.items():
+                    models.append({**entry.info(), 'active': self._active.get(name) == version})
+            default = None
+            if self._default is not None and self._default in self._active:
+                default = f'{self._default}:{self._active[self._default]}'
+            return {'default': default, 'models': models, 'loading': dict(self._loading)}
+
+    # -- Carga y publicación ----------------------------------------------
+
+    def _build(self, name, version, model_path, labels_path, warm_up, model_url=None,
+               sha256=None):
+        loader = ModelLoader(
+            model_path, model_url=model_url, model_sha256=sha256, **self.loader_options
+        )
+        # Sin versión explícita, la identifica el contenido del archivo
+        version = str(version) if version else loader.model_hash[:12]
+        entry = ModelEntry(
+            name, version, loader, LabelRegistry(labels_path or self.default_labels_path),
+            batcher_factory=self.batcher_factory,
+        )
+        if warm_up:
+            entry.init_worker()
+        return entry
+
+    def _publish(self, entry, activate, make_default, retire_previous):
+        """Publica una versión cargada y, si corresponde, la activa de forma atómica."""
+        retired = []
+        with self._lock:
+            versions = self._entries.setdefault(entry.name, {})
+            replaced = versions.get(entry.version)
+            versions[entry.version] = entry
+            if replaced is not None:
+                retired.append(replaced)
+            previous = self._active.get(entry.name)
+            if activate or previous is None:
+                self._active[entry.name] = entry.version
+                if retire_previous and previous not in (None, entry.version):
+                    retired.append(versions.pop(previous))
+            if make_default or self._default is None:
+                self._default = entry.name
+            self._loading.pop(entry.key, None)
+        print(f"Modelo publicado: {entry.key} ({entry.loader.model_path})")
+        for old in retired:
+            old.retire()
+
+    def register(self, name, version, model_path, labels_path=None, activate=True,
+                 make_default=False, retire_previous=False, model_url=None, sha256=None):
+        """
+        Carga un modelo en el hilo actual y lo publica.
+
+        Args:
+            name (str): Nombre del modelo
+            version (str): Versión; None para usar los 12 primeros dígitos del hash
+            model_path (str): Ruta al archivo .tflite
+            labels_path (str): Etiquetas del modelo (por defecto, las del registro)
+            activate (bool): Pasar a ser la versión activa de su nombre
+            make_default (bool): Pasar a ser el modelo por defecto
+            retire_previous (bool): Retirar la versión que estaba activa
+            model_url (str): URL de la que descargarlo si model_path no existe
+            sha256 (str): SHA-256 esperado del archivo
+
+        Returns:
+            ModelEntry: El modelo cargado
+
+        Raises:
+            RuntimeError: Si el modelo no se puede cargar
+        """
+        entry = self._build(name, version, model_path, labels_path, self.warm_up_on_load,
+                            model_url=model_url, sha256=sha256)
+        self._publish(entry, activate, make_default, retire_previous)
+        return entry
+
+    def load_async(self, name, version, model_path, labels_path=None, activate=True,
+                   make_default=False, retire_previous=True, model_url=None, sha256=None):
+        """
+        Carga y calienta un modelo en un hilo de fondo; mientras tanto las
+        solicitudes siguen usando la versión activa. Los argumentos son los
+        de register.
+
+        Returns:
+            str: Clave "nombre:versión" de la carga
+
+        Raises:
+            ValueError: Si esa versión ya se está cargando
+        """
+        key = f'{name}:{version}'
+        with self._lock:
+            if self._loading.get(key) == 'loading':
+                raise ValueError(f"El modelo {key} ya se está cargando.")
+            self._loading[key] = 'loading'
+
+        def load():
+            try:
+                self.register(name, version, model_path, labels_path, activate=activate,
+                              make_default=make_default, retire_previous=retire_previous,
+                              model_url=model_url, sha256=sha256)
+            except Exception as e:
+                print(f"Error al cargar el modelo {key}: {e}")
+                with self._lock:
+                    self._loading[key] = str(e)
+
+        threading.Thread(target=load, name=f'model-load-{key}', daemon=True).start()
+        return key
+
+    def set_default(self, ref):
+        """
+        Cambia el modelo por defecto (y, con "nombre:versión", la versión activa).
+
+        Raises:
+            ModelNotFoundError: Si el modelo o la versión no están cargados
+        """
+        name, version = parse_model_ref(ref)
+        with self._lock:
+            versions = self._entries.get(name)
+            if not versions:
+                raise ModelNotFoundError(f"Modelo desconocido: {name}.")
+            if version is not None:
+                if version not in versions:
+                    raise ModelNotFoundError(f"Versión desconocida del modelo {name}: {version}.")
+                self._active[name] = version
+            self._default = name
+
+    def unload(self, ref):
+        """
+        Retira una versión que no esté activa.
+
+        Returns:
+            ModelEntry: La versión retirada
+
+        Raises:
+            ModelNotFoundError: Si no está cargada
+            ValueError: Si es la versión activa de su modelo
+        """
+        name, version = parse_model_ref(ref)
+        with self._lock:
+            entry = self._lookup(f'{name}:{version}' if version else name)
+            if self._active.get(name) == entry.version:
+                raise ValueError(f"{entry.key} es la versión activa; active otra antes de retirarla.")
+            del self._entries[name][entry.version]
+        entry.retire()
+        return entry
+
+    def init_worker(self):
+        """Crea intérpretes y batchers de todos los modelos en el proceso actual."""
+        self.warm_up_on_load = True
+        for entry in self.entries():
+            entry.init_worker()
+
+    # -- Archivo de configuración -----------------------------------------
+
+    def _read_config(self):
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        models = []
+        for spec in config.get('models', []):
+            if not spec.get('name') or not spec.get('version') or not spec.get('model_path'):
+                raise ValueError(f"Modelo incompleto en {self.config_path}: {spec}")
+            models.append(spec)
+        return config.get('default'), models
+
+    def load_config(self, background=False):
+        """
+        Reconcilia el registro con el archivo de configuración: carga las
+        versiones nuevas, activa las marcadas con "active" (o la última de
+        cada nombre) y retira las que ya no figuran.
+
+        Args:
+            background (bool): Cargar los modelos nuevos en hilos de fondo
+        """
+        if self._config_mtime is None:
+            self._config_mtime = os.path.getmtime(self.config_path)
+        default, models = self._read_config()
+        active = {}
+        for spec in models:
+            if spec.get('active') or spec['name'] not in active:
+                active[spec['name']] = str(spec['version'])
+        wanted = {(spec['name'], str(spec['version'])) for spec in models}
+
+        for spec in models:
+            name, version = spec['name'], str(spec['version'])
+            with self._lock:
+                loaded = version in self._entries.get(name, {})
+                loading = self._loading.get(f'{name}:{version}') == 'loading'
+                # La versión activa que ya no figura en el archivo se retira
+                # cuando se publique la que la reemplaza
+                retire_previous = (name, self._active.get(name)) not in wanted
+            make_default = default is not None and parse_model_ref(default)[0] == name
+            if loaded or loading:
+                continue
+            if background:
+                self.load_async(name, version, spec['model_path'], spec.get('labels_path'),
+                                activate=active[name] == version, make_default=make_default,
+                                retire_previous=retire_previous,
+                                model_url=spec.get('model_url'), sha256=spec.get('sha256'))
+            else:
+                self.register(name, version, spec['model_path'], spec.get('labels_path'),
+                              activate=active[name] == version, make_default=make_default,
+                              retire_previous=retire_previous,
+                              model_url=spec.get('model_url'), sha256=spec.get('sha256'))
+
+        # Activar versiones ya cargadas y retirar las que salieron del archivo;
+        # las que aún se están cargando se activan al publicarse
+        retired = []
+        with self._lock:
+            for name, version in active.items():
+                if version in self._entries.get(name, {}):
+                    self._active[name] = version
+            if default is not None:
+                default_name, default_version = parse_model_ref(default)
+                if default_name in self._entries:
+                    self._default = default_name
+                    if default_version in self._entries[default_name]:
+                        self._active[default_name] = default_version
+            for name in list(self._entries):
+                for version in list(self._entries[name]):
+                    if (name, version) not in wanted and self._active.get(name) != version:
+                        retired.append(self._entries[name].pop(version))
+                if not self._entries[name]:
+                    del self._entries[name]
+
+        for entry in retired:
+            entry.retire()
+
+    def set_default_in_config(self, ref):
+        """
+        Marca el modelo por defecto (y, con "nombre:versión", la versión
+        activa) en el archivo de configuración.
+
+        Solo cambia esos campos: las versiones que este proceso aún está
+        cargando siguen en el archivo.
+        """
+        if self.config_path is None:
+            return
+        name, version = parse_model_ref(ref)
+        _, models = self._read_config()
+        if version is not None:
+            for spec in models:
+                if spec['name'] == name:
+                    spec['active'] = str(spec['version']) == version
+        self._write_config(name, models)
+
+    def remove_from_config(self, name, version):
+        """Quita una versión del archivo de configuración, sin tocar las demás."""
+        if self.config_path is None:
+            return
+        default, models = self._read_config()
+        models = [spec for spec in models
+                  if (spec['name'], str(spec['version'])) != (name, str(version))]
+        self._write_config(default, models)
+
+    def add_to_config(self, name, version, model_path, labels_path=None, activate=True,
+                      make_default=False, keep_previous=False, model_url=None, sha256=None):
+        """
+        Agrega (o actualiza) una versión en el archivo de configuración.
+
+        Con activate y sin keep_previous, las demás versiones del mismo nombre
+        salen del archivo: cada worker las retira cuando la nueva esté lista.
+        """
+        default, models = self._read_config()
+        models = [spec for spec in models
+                  if (spec['name'], str(spec['version'])) != (name, str(version))]
+        if activate:
+            if not keep_previous:
+                models = [spec for spec in models if spec['name'] != name]
+            for spec in models:
+                if spec['name'] == name:
+                    spec['active'] = False
+        models.append({'name': name, 'version': version, 'model_path': model_path,
+                       'model_url': model_url, 'sha256': sha256,
+                       'labels_path': labels_path or self.default_labels_path,
+                       'active': activate})
+        self._write_config(name if make_default else default, models)
+
+    def _write_config(self, default, models):
+        tmp_path = f'{self.config_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'default': default, 'models': models}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.config_path)
+
+    def reload(self):
+        """Reconcilia con el archivo de configuración ahora, cargando en segundo plano."""
+        with self._reload_lock:
+            try:
+                self._config_mtime = os.path.getmtime(self.config_path)
+            except OSError:
+                pass
+            self.load_config(background=True)
+
+    def maybe_reload(self):
+        """Reconcilia con el archivo de configuración si su mtime cambió."""
+        if self.config_path is None:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            return
+        if mtime == self._config_mtime or not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._config_mtime = mtime
+            self.load_config(background=True)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo aplicar {self.config_path}: {e}")
+        finally:
+            self._reload_lock.release()
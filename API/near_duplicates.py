@@ -0,0 +1,257 @@
+"""
+Índice de resultados por hash perceptual, para imágenes casi duplicadas.
+
+La caché de result_cache.py solo acierta con los mismos bytes; una foto
+recodificada, redimensionada o ligeramente recortada por otra aplicación
+tiene otro hash. Aquí se guarda, junto a cada predicción, un hash
+perceptual de 64 bits calculado sobre los píxeles ya redimensionados a la
+entrada del modelo, y una imagen cuyo hash está a distancia de Hamming
+menor o igual que `max_distance` de uno guardado reutiliza su predicción
+sin invocar al intérprete.
+
+- Hashes: pHash (DCT de la imagen en gris a 32x32, más robusto) o dHash
+  (gradientes horizontales a 9x8, más barato).
+- Búsqueda por multi-index hashing: el hash se parte en max_distance + 1
+  trozos y, por el principio del palomar, un hash a distancia <=
+  max_distance coincide exactamente con el guardado en al menos un trozo.
+  Cada trozo indexa una tabla hash, así que la búsqueda solo compara la
+  distancia contra los candidatos de esas tablas.
+- Tamaño acotado con desalojo LRU y TTL, como LRUCache.
+- Verificación por muestreo: una fracción de los aciertos se clasifica de
+  todos modos y se cuenta si la clase coincide con la reutilizada, lo que
+  da la precisión real del índice frente a su tasa de aciertos.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from .metrics import CACHE_EVENTS
+
+HASH_BITS = 64
+HASH_METHODS = ('phash', 'dhash')
+
+
+def _dct_matrix(n):
+    """Matriz de la DCT-II de tamaño n (sin normalizar)."""
+    k = np.arange(n)[:, np.newaxis]
+    return np.cos(np.pi * (2 * np.arange(n) + 1) * k / (2 * n)).astype(np.float32)
+
+
+_DCT_32 = _dct_matrix(32)
+
+
+def _gray_thumbnail(pixels, size):
+    """Miniatura en gris de `size` (ancho, alto), reduciendo primero por un factor entero."""
+    image = Image.fromarray(np.asarray(pixels))
+    factor = min(image.width // size[0], image.height // size[1])
+    if factor > 1:
+        # reduce() promedia bloques enteros y es más rápido que resize(BOX)
+        image = image.reduce(factor)
+    return image.convert('L').resize(size, Image.Resampling.BOX)
+
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def phash(pixels):
+    """
+    Hash perceptual (pHash) de 64 bits.
+
+    Args:
+        pixels (np.ndarray): Imagen RGB uint8 (alto, ancho, 3)
+
+    Returns:
+        int: Hash de 64 bits
+    """
+    gray = _gray_thumbnail(pixels, (32, 32))
+    coeffs = _DCT_32 @ np.asarray(gray, dtype=np.float32) @ _DCT_32.T
+    # Frecuencias bajas, sin el término de continua (brillo medio)
+    low = coeffs[:8, :8].ravel()
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def dhash(pixels):
+    """
+    Hash de diferencias (dHash) de 64 bits.
+
+    Args:
+        pixels (np.ndarray): Imagen RGB uint8 (alto, ancho, 3)
+
+    Returns:
+        int: Hash de 64 bits
+    """
+    gray = np.asarray(_gray_thumbnail(pixels, (9, 8)), dtype=np.int16)
+    return _bits_to_int(gray[:, 1:] > gray[:, :-1])
+
+
+def image_hash(pixels, method='phash'):
+    """Hash perceptual de 64 bits con el método indicado ('phash' o 'dhash')."""
+    if method == 'dhash':
+        return dhash(pixels)
+    return phash(pixels)
+
+
+def hamming(a, b):
+    """Distancia de Hamming entre dos hashes."""
+    return bin(a ^ b).count('1')
+
+
+def _chunk_masks(chunks):
+    """Desplazamientos y máscaras que parten HASH_BITS en `chunks` trozos casi iguales."""
+    bounds = [round(i * HASH_BITS / chunks) for i in range(chunks + 1)]
+    return [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+
+
+class NearDuplicateIndex:
+    """Predicciones indexadas por hash perceptual, con búsqueda por distancia de Hamming."""
+
+    def __init__(self, max_entries=4096, max_distance=4, ttl=3600.0, method='phash',
+                 verify_rate=0.0):
+        """
+        Args:
+            max_entries (int): Número máximo de predicciones guardadas
+            max_distance (int): Distancia de Hamming máxima (de 64 bits) para
+                considerar dos imágenes la misma
+            ttl (float): Segundos de validez de cada predicción
+            method (str): 'phash' o 'dhash'
+            verify_rate (float): Fracción de aciertos que se clasifican de
+                todos modos para medir la precisión del índice
+        """
+        if method not in HASH_METHODS:
+            raise ValueError(f"Método de hash desconocido: {method}. Use {', '.join(HASH_METHODS)}.")
+        if not 0 <= max_distance < HASH_BITS // 2:
+            raise ValueError(f"max_distance debe estar entre 0 y {HASH_BITS // 2 - 1}.")
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.method = method
+        self.verify_rate = verify_rate
+        self._masks = _chunk_masks(max_distance + 1)
+        # (espacio, hash) -> (probabilidades, expiración), en orden de uso
+        self._entries = OrderedDict()
+        # Una tabla por trozo: (espacio, valor del trozo) -> hashes
+        self._tables = [{} for _ in self._masks]
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0, 'misses': 0, 'stores': 0, 'verified': 0, 'agreements': 0,
+        }
+
+    def hash(self, pixels):
+        """Hash perceptual de una imagen preprocesada, con el método del índice."""
+        return image_hash(pixels, self.method)
+
+    def _chunks(self, namespace, value):
+        return [(namespace, (value >> shift) & mask) for shift, mask in self._masks]
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        namespace, value = key
+        for table, chunk in zip(self._tables, self._chunks(namespace, value)):
+            bucket = table.get(chunk)
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del table[chunk]
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+        CACHE_EVENTS.inc(event=f'near_{name}')
+
+    def get(self, namespace, value):
+        """
+        Busca la predicción guardada más cercana a un hash.
+
+        Args:
+            namespace (str): Modelo y parámetros de preprocesamiento
+            value (int): Hash perceptual de la imagen
+
+        Returns:
+            tuple: (probabilidades, distancia), o (None, None) si no hay
+                ninguna dentro de max_distance
+        """
+        now = time.monotonic()
+        best = None
+        with self._lock:
+            candidates = set()
+            for table, chunk in zip(self._tables, self._chunks(namespace, value)):
+                candidates.update(table.get(chunk, ()))
+            for candidate in candidates:
+                distance = hamming(value, candidate)
+                if distance > self.max_distance or (best is not None and distance >= best[1]):
+                    continue
+                key = (namespace, candidate)
+                # Una entrada vencida se descarta sin ocultar a las demás candidatas
+                if self._entries[key][1] <= now:
+                    self._remove(key)
+                    continue
+                best = (candidate, distance)
+            if best is not None:
+                key = (namespace, best[0])
+                scores = self._entries[key][0]
+                self._entries.move_to_end(key)
+        if best is None:
+            self._count('misses')
+            return None, None
+        self._count('hits')
+        return scores, best[1]
+
+    def should_verify(self):
+        """Decide si un acierto se clasifica de todos modos para medir la precisión."""
+        return self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def verify(self, expected, scores):
+        """
+        Registra si la clase reutilizada coincide con la obtenida al clasificar.
+
+        Args:
+            expected (np.ndarray): Probabilidades que el índice habría reutilizado
+            scores (np.ndarray): Probabilidades del modelo para la imagen
+        """
+        self._count('verified')
+        if int(np.argmax(expected)) == int(np.argmax(scores)):
+            self._count('agreements')
+
+    def set(self, namespace, value, scores):
+        """Guarda la predicción de una imagen, desalojando la menos usada si hace falta."""
+        scores = np.ascontiguousarray(scores, dtype=np.float32)
+        scores.setflags(write=False)
+        key = (namespace, value)
+        with self._lock:
+            if key not in self._entries:
+                for table, chunk in zip(self._tables, self._chunks(namespace, value)):
+                    table.setdefault(chunk, set()).add(value)
+            self._entries[key] = (scores, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        self._count('stores')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Retorna los contadores del índice.
+
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos, entradas y, si hay
+                verificación, la fracción de aciertos con la misma clase
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else 0.0
+        counters['agreement_rate'] = (
+            round(counters['agreements'] / counters['verified'], 4) if counters['verified'] else None
+        )
+        counters['entries'] = len(self._entries)
+        counters['max_distance'] = self.max_distance
+        counters['method'] = self.method
+        return counters
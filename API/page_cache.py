@@ -0,0 +1,209 @@
+"""
+Respuestas HTML y estáticas renderizadas una vez y servidas desde memoria.
+
+Las páginas de estado y de predicción cambian muy poco (la primera solo
+cuando cambia el estado de los modelos), pero el balanceador consulta /home
+continuamente. Aquí cada página se renderiza una vez por estado y se guarda
+como CachedPage:
+
+- Cuerpo en UTF-8 y variantes precomprimidas con gzip y, si el paquete
+  `brotli` está instalado, con brotli. Se elige la variante según
+  Accept-Encoding y se responde con Vary: Accept-Encoding.
+- ETag (hash del cuerpo, distinto por codificación) y Last-Modified (cuándo
+  la página pasó a su estado actual); If-None-Match e If-Modified-Since
+  se responden con 304 Not Modified sin cuerpo.
+- Cache-Control propio de cada recurso: las páginas se revalidan siempre
+  y los recursos estáticos, con el hash en la URL, se guardan un año.
+
+CachedPage.respond() es independiente del framework: retorna estado, cuerpo
+y cabeceras, que Flask y Starlette convierten en su propia respuesta.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional: sin ella solo hay variante gzip
+    brotli = None
+
+# Páginas HTML: el navegador puede guardarlas, pero debe revalidarlas (304)
+# en cada uso para no quedarse con enlaces a recursos de otra versión
+REVALIDATE = 'no-cache'
+# Recursos con el hash del contenido en la URL: nunca cambian
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Codificaciones en orden de preferencia del servidor
+ENCODINGS = ('br', 'gzip')
+
+
+def parse_accept_encoding(value):
+    """
+    Codificaciones aceptadas por el cliente.
+
+    Args:
+        value (str): Cabecera Accept-Encoding, o None
+
+    Returns:
+        set: Codificaciones con q > 0 ('*' incluido si se acepta cualquiera)
+    """
+    accepted = set()
+    for item in (value or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def _http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+class CachedPage:
+    """Una respuesta ya renderizada, con sus variantes comprimidas y validadores."""
+
+    def __init__(self, body, content_type='text/html; charset=utf-8', cache_control=REVALIDATE):
+        """
+        Args:
+            body (str | bytes): Contenido de la respuesta
+            content_type (str): Cabecera Content-Type
+            cache_control (str): Cabecera Cache-Control
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.content_type = content_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        # Codificación -> (cuerpo, ETag); solo se guardan las compresiones que ahorran bytes
+        self.variants = {'identity': (body, f'"{digest}"')}
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+        self._etags = {etag for _, etag in self.variants.values()}
+        self.touch()
+
+    def touch(self, timestamp=None):
+        """Fija Last-Modified (segundos enteros, la resolución de la cabecera)."""
+        self.modified_at = int(timestamp if timestamp is not None else time.time())
+        self.last_modified = _http_date(self.modified_at)
+
+    def negotiate(self, accept_encoding):
+        """Codificación a servir según la cabecera Accept-Encoding."""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+    def is_not_modified(self, if_none_match, if_modified_since):
+        """
+        Evalúa las cabeceras condicionales de la solicitud.
+
+        If-None-Match tiene prioridad: si está presente se ignora If-Modified-Since.
+
+        Returns:
+            bool: True si la copia del cliente sigue vigente (304)
+        """
+        if if_none_match:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or not tags.isdisjoint(self._etags)
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return self.modified_at <= since
+        return False
+
+    def respond(self, headers):
+        """
+        Respuesta para una solicitud GET o HEAD.
+
+        Args:
+            headers: Cabeceras de la solicitud (Flask o Starlette)
+
+        Returns:
+            tuple: (código de estado, cuerpo en bytes, cabeceras de la respuesta)
+        """
+        encoding = self.negotiate(headers.get('Accept-Encoding'))
+        body, etag = self.variants[encoding]
+        response_headers = {
+            'ETag': etag,
+            'Last-Modified': self.last_modified,
+            'Cache-Control': self.cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if self.is_not_modified(headers.get('If-None-Match'), headers.get('If-Modified-Since')):
+            return 304, b'', response_headers
+        response_headers['Content-Type'] = self.content_type
+        if encoding != 'identity':
+            response_headers['Content-Encoding'] = encoding
+        return 200, body, response_headers
+
+
+class PageCache:
+    """Páginas renderizadas por nombre y estado, con desalojo LRU."""
+
+    def __init__(self, max_entries=32):
+        """
+        Args:
+            max_entries (int): Páginas guardadas como máximo (entre todos los nombres)
+        """
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        # Último estado servido de cada página, para fechar Last-Modified
+        self._current = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def get(self, name, state, render, cache_control=REVALIDATE):
+        """
+        Retorna la página `name` para un estado, renderizándola solo la primera vez.
+
+        Args:
+            name (str): Nombre de la página
+            state (tuple): Valores de los que depende el contenido (hashables)
+            render (callable): Función sin argumentos que retorna el HTML
+            cache_control (str): Cabecera Cache-Control de la página
+
+        Returns:
+            CachedPage: Página lista para responder
+        """
+        key = (name, state)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+        if page is None:
+            # Se renderiza fuera del lock; dos hilos pueden hacerlo a la vez
+            # la primera vez, con el mismo resultado
+            page = CachedPage(render(), cache_control=cache_control)
+            with self._lock:
+                self.renders += 1
+                page = self._pages.setdefault(key, page)
+                while len(self._pages) > self.max_entries:
+                    self._pages.popitem(last=False)
+        with self._lock:
+            if self._current.get(name) != state:
+                # La página vuelve a un estado ya renderizado: sigue siendo
+                # más nueva que la que el cliente pudo guardar
+                if name in self._current:
+                    page.touch()
+                self._current[name] = state
+        return page
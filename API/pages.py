@@ -0,0 +1,714 @@
+"""
+Páginas HTML de la API (estado y clasificador interactivo).
+
+Se mantienen separadas de los endpoints para que los distintos modos de
+servicio (Flask y ASGI) sirvan exactamente las mismas páginas.
+
+Las páginas se renderizan una vez por estado y se sirven ya comprimidas y
+con ETag (ver page_cache.py). Sus hojas de estilo y su JavaScript son
+recursos aparte, con el hash del contenido en la URL, que el navegador
+guarda sin volver a pedirlos.
+"""
+
+import hashlib
+import time
+
+from .page_cache import IMMUTABLE, CachedPage, PageCache
+
+PREDICT_STYLES = """
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+    padding: 20px;
+}
+
+.container {
+    max-width: 800px;
+    margin: 0 auto;
+    background: white;
+    border-radius: 20px;
+    box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+    padding: 40px;
+}
+
+h1 {
+    color: #333;
+    text-align: center;
+    margin-bottom: 10px;
+    font-size: 2em;
+}
+
+.subtitle {
+    text-align: center;
+    color: #666;
+    margin-bottom: 30px;
+}
+
+.upload-section {
+    margin-bottom: 30px;
+}
+
+.button-group {
+    display: flex;
+    gap: 15px;
+    justify-content: center;
+    flex-wrap: wrap;
+    margin-bottom: 20px;
+}
+
+.btn {
+    padding: 15px 30px;
+    border: none;
+    border-radius: 10px;
+    font-size: 16px;
+    font-weight: bold;
+    cursor: pointer;
+    transition: all 0.3s;
+    display: flex;
+    align-items: center;
+    gap: 8px;
+}
+
+.btn-primary {
+    background: #667eea;
+    color: white;
+}
+
+.btn-primary:hover {
+    background: #5568d3;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
+}
+
+.btn-secondary {
+    background: #48bb78;
+    color: white;
+}
+
+.btn-secondary:hover {
+    background: #38a169;
+    transform: translateY(-2px);
+    box-shadow: 0 5px 15px rgba(72, 187, 120, 0.4);
+}
+
+.btn:disabled {
+    opacity: 0.6;
+    cursor: not-allowed;
+    transform: none;
+}
+
+input[type="file"] {
+    display: none;
+}
+
+.preview-section {
+    text-align: center;
+    margin: 30px 0;
+}
+
+.preview-image {
+    max-width: 100%;
+    max-height: 400px;
+    border-radius: 15px;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+    display: none;
+    margin: 0 auto;
+}
+
+.preview-image.show {
+    display: block;
+}
+
+.camera-preview {
+    max-width: 100%;
+    max-height: 400px;
+    border-radius: 15px;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+    display: none;
+    margin: 0 auto;
+}
+
+.camera-preview.show {
+    display: block;
+}
+
+.camera-controls {
+    text-align: center;
+    margin-top: 15px;
+    display: none;
+}
+
+.camera-controls.show {
+    display: block;
+}
+
+.result-section {
+    margin-top: 30px;
+    padding: 20px;
+    background: #f7fafc;
+    border-radius: 15px;
+    display: none;
+}
+
+.result-section.show {
+    display: block;
+}
+
+.result-success {
+    background: #f0fff4;
+    border-left: 4px solid #48bb78;
+}
+
+.result-error {
+    background: #fff5f5;
+    border-left: 4px solid #f56565;
+}
+
+.result-title {
+    font-size: 1.5em;
+    font-weight: bold;
+    margin-bottom: 15px;
+    color: #333;
+}
+
+.result-class {
+    font-size: 1.8em;
+    color: #667eea;
+    font-weight: bold;
+    margin: 10px 0;
+}
+
+.result-confidence {
+    font-size: 1.2em;
+    color: #666;
+    margin: 10px 0;
+}
+
+.loading {
+    text-align: center;
+    padding: 20px;
+    display: none;
+}
+
+.loading.show {
+    display: block;
+}
+
+.spinner {
+    border: 4px solid #f3f3f3;
+    border-top: 4px solid #667eea;
+    border-radius: 50%;
+    width: 40px;
+    height: 40px;
+    animation: spin 1s linear infinite;
+    margin: 0 auto;
+}
+
+@keyframes spin {
+    0% { transform: rotate(0deg); }
+    100% { transform: rotate(360deg); }
+}
+
+.error-message {
+    color: #f56565;
+    font-weight: bold;
+}
+
+@media (max-width: 600px) {
+    .container {
+        padding: 20px;
+    }
+
+    h1 {
+        font-size: 1.5em;
+    }
+
+    .button-group {
+        flex-direction: column;
+    }
+
+    .btn {
+        width: 100%;
+        justify-content: center;
+    }
+}
+"""
+
+PREDICT_SCRIPT = """
+let stream = null;
+const fileInput = document.getElementById('fileInput');
+const previewImage = document.getElementById('previewImage');
+const cameraPreview = document.getElementById('cameraPreview');
+const cameraControls = document.querySelector('.camera-controls');
+const resultSection = document.getElementById('resultSection');
+const resultContent = document.getElementById('resultContent');
+const loading = document.querySelector('.loading');
+let capturedBlob = null;
+
+function openCamera() {
+    navigator.mediaDevices.getUserMedia({ video: { facingMode: 'environment' } })
+        .then(mediaStream => {
+            stream = mediaStream;
+            cameraPreview.srcObject = stream;
+            cameraPreview.classList.add('show');
+            cameraControls.classList.add('show');
+            previewImage.classList.remove('show');
+            resultSection.classList.remove('show');
+        })
+        .catch(err => {
+            alert('Error al acceder a la cámara: ' + err.message);
+        });
+}
+
+function stopCamera() {
+    if (stream) {
+        stream.getTracks().forEach(track => track.stop());
+        stream = null;
+    }
+    cameraPreview.classList.remove('show');
+    cameraControls.classList.remove('show');
+}
+
+function capturePhoto() {
+    const canvas = document.createElement('canvas');
+    canvas.width = cameraPreview.videoWidth;
+    canvas.height = cameraPreview.videoHeight;
+    canvas.getContext('2d').drawImage(cameraPreview, 0, 0);
+
+    canvas.toBlob(blob => {
+        capturedBlob = blob;
+        previewImage.src = URL.createObjectURL(blob);
+        previewImage.classList.add('show');
+        stopCamera();
+        uploadImage(blob);
+    }, 'image/jpeg');
+}
+
+function handleFileSelect(event) {
+    const file = event.target.files[0];
+    if (file) {
+        previewImage.src = URL.createObjectURL(file);
+        previewImage.classList.add('show');
+        resultSection.classList.remove('show');
+        uploadImage(file);
+    }
+}
+
+function uploadImage(imageBlob) {
+    const formData = new FormData();
+    formData.append('image_file', imageBlob, 'image.jpg');
+
+    loading.classList.add('show');
+    resultSection.classList.remove('show');
+
+    fetch('/predict', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json())
+    .then(data => {
+        loading.classList.remove('show');
+        displayResult(data);
+    })
+    .catch(error => {
+        loading.classList.remove('show');
+        displayError('Error al procesar la imagen: ' + error.message);
+    });
+}
+
+function displayResult(data) {
+    resultSection.classList.add('show');
+
+    if (data.success) {
+        resultSection.className = 'result-section show result-success';
+        resultContent.innerHTML = `
+            <div class="result-title">✅ Resultado de la Predicción</div>
+            <div class="result-class">${data.class}</div>
+            <div class="result-confidence">Confianza: ${data.confidence}</div>
+        `;
+    } else {
+        resultSection.className = 'result-section show result-error';
+        resultContent.innerHTML = `
+            <div class="result-title">❌ Error</div>
+            <div class="error-message">${data.error || 'Error desconocido'}</div>
+        `;
+    }
+}
+
+function displayError(message) {
+    resultSection.classList.add('show');
+    resultSection.className = 'result-section show result-error';
+    resultContent.innerHTML = `
+        <div class="result-title">❌ Error</div>
+        <div class="error-message">${message}</div>
+    `;
+}
+"""
+
+HOME_STYLES = """
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    margin: 0;
+    padding: 0;
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    min-height: 100vh;
+}
+.container {
+    background: white;
+    border-radius: 20px;
+    padding: 40px;
+    box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+    max-width: 600px;
+    width: 90%;
+}
+h1 {
+    color: #333;
+    text-align: center;
+    margin-bottom: 10px;
+}
+.status {
+    text-align: center;
+    margin: 30px 0;
+}
+.status-badge {
+    display: inline-block;
+    padding: 10px 30px;
+    border-radius: 25px;
+    font-size: 18px;
+    font-weight: bold;
+    color: white;
+    background: #4CAF50;
+    box-shadow: 0 4px 15px rgba(76, 175, 80, 0.4);
+}
+.info {
+    background: #f5f5f5;
+    border-radius: 10px;
+    padding: 20px;
+    margin-top: 20px;
+}
+.info-item {
+    margin: 15px 0;
+    padding: 10px;
+    border-left: 4px solid #667eea;
+    background: white;
+    border-radius: 5px;
+}
+.info-label {
+    font-weight: bold;
+    color: #555;
+    margin-bottom: 5px;
+}
+.info-value {
+    color: #333;
+    font-family: 'Courier New', monospace;
+}
+.endpoints {
+    margin-top: 30px;
+    padding-top: 20px;
+    border-top: 2px solid #eee;
+}
+.endpoint {
+    background: #e3f2fd;
+    padding: 15px;
+    margin: 10px 0;
+    border-radius: 8px;
+    border-left: 4px solid #2196F3;
+}
+.endpoint-method {
+    display: inline-block;
+    background: #2196F3;
+    color: white;
+    padding: 4px 12px;
+    border-radius: 4px;
+    font-size: 12px;
+    font-weight: bold;
+    margin-right: 10px;
+}
+"""
+
+
+def _asset_name(name, content):
+    """Nombre versionado de un recurso estático: predict.css -> predict-<hash>.css."""
+    stem, extension = name.rsplit('.', 1)
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    return f'{stem}-{digest}.{extension}'
+
+
+PREDICT_STYLES_NAME = _asset_name('predict.css', PREDICT_STYLES)
+PREDICT_SCRIPT_NAME = _asset_name('predict.js', PREDICT_SCRIPT)
+HOME_STYLES_NAME = _asset_name('home.css', HOME_STYLES)
+# Ruta bajo la que se sirven los recursos estáticos (ver static_asset)
+ASSETS_PREFIX = '/assets/'
+PREDICT_STYLES_URL = ASSETS_PREFIX + PREDICT_STYLES_NAME
+PREDICT_SCRIPT_URL = ASSETS_PREFIX + PREDICT_SCRIPT_NAME
+HOME_STYLES_URL = ASSETS_PREFIX + HOME_STYLES_NAME
+
+# Recursos estáticos, comprimidos al importar; no cambian durante la vida del proceso
+STATIC_ASSETS = {
+    PREDICT_STYLES_NAME: CachedPage(PREDICT_STYLES, 'text/css; charset=utf-8', IMMUTABLE),
+    PREDICT_SCRIPT_NAME: CachedPage(
+        PREDICT_SCRIPT, 'application/javascript; charset=utf-8', IMMUTABLE
+    ),
+    HOME_STYLES_NAME: CachedPage(HOME_STYLES, 'text/css; charset=utf-8', IMMUTABLE),
+}
+
+# Endpoints que lista la página de estado: (método, ruta, descripción). Solo
+# se muestran los que sirve el modo en uso (ver home_page_fields)
+HOME_ENDPOINTS = (
+    ('GET', '/home', 'Página de estado (esta página)'),
+    ('GET', '/predict', 'Página de predicción (HTML)'),
+    ('POST', '/predict', 'Predicción de imágenes (tflite)'),
+    ('POST', '/predict/batch', 'Predicción de varias imágenes por solicitud'),
+    ('GET', '/metrics', 'Métricas de latencia por etapa (Prometheus)'),
+    ('GET', '/models', 'Modelos cargados y modelo por defecto'),
+)
+
+# Páginas renderizadas por estado
+page_cache = PageCache()
+
+
+def static_asset(name):
+    """
+    Recurso estático por su nombre versionado.
+
+    Returns:
+        CachedPage: El recurso, o None si no existe
+    """
+    return STATIC_ASSETS.get(name)
+
+
+def render_predict_page():
+    """Página HTML interactiva para realizar predicciones sobre imágenes."""
+    html = f"""
+    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>Reconocimiento de Plantas - Clasificador</title>
+        <link rel="stylesheet" href="{PREDICT_STYLES_URL}">
+    </head>
+    <body>
+        <div class="container">
+            <h1>🌿 Reconocimiento de Plantas</h1>
+            <p class="subtitle">Sube una imagen o usa tu cámara para identificar la especie</p>
+            
+            <div class="upload-section">
+                <div class="button-group">
+                    <button class="btn btn-secondary" onclick="openCamera()">
+                        📷 Usar Cámara
+                    </button>
+                    <button class="btn btn-primary" onclick="document.getElementById('fileInput').click()">
+                        📁 Seleccionar Imagen
+                    </button>
+                    <input type="file" id="fileInput" accept="image/*" onchange="handleFileSelect(event)">
+                </div>
+                
+                <div class="preview-section">
+                    <img id="previewImage" class="preview-image" alt="Preview">
+                    <video id="cameraPreview" class="camera-preview" autoplay playsinline></video>
+                    <div class="camera-controls">
+                        <button class="btn btn-primary" onclick="capturePhoto()">📸 Capturar Foto</button>
+                        <button class="btn btn-secondary" onclick="stopCamera()">❌ Cerrar Cámara</button>
+                    </div>
+                </div>
+                
+                <div class="loading">
+                    <div class="spinner"></div>
+                    <p style="margin-top: 15px; color: #666;">Procesando imagen...</p>
+                </div>
+                
+                <div id="resultSection" class="result-section">
+                    <div id="resultContent"></div>
+                </div>
+            </div>
+        </div>
+        
+        <script src="{PREDICT_SCRIPT_URL}"></script>
+    </body>
+    </html>
+    """
+    return html
+
+
+def cached_predict_page():
+    """Página de predicción ya renderizada (no depende de ningún estado)."""
+    return page_cache.get('predict', (), render_predict_page)
+
+
+def home_page_fields(model_info, default_model_path, default_target_size, models=None,
+                     routes=None):
+    """
+    Valores que muestra la página de estado: de ellos depende su contenido.
+
+    Args:
+        model_info (dict): Información del modelo por defecto (ModelEntry.info()),
+            o None si no hay modelo
+        default_model_path (str): Ruta configurada del modelo, si no está cargado
+        default_target_size (tuple): Tamaño de entrada por defecto (ancho, alto)
+        models (list): Modelos cargados, como en ModelRegistry.describe()
+        routes (set): Pares (método, ruta) que sirve la aplicación; por
+            defecto se listan todos los de HOME_ENDPOINTS
+
+    Returns:
+        tuple: (estado del modelo, ruta, tamaño de entrada, intérpretes,
+            runtime, ajuste de los intérpretes, modelos cargados, endpoints
+            listados), como texto salvo los endpoints
+    """
+    model_status = f"Cargado ({model_info['key']})" if model_info else "No cargado"
+    models_display = "<br>".join(
+        f"{model['key']}{' (activa)' if model['active'] else ''}" for model in models or []
+    ) or "N/A"
+    
+    if model_info:
+        model_path = model_info['model_path']
+        input_shape = model_info['input_shape']
+        # Solo el tamaño: la ocupación cambia en cada inferencia y la página
+        # quedaría sin caché (se consulta en /models)
+        pool_display = f"{model_info['pool']['size']} ({model_info['num_threads']} hilos c/u)"
+        runtime_display = model_info['runtime']
+        tuning_display = _tuning_display(model_info)
+        if input_shape:
+            input_size_display = f"{input_shape[1]}x{input_shape[0]}" if len(input_shape) >= 2 else "N/A"
+        else:
+            input_size_display = f"{default_target_size[0]}x{default_target_size[1]}"
+    else:
+        model_path = default_model_path
+        pool_display = "N/A"
+        runtime_display = "N/A"
+        tuning_display = "N/A"
+        input_size_display = f"{default_target_size[0]}x{default_target_size[1]}"
+    endpoints = tuple(
+        endpoint for endpoint in HOME_ENDPOINTS
+        if routes is None or endpoint[:2] in routes
+    )
+    return (
+        model_status, model_path, input_size_display, pool_display, runtime_display,
+        tuning_display, models_display, endpoints,
+    )
+
+
+def _tuning_display(model_info):
+    """Configuración de los intérpretes y, si se ajustó al host, su medición."""
+    delegate = 'XNNPACK' if model_info.get('delegate', 'xnnpack') == 'xnnpack' else 'sin delegado'
+    setting = f"{model_info['num_threads']} hilos x {model_info['pool']['size']} intérpretes, {delegate}"
+    tuning = model_info.get('tuning')
+    if not tuning:
+        return f"{setting} (sin ajuste automático)"
+    # La fecha de la medición, y no si este worker midió o la leyó, para que
+    # todos los workers muestren la misma página
+    measured_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(tuning['measured_at']))
+    return f"{setting} ({tuning['throughput']:g} img/s, medido el {measured_at})"
+
+
+def _render_endpoint(method, path, description):
+    # Los POST se distinguen en verde
+    style = ' style="background: #4CAF50;"' if method == 'POST' else ''
+    return f"""
+                <div class="endpoint">
+                    <span class="endpoint-method"{style}>{method}</span>
+                    <strong>{path}</strong> - {description}
+                </div>"""
+
+
+def _render_home(model_status, model_path, input_size_display, pool_display, runtime_display,
+                 tuning_display, models_display, endpoints):
+    """HTML de la página de estado a partir de los valores de home_page_fields."""
+    endpoints_html = ''.join(_render_endpoint(*endpoint) for endpoint in endpoints)
+    html = f"""
+    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>API de Reconocimiento de Imágenes - Estado</title>
+        <link rel="stylesheet" href="{HOME_STYLES_URL}">
+    </head>
+    <body>
+        <div class="container">
+            <h1>🌿 API de Reconocimiento de Plantas</h1>
+            <div class="status">
+                <div class="status-badge">✓ API ACTIVA</div>
+            </div>
+            <div class="info">
+                <div class="info-item">
+                    <div class="info-label">Estado del Modelo:</div>
+                    <div class="info-value">{model_status}</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Ruta del Modelo:</div>
+                    <div class="info-value">{model_path}</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Tamaño de Entrada:</div>
+                    <div class="info-value">{input_size_display} píxeles</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Intérpretes:</div>
+                    <div class="info-value">{pool_display}</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Runtime TFLite:</div>
+                    <div class="info-value">{runtime_display}</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Ajuste de Intérpretes:</div>
+                    <div class="info-value">{tuning_display}</div>
+                </div>
+                <div class="info-item">
+                    <div class="info-label">Modelos Cargados:</div>
+                    <div class="info-value">{models_display}</div>
+                </div>
+            </div>
+            <div class="endpoints">
+                <h3 style="color: #333; margin-top: 0;">Endpoints Disponibles:</h3>{endpoints_html}
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return html
+
+
+def render_home_page(model_info, default_model_path, default_target_size, models=None,
+                     routes=None):
+    """
+    Página de estado de la API.
+
+    Args:
+        Ver home_page_fields
+
+    Returns:
+        str: HTML de la página
+    """
+    return _render_home(
+        *home_page_fields(model_info, default_model_path, default_target_size, models, routes)
+    )
+
+
+def cached_home_page(model_info, default_model_path, default_target_size, models=None,
+                     routes=None):
+    """
+    Página de estado ya renderizada: se renderiza y comprime una vez por
+    cada combinación de valores mostrados (ver home_page_fields).
+
+    Args:
+        Ver home_page_fields
+
+    Returns:
+        CachedPage: Página lista para responder
+    """
+    fields = home_page_fields(
+        model_info, default_model_path, default_target_size, models, routes
+    )
+    return page_cache.get('home', fields, lambda: _render_home(*fields))
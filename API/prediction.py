@@ -0,0 +1,750 @@
+"""
+Pipeline de predicción compartido por los modos de servicio (Flask y ASGI).
+
+Lee la configuración del entorno, carga los modelos al importarse (ver
+model_registry.py) y expone los pasos comunes: lectura y caché de la imagen,
+preprocesamiento, inferencia (directa o por micro-batching) y formato de las
+respuestas. Las funciones que dependen del modelo reciben la entrada del
+registro elegida por la solicitud; sin ella usan el modelo por defecto.
+"""
+
+import atexit
+import hmac
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+from .image_utils import RESIZE_STRATEGIES, fetch_image_bytes, load_image_from_bytes, resize_image
+from .model_loader import DEFAULT_MODEL_URL, top_k
+from .model_registry import ModelRegistry
+from .admission import AdmissionController
+from .batching import MicroBatcher
+from .deadlines import Deadline, check_deadline, parse_timeout, wait_timeout
+from .decode_pool import DecodePool, DecodePoolBusyError
+from .interpreter_pool import PoolTimeoutError, available_cpus
+from .interpreter_tuning import InterpreterTuner, configured_workers
+from .metrics import IMAGE_BYTES, IMAGE_PIXELS, stage_timer
+from .near_duplicates import NearDuplicateIndex
+from .result_cache import ResultCache, make_cache_key
+from .image_fetcher import configure_default_fetcher
+from .upload_limits import ImageLimits, read_upload
+
+# Configuración
+MODEL_PATH = os.getenv('MODEL_PATH', 'plant_species.tflite')
+# Por defecto labels.json en la misma carpeta que app.py
+LABELS_PATH = os.getenv('LABELS_PATH', os.path.join(os.path.dirname(__file__), 'labels.json'))
+# Nombre y versión del modelo de MODEL_PATH en el registro (por defecto, el
+# nombre del archivo y los 12 primeros dígitos de su hash)
+MODEL_NAME = os.getenv('MODEL_NAME') or os.path.splitext(os.path.basename(MODEL_PATH))[0]
+MODEL_VERSION = os.getenv('MODEL_VERSION') or None
+# Descarga del modelo si MODEL_PATH no existe: URL, SHA-256 esperado (opcional
+# pero recomendado) y caché local versionada (ver model_fetcher.py)
+MODEL_URL = os.getenv('MODEL_URL', DEFAULT_MODEL_URL) or None
+MODEL_SHA256 = os.getenv('MODEL_SHA256') or None
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR') or None
+# Archivo JSON con varios modelos; reemplaza a MODEL_PATH y se vigila para
+# aplicar cambios en caliente en todos los workers
+MODEL_REGISTRY_PATH = os.getenv('MODEL_REGISTRY_PATH') or None
+MODEL_REGISTRY_CHECK_INTERVAL = float(os.getenv('MODEL_REGISTRY_CHECK_INTERVAL', '5'))
+# Token de los endpoints /admin (sin él están desactivados)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN') or None
+ADMIN_HEADER = 'X-Admin-Token'
+# Número máximo de clases alternativas que se pueden pedir con top_k
+MAX_TOP_K = int(os.getenv('MAX_TOP_K', '10'))
+DEFAULT_TARGET_SIZE = (256, 256)  # Puede ajustarse según el modelo
+# Micro-batching: con BATCH_MAX_SIZE > 1 las solicitudes concurrentes se agrupan
+# en una sola invocación del intérprete
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '1'))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+# Pool de intérpretes: por defecto uno por CPU disponible
+INTERPRETER_POOL_SIZE = int(os.getenv('INTERPRETER_POOL_SIZE', '0')) or None
+INTERPRETER_CHECKOUT_TIMEOUT = float(os.getenv('INTERPRETER_CHECKOUT_TIMEOUT', '30'))
+# Delegado de CPU de los intérpretes: xnnpack (por defecto) o none
+INTERPRETER_DELEGATE = os.getenv('INTERPRETER_DELEGATE', 'xnnpack')
+# Ajuste automático de num_threads, tamaño del pool y delegado (ver
+# interpreter_tuning.py): archivo de resultados, segundos de medición de cada
+# candidato y workers que comparten la CPU (0 = GUNICORN_WORKERS)
+INTERPRETER_TUNING = os.getenv('INTERPRETER_TUNING', '0') == '1'
+INTERPRETER_TUNING_PATH = os.getenv('INTERPRETER_TUNING_PATH') or None
+INTERPRETER_TUNING_SECONDS = float(os.getenv('INTERPRETER_TUNING_SECONDS', '1'))
+INTERPRETER_TUNING_WORKERS = int(os.getenv('INTERPRETER_TUNING_WORKERS', '0')) or None
+# Control de admisión de /predict (ver admission.py): límite adaptativo de
+# solicitudes en curso por worker (inicial, mínimo y máximo), solicitudes que
+# pueden esperar plaza y segundos de espera, y cuántas veces la latencia
+# habitual se tolera antes de reducir el límite
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', '1') == '1'
+ADMISSION_INITIAL_LIMIT = int(os.getenv('ADMISSION_INITIAL_LIMIT', '0')) or 2 * (
+    INTERPRETER_POOL_SIZE or available_cpus()
+)
+ADMISSION_MIN_LIMIT = int(os.getenv('ADMISSION_MIN_LIMIT', '1'))
+ADMISSION_MAX_LIMIT = int(os.getenv('ADMISSION_MAX_LIMIT', '64'))
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '32'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '2'))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv('ADMISSION_LATENCY_TOLERANCE', '2'))
+# Plazo de las solicitudes a /predict en segundos: el que se aplica si el
+# cliente no envía X-Request-Timeout ni timeout, y el máximo que puede pedir
+# (0 = sin plazo por defecto ni máximo)
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', '30'))
+# Endpoint /predict/batch: imágenes máximas por solicitud, tamaño de los lotes
+# enviados al modelo e hilos para descargar/decodificar/preprocesar en paralelo
+BATCH_ENDPOINT_MAX_ITEMS = int(os.getenv('BATCH_ENDPOINT_MAX_ITEMS', '64'))
+BATCH_ENDPOINT_CHUNK_SIZE = int(os.getenv('BATCH_ENDPOINT_CHUNK_SIZE', '16'))
+# Decodificación rápida: JPEG con draft() y reduce() en otros formatos, entregando
+# la imagen PIL directamente a resize_image sin pasar por numpy
+FAST_DECODE = os.getenv('FAST_DECODE', '1') == '1'
+DECODE_OPTIONS = {'target_size': DEFAULT_TARGET_SIZE, 'as_array': False} if FAST_DECODE else {}
+# Estrategia de redimensionado por defecto (ver image_utils.resize_image); cada
+# solicitud puede pedir otra con el parámetro resize
+RESIZE_STRATEGY = os.getenv('RESIZE_STRATEGY', 'lanczos')
+if RESIZE_STRATEGY not in RESIZE_STRATEGIES:
+    raise ValueError(
+        f"RESIZE_STRATEGY inválida: {RESIZE_STRATEGY!r}. "
+        f"Use una de: {', '.join(RESIZE_STRATEGIES)}."
+    )
+PREPROCESS_WORKERS = int(os.getenv('PREPROCESS_WORKERS', '0')) or min(32, available_cpus() + 4)
+# Decodificación en procesos separados (0 = en el hilo de la solicitud) e
+# imágenes en vuelo como máximo (ranuras de memoria compartida; 0 = 4 por proceso)
+DECODE_PROCESSES = int(os.getenv('DECODE_PROCESSES', '0'))
+DECODE_POOL_SLOTS = int(os.getenv('DECODE_POOL_SLOTS', '0')) or None
+DECODE_POOL_TIMEOUT = float(os.getenv('DECODE_POOL_TIMEOUT', '30'))
+# Descarga de imágenes por URL: tamaño máximo, timeouts de conexión y lectura
+# (segundos) y conexiones reutilizables por host
+IMAGE_FETCH_MAX_BYTES = int(os.getenv('IMAGE_FETCH_MAX_BYTES', str(20 * 1024 * 1024)))
+IMAGE_FETCH_CONNECT_TIMEOUT = float(os.getenv('IMAGE_FETCH_CONNECT_TIMEOUT', '3.05'))
+IMAGE_FETCH_READ_TIMEOUT = float(os.getenv('IMAGE_FETCH_READ_TIMEOUT', '10'))
+IMAGE_FETCH_POOL_SIZE = int(os.getenv('IMAGE_FETCH_POOL_SIZE', '16'))
+# Límites de las imágenes recibidas, comprobados antes de decodificarlas (ver
+# upload_limits.py): bytes y píxeles por imagen, formatos aceptados y tamaño
+# máximo del cuerpo de una solicitud a /predict/batch
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(float(os.getenv('MAX_IMAGE_PIXELS', '50e6')))
+ALLOWED_IMAGE_FORMATS = [
+    f.strip() for f in os.getenv('ALLOWED_IMAGE_FORMATS', 'JPEG,PNG,WEBP,GIF,BMP,TIFF').split(',')
+    if f.strip()
+]
+MAX_BATCH_REQUEST_BYTES = int(os.getenv('MAX_BATCH_REQUEST_BYTES', str(100 * 1024 * 1024)))
+# Caché de resultados por contenido: entradas en memoria (0 la desactiva), TTL en
+# segundos y, opcionalmente, un archivo SQLite compartido entre workers
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '1024'))
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH') or None
+RESULT_CACHE_SHARED_SIZE = int(os.getenv('RESULT_CACHE_SHARED_SIZE', '100000'))
+# Índice de casi duplicados por hash perceptual (ver near_duplicates.py):
+# entradas por worker (0 lo desactiva), distancia de Hamming máxima (de 64
+# bits), método de hash y fracción de aciertos que se verifican clasificándolos
+NEAR_DUP_CACHE_SIZE = int(os.getenv('NEAR_DUP_CACHE_SIZE', '0'))
+NEAR_DUP_MAX_DISTANCE = int(os.getenv('NEAR_DUP_MAX_DISTANCE', '4'))
+NEAR_DUP_HASH = os.getenv('NEAR_DUP_HASH', 'phash')
+NEAR_DUP_VERIFY_RATE = float(os.getenv('NEAR_DUP_VERIFY_RATE', '0.01'))
+# Mapear el modelo en memoria (compartido entre workers) en lugar de leerlo
+MODEL_MMAP = os.getenv('MODEL_MMAP', '1') == '1'
+# Con DEFER_WORKER_INIT=1 (lo fija gunicorn.conf.py con preload_app) los
+# intérpretes, el micro-batcher y el pool de decodificación no se crean al
+# importar sino en init_worker, después del fork de cada worker
+DEFER_WORKER_INIT = os.getenv('DEFER_WORKER_INIT', '0') == '1'
+
+configure_default_fetcher(
+    max_bytes=IMAGE_FETCH_MAX_BYTES,
+    connect_timeout=IMAGE_FETCH_CONNECT_TIMEOUT,
+    read_timeout=IMAGE_FETCH_READ_TIMEOUT,
+    pool_maxsize=IMAGE_FETCH_POOL_SIZE,
+)
+image_limits = ImageLimits(MAX_UPLOAD_BYTES, MAX_IMAGE_PIXELS, ALLOWED_IMAGE_FORMATS)
+
+
+def new_batcher(loader):
+    """Micro-batcher de un modelo (lo crea cada entrada del registro en cada proceso)."""
+    return MicroBatcher(
+        loader.predict_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        # Un hilo formador de lotes por intérprete para aprovechar todo el pool
+        num_workers=loader.pool_size,
+    )
+
+
+interpreter_tuner = None
+if INTERPRETER_TUNING:
+    interpreter_tuner = InterpreterTuner(
+        INTERPRETER_TUNING_PATH or (
+            os.path.join(MODEL_CACHE_DIR, 'interpreter_tuning.json') if MODEL_CACHE_DIR else None
+        ),
+        workers=INTERPRETER_TUNING_WORKERS,
+        duration=INTERPRETER_TUNING_SECONDS,
+    )
+
+# Modelos cargados; cada uno con sus etiquetas, recargadas si cambia el archivo
+model_registry = ModelRegistry(
+    LABELS_PATH,
+    loader_options={
+        'pool_size': INTERPRETER_POOL_SIZE,
+        'checkout_timeout': INTERPRETER_CHECKOUT_TIMEOUT,
+        'use_mmap': MODEL_MMAP,
+        'cache_dir': MODEL_CACHE_DIR,
+        'delegate': INTERPRETER_DELEGATE,
+        'tuner': interpreter_tuner,
+    },
+    batcher_factory=new_batcher if BATCH_MAX_SIZE > 1 else None,
+    config_path=MODEL_REGISTRY_PATH,
+    check_interval=MODEL_REGISTRY_CHECK_INTERVAL,
+)
+# Con preload_app los intérpretes se crean en cada worker, no en el master
+model_registry.warm_up_on_load = not DEFER_WORKER_INIT
+
+# Cargar los modelos al iniciar la aplicación
+try:
+    if MODEL_REGISTRY_PATH:
+        model_registry.load_config()
+        print(f"Modelos cargados exitosamente desde: {MODEL_REGISTRY_PATH}")
+    else:
+        model_registry.register(
+            MODEL_NAME, MODEL_VERSION, MODEL_PATH, model_url=MODEL_URL, sha256=MODEL_SHA256
+        )
+        print(f"Modelo cargado exitosamente desde: {MODEL_PATH}")
+except Exception as e:
+    print(f"Error al cargar el modelo: {str(e)}")
+    print("La aplicación puede no funcionar correctamente.")
+
+result_cache = None
+if RESULT_CACHE_SIZE > 0:
+    result_cache = ResultCache(
+        max_entries=RESULT_CACHE_SIZE,
+        ttl=RESULT_CACHE_TTL,
+        shared_path=RESULT_CACHE_PATH,
+        shared_max_entries=RESULT_CACHE_SHARED_SIZE,
+    )
+
+near_duplicates = None
+if NEAR_DUP_CACHE_SIZE > 0:
+    near_duplicates = NearDuplicateIndex(
+        max_entries=NEAR_DUP_CACHE_SIZE,
+        max_distance=NEAR_DUP_MAX_DISTANCE,
+        ttl=RESULT_CACHE_TTL,
+        method=NEAR_DUP_HASH,
+        verify_rate=NEAR_DUP_VERIFY_RATE,
+    )
+
+admission = None
+if ADMISSION_CONTROL:
+    admission = AdmissionController(
+        initial_limit=ADMISSION_INITIAL_LIMIT,
+        min_limit=ADMISSION_MIN_LIMIT,
+        max_limit=ADMISSION_MAX_LIMIT,
+        max_queue=ADMISSION_MAX_QUEUE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+        tolerance=ADMISSION_LATENCY_TOLERANCE,
+    )
+
+# Claves con las que se guarda el resultado de una imagen recién clasificada:
+# la de result_cache, (espacio, hash perceptual) para near_duplicates y, si se
+# está verificando un acierto del índice, las probabilidades que habría reutilizado
+ResultKey = namedtuple('ResultKey', ('content', 'perceptual', 'expected'))
+
+# Hilos compartidos para cargar y preprocesar las imágenes de /predict/batch
+# (se crean en el primer envío, no al importar)
+preprocess_executor = ThreadPoolExecutor(
+    max_workers=PREPROCESS_WORKERS, thread_name_prefix='preprocess'
+)
+
+# Recursos con hilos o procesos propios, que no sobreviven a un fork: se
+# crean en init_worker, una vez por proceso (los micro-batchers, uno por
+# modelo, los crea cada entrada del registro)
+decode_pool = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def init_worker():
+    """
+    Crea y calienta los intérpretes y los micro-batchers de los modelos
+    cargados y el pool de decodificación del proceso actual. Es idempotente
+    dentro de un proceso.
+    
+    Sin preload_app se llama al importar el módulo. Con preload_app el
+    modelo se carga en el master de gunicorn y gunicorn.conf.py llama a esta
+    función en cada worker, después del fork.
+    """
+    global decode_pool, _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        model_registry.init_worker()
+        # Los procesos hijos (spawn) pueden reimportar el módulo principal:
+        # solo el proceso principal crea el pool
+        decode_pool = None
+        if DECODE_PROCESSES > 0 and multiprocessing.parent_process() is None:
+            decode_pool = DecodePool(
+                DEFAULT_TARGET_SIZE,
+                processes=DECODE_PROCESSES,
+                slots=DECODE_POOL_SLOTS,
+                decode_options=DECODE_OPTIONS,
+                acquire_timeout=DECODE_POOL_TIMEOUT,
+            )
+            atexit.register(decode_pool.close)
+        _worker_pid = os.getpid()
+
+
+if not DEFER_WORKER_INIT:
+    init_worker()
+
+
+def predict_class_name(class_idx, entry=None):
+    """
+    Retorna el nombre de la clase dado un índice, desde las etiquetas del modelo.
+    labels.json tiene el formato: {"0": ..., "1": ..., ...}
+    """
+    entry = entry or model_registry.resolve()
+    return entry.labels.name(int(class_idx))
+
+
+def parse_top_k(value):
+    """
+    Valida el parámetro top_k recibido en una solicitud.
+
+    Args:
+        value: Valor crudo (str, int o None)
+
+    Returns:
+        int: Número de clases a retornar (1 si no se especificó)
+
+    Raises:
+        ValueError: Si top_k no es un entero entre 1 y MAX_TOP_K
+    """
+    if value is None or value == '':
+        return 1
+    try:
+        k = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"top_k debe ser un entero entre 1 y {MAX_TOP_K}.")
+    if not 1 <= k <= MAX_TOP_K:
+        raise ValueError(f"top_k debe ser un entero entre 1 y {MAX_TOP_K}.")
+    return k
+
+
+def parse_resize(value):
+    """
+    Valida el parámetro resize recibido en una solicitud.
+
+    Args:
+        value: Nombre de la estrategia (str) o None
+
+    Returns:
+        str: Estrategia de redimensionado (RESIZE_STRATEGY si no se especificó)
+
+    Raises:
+        ValueError: Si no es una de RESIZE_STRATEGIES
+    """
+    if value is None or value == '':
+        return RESIZE_STRATEGY
+    strategy = str(value).strip().lower()
+    if strategy not in RESIZE_STRATEGIES:
+        raise ValueError(f"resize debe ser una de: {', '.join(RESIZE_STRATEGIES)}.")
+    return strategy
+
+
+def format_predictions(scores, k=1, entry=None):
+    """
+    Construye el cuerpo JSON de las predicciones de un lote.
+
+    Args:
+        scores (np.ndarray): Probabilidades por clase con forma (N, num_clases)
+        k (int): Si es mayor que 1, se agregan las k clases más probables en 'top_k'
+        entry (ModelEntry): Modelo que produjo las probabilidades (por defecto,
+            el modelo por defecto)
+
+    Returns:
+        list: Un dict por imagen con success, class, confidence, model y
+            opcionalmente top_k
+    """
+    entry = entry or model_registry.resolve()
+    with stage_timer('postprocess'):
+        indices, values = top_k(scores, k)
+        names = entry.labels.names(indices)
+        results = []
+        for row_names, row_values in zip(names, values.tolist()):
+            result = {
+                'success': True,
+                'class': row_names[0],
+                'confidence': f"{row_values[0] * 100:.3f}%",
+                'model': entry.key
+            }
+            if k > 1:
+                result['top_k'] = [
+                    {'class': name, 'confidence': f"{value * 100:.3f}%"}
+                    for name, value in zip(row_names, row_values)
+                ]
+            results.append(result)
+    return results
+
+
+def predict_scores(processed_image, entry=None, deadline=None):
+    """
+    Ejecuta el modelo sobre una imagen preprocesada.
+
+    Usa el micro-batching si está activo; si no, una invocación directa.
+
+    Args:
+        processed_image (np.ndarray): Imagen redimensionada (H, W, C)
+        entry (ModelEntry): Modelo a usar (por defecto, el modelo por defecto)
+        deadline (Deadline): Plazo de la solicitud (opcional)
+
+    Returns:
+        np.ndarray: Probabilidades por clase (num_clases,)
+
+    Raises:
+        DeadlineExceededError: Si el plazo vence antes de invocar al intérprete
+    """
+    init_worker()
+    entry = entry or model_registry.resolve()
+    check_deadline(deadline, 'invoke')
+    batcher = entry.get_batcher()
+    if batcher is not None:
+        return batcher.predict_scores(processed_image, deadline=deadline)
+    return predict_images(processed_image, entry, deadline)[0]
+
+
+def predict_images(images, entry=None, deadline=None):
+    """
+    Ejecuta el modelo sobre varias imágenes preprocesadas en una sola
+    invocación, sin pasar por el micro-batcher (p. ej. un lote de /predict/batch).
+
+    Args:
+        images: Lista de imágenes (H, W, C), lote (N, H, W, C) o una imagen (H, W, C)
+        entry (ModelEntry): Modelo a usar (por defecto, el modelo por defecto)
+        deadline (Deadline): Plazo de la solicitud (opcional); acota la
+            espera por un intérprete libre
+
+    Returns:
+        np.ndarray: Probabilidades por clase con forma (N, num_clases)
+
+    Raises:
+        DeadlineExceededError: Si el plazo vence antes de invocar al intérprete
+    """
+    init_worker()
+    entry = entry or model_registry.resolve()
+    check_deadline(deadline, 'invoke')
+    try:
+        return entry.loader.predict_batch(
+            images, checkout_timeout=wait_timeout(deadline, INTERPRETER_CHECKOUT_TIMEOUT),
+        )
+    except PoolTimeoutError:
+        check_deadline(deadline, 'pool_wait')
+        raise
+
+
+def decode_options(entry):
+    """Opciones de load_image_from_bytes para el tamaño de entrada de un modelo."""
+    if not FAST_DECODE:
+        return {}
+    return {**DECODE_OPTIONS, 'target_size': entry.target_size}
+
+
+def result_cache_key(content, entry, resize=None):
+    """
+    Clave de caché de una imagen: sus bytes, el modelo y el preprocesamiento.
+
+    Args:
+        content (bytes): Bytes crudos de la imagen
+        entry (ModelEntry): Modelo que la clasifica
+        resize (str): Estrategia de redimensionado; por defecto RESIZE_STRATEGY
+
+    Returns:
+        str: Clave, o None si la caché está desactivada
+    """
+    if result_cache is None:
+        return None
+    return make_cache_key(
+        content, entry.loader.model_hash, entry.target_size, FAST_DECODE, 'efficientnet',
+        resize or RESIZE_STRATEGY,
+    )
+
+
+def request_deadline(value, start=None):
+    """
+    Plazo de una solicitud a /predict.
+
+    Args:
+        value: Plazo pedido por el cliente en segundos (cabecera
+            X-Request-Timeout o parámetro timeout), o None
+        start (float): Llegada de la solicitud (time.perf_counter); por defecto, ahora
+
+    Returns:
+        Deadline: Plazo de la solicitud, o None si no tiene
+
+    Raises:
+        ValueError: Si el valor no es un número positivo
+    """
+    timeout = parse_timeout(value, REQUEST_TIMEOUT or None, REQUEST_TIMEOUT or None)
+    return Deadline(timeout, start) if timeout is not None else None
+
+
+def admit_request(deadline=None, sample=True):
+    """
+    Plaza del control de admisión para la inferencia de una solicitud a
+    /predict o de un lote de /predict/batch (un contexto vacío si está
+    desactivado). Ver AdmissionController.admit.
+
+    Raises:
+        AdmissionRejectedError: Al entrar, si el servidor está saturado
+        DeadlineExceededError: Al entrar, si el plazo vence en la cola
+    """
+    return admission.admit(deadline, sample) if admission is not None else nullcontext()
+
+
+def admit_request_async(deadline=None):
+    """Como admit_request, para `async with` en el modo ASGI."""
+    return admission.admit_async(deadline) if admission is not None else nullcontext()
+
+
+def near_duplicate_namespace(entry, resize=None):
+    """Espacio del índice de casi duplicados: el modelo y el preprocesamiento."""
+    width, height = entry.target_size
+    resize = resize or RESIZE_STRATEGY
+    return f'{entry.loader.model_hash}:{width}x{height}:{int(FAST_DECODE)}:{resize}'
+
+
+def store_result(cache_key, scores):
+    """
+    Guarda en las cachés las probabilidades de una imagen recién clasificada.
+
+    Args:
+        cache_key (ResultKey): Claves retornadas por prepare_content
+        scores (np.ndarray): Probabilidades por clase
+    """
+    if cache_key is None:
+        return
+    if cache_key.content is not None:
+        result_cache.set(cache_key.content, scores)
+    if cache_key.perceptual is not None:
+        if cache_key.expected is not None:
+            near_duplicates.verify(cache_key.expected, scores)
+        near_duplicates.set(*cache_key.perceptual, scores)
+
+
+def prepare_image(kind, source, detach=False, entry=None, deadline=None, resize=None):
+    """
+    Lee una imagen y la prepara con prepare_content. Se ejecuta en el hilo
+    de la solicitud o en preprocess_executor.
+
+    Args:
+        kind (str): 'file' o 'url'
+        source: FileStorage de Flask o URL de la imagen
+        detach (bool): Ver prepare_content
+        entry (ModelEntry): Ver prepare_content
+        deadline (Deadline): Ver prepare_content
+        resize (str): Ver prepare_content
+
+    Returns:
+        tuple: (clave de caché, imagen preprocesada, probabilidades en caché).
+            En un acierto la imagen preprocesada es None; en un fallo lo son
+            las probabilidades.
+    """
+    if kind == 'file':
+        content = read_upload(source)
+    else:
+        with stage_timer('fetch'):
+            content = fetch_image_bytes(source, deadline)
+    return prepare_content(content, detach, entry, deadline, resize)
+
+
+def prepare_content(content, detach=False, entry=None, deadline=None, resize=None):
+    """
+    Busca los bytes de una imagen en la caché de resultados; si no están, la
+    decodifica y preprocesa (en decode_pool si está activo) y busca su hash
+    perceptual en el índice de casi duplicados.
+
+    Args:
+        content (bytes): Bytes crudos de la imagen
+        detach (bool): Copiar los píxeles a memoria del proceso y liberar en
+            el acto la ranura compartida de decode_pool. Necesario cuando se
+            retienen muchas imágenes a la vez (p. ej. /predict/batch), que de
+            otro modo podrían agotar las ranuras
+        entry (ModelEntry): Modelo para el que se prepara la imagen (por
+            defecto, el modelo por defecto)
+        deadline (Deadline): Plazo de la solicitud; un acierto de la caché
+            se retorna aunque haya vencido, pero no se decodifica ni
+            redimensiona una imagen vencida
+        resize (str): Estrategia de redimensionado (ver parse_resize); por
+            defecto RESIZE_STRATEGY
+
+    Returns:
+        tuple: (ResultKey para store_result, imagen preprocesada,
+            probabilidades en caché)
+
+    Raises:
+        ImageTooLargeError, UnsupportedImageError: Si la imagen no cumple image_limits
+        DeadlineExceededError: Si el plazo vence antes de decodificar o redimensionar
+    """
+    IMAGE_BYTES.observe(len(content))
+    # Rechazo temprano: formato y dimensiones se leen de la cabecera
+    dimensions = image_limits.inspect(content)
+    entry = entry or model_registry.resolve()
+    resize = resize or RESIZE_STRATEGY
+    cache_key = ResultKey(result_cache_key(content, entry, resize), None, None)
+    if cache_key.content is not None:
+        with stage_timer('cache_lookup'):
+            scores = result_cache.get(cache_key.content)
+        if scores is not None:
+            return cache_key, None, scores
+
+    init_worker()
+    if dimensions is not None:
+        IMAGE_PIXELS.observe(dimensions[0] * dimensions[1])
+
+    # El pool de decodificación tiene ranuras de un único tamaño
+    if decode_pool is not None and entry.target_size == DEFAULT_TARGET_SIZE:
+        # Píxeles sobre memoria compartida; la ranura se libera cuando se
+        # descarta el array, tras escribirlo en el intérprete
+        check_deadline(deadline, 'decode')
+        try:
+            with stage_timer('decode_pool'):
+                pixels = decode_pool.decode(
+                    content, wait_timeout(deadline, DECODE_POOL_TIMEOUT), resize
+                )
+        except DecodePoolBusyError:
+            check_deadline(deadline, 'decode')
+            raise
+        if detach:
+            pixels = np.array(pixels)
+    else:
+        check_deadline(deadline, 'decode')
+        with stage_timer('decode'):
+            image = load_image_from_bytes(content, **decode_options(entry))
+        # Píxeles uint8: la conversión al tipo del modelo se hace al escribirlos
+        # en el buffer de entrada del intérprete
+        check_deadline(deadline, 'resize')
+        with stage_timer('resize'):
+            pixels = resize_image(image, target_size=entry.target_size, strategy=resize)
+
+    if near_duplicates is not None:
+        with stage_timer('near_lookup'):
+            perceptual = (near_duplicate_namespace(entry, resize), near_duplicates.hash(pixels))
+            scores, _ = near_duplicates.get(*perceptual)
+        if scores is not None and not near_duplicates.should_verify():
+            return cache_key, None, scores
+        cache_key = cache_key._replace(perceptual=perceptual, expected=scores)
+    return cache_key, pixels, None
+
+
+class AdminConflictError(RuntimeError):
+    """Se lanza cuando un cambio de administración no llegaría a todos los workers (HTTP 409)."""
+
+
+def check_admin_scope():
+    """
+    Comprueba que un cambio de administración se aplicará en todos los workers.
+
+    Sin MODEL_REGISTRY_PATH un cambio solo afecta al worker que atiende la
+    solicitud: con varios workers, las solicitudes siguientes responderían
+    distinto según cuál las atienda.
+
+    Raises:
+        AdminConflictError: Si hay varios workers y no hay MODEL_REGISTRY_PATH
+    """
+    if MODEL_REGISTRY_PATH is None and configured_workers() > 1:
+        raise AdminConflictError(
+            "Los cambios de modelos requieren MODEL_REGISTRY_PATH con varios workers: "
+            "sin él solo se aplicarían en el worker que atiende la solicitud."
+        )
+
+
+def admin_authorized(headers):
+    """
+    Comprueba el token de los endpoints de administración.
+
+    Args:
+        headers: Cabeceras de la solicitud (Flask o Starlette)
+
+    Returns:
+        bool: True si ADMIN_TOKEN está definido y la cabecera X-Admin-Token coincide
+    """
+    if ADMIN_TOKEN is None:
+        return False
+    token = headers.get(ADMIN_HEADER)
+    return bool(token) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+
+def admin_load_model(data):
+    """
+    Carga una versión de un modelo en segundo plano (POST /admin/models).
+
+    Con MODEL_REGISTRY_PATH la versión se agrega al archivo, que todos los
+    workers aplican; sin él, solo se carga en este proceso, así que solo se
+    admite con un único worker.
+
+    Args:
+        data (dict): name (por defecto, el del modelo por defecto), version,
+            model_path, model_url y sha256 (para descargarlo si model_path no
+            existe), labels_path, activate (true), default (false) y
+            keep_previous (false: retirar la versión activa al publicar la nueva)
+
+    Returns:
+        str: Clave "nombre:versión" del modelo en carga
+
+    Raises:
+        ValueError: Si faltan version o model_path, o el archivo no existe
+        AdminConflictError: Ver check_admin_scope
+    """
+    check_admin_scope()
+    default_entry = model_registry.default_entry()
+    name = data.get('name') or (default_entry.name if default_entry else MODEL_NAME)
+    version = data.get('version')
+    model_path = data.get('model_path')
+    if not version or not model_path:
+        raise ValueError("Se requieren version y model_path.")
+    model_url = data.get('model_url')
+    if not model_url and not os.path.isfile(model_path):
+        raise ValueError(f"No existe el archivo del modelo: {model_path}")
+    if ':' in str(name) or ':' in str(version):
+        raise ValueError("El nombre y la versión no pueden contener ':'.")
+    activate = bool(data.get('activate', True))
+    make_default = bool(data.get('default', False))
+    keep_previous = bool(data.get('keep_previous', False))
+    if MODEL_REGISTRY_PATH:
+        model_registry.add_to_config(
+            name, str(version), model_path, data.get('labels_path'), activate=activate,
+            make_default=make_default, keep_previous=keep_previous,
+            model_url=model_url, sha256=data.get('sha256'),
+        )
+        model_registry.reload()
+        return f'{name}:{version}'
+    return model_registry.load_async(
+        name, str(version), model_path, data.get('labels_path'), activate=activate,
+        make_default=make_default, retire_previous=not keep_previous,
+        model_url=model_url, sha256=data.get('sha256'),
+    )
+
+
+def admin_set_default(ref):
+    """
+    Cambia el modelo por defecto (PUT /admin/models/default) y lo persiste.
+
+    Raises:
+        ValueError: Si falta la referencia o el modelo no está cargado
+        AdminConflictError: Ver check_admin_scope
+    """
+    check_admin_scope()
+    if not ref:
+        raise ValueError("Se requiere model (nombre o nombre:versión).")
+    model_registry.set_default(ref)
+    model_registry.set_default_in_config(ref)
+
+
+def admin_unload(ref):
+    """
+    Retira una versión que no esté activa (DELETE /admin/models/<nombre>/<versión>).
+
+    Raises:
+        ValueError: Si no está cargada o es la versión activa
+        AdminConflictError: Ver check_admin_scope
+    """
+    check_admin_scope()
+    entry = model_registry.unload(ref)
+    model_registry.remove_from_config(entry.name, entry.version)
@@ -0,0 +1,185 @@
+"""
+Perfilado bajo demanda de solicitudes individuales.
+
+Una solicitud a /predict se perfila si trae la cabecera X-Profile-Token con
+el valor de PROFILE_SECRET o si cae en la muestra aleatoria
+PROFILE_SAMPLE_RATE (entre 0 y 1). Para esas solicitudes:
+
+- Cada etapa medida por metrics.observe_stage (fetch, decode, resize,
+  pool_wait, invoke, ...) se acumula en un RequestTrace, que se devuelve en
+  la cabecera Server-Timing de la respuesta.
+- Con PROFILE_DIR, la solicitud se ejecuta además bajo cProfile y el perfil
+  se escribe en ese directorio (un .prof por solicitud, legible con pstats o
+  snakeviz); su nombre se devuelve en X-Profile-File.
+
+La traza activa viaja en una ContextVar. Sin PROFILE_SECRET ni
+PROFILE_SAMPLE_RATE el costo por solicitud es comprobar una constante, y
+por etapa leer la ContextVar.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar, copy_context
+from functools import partial
+
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_SECRET = os.getenv('PROFILE_SECRET') or None
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR') or None
+PROFILING_ENABLED = PROFILE_SECRET is not None or PROFILE_SAMPLE_RATE > 0
+
+_current_trace = ContextVar('request_trace', default=None)
+# cProfile no admite dos perfiles activos a la vez en el mismo proceso
+_cprofile_lock = threading.Lock()
+
+
+def current_trace():
+    """Retorna la traza de la solicitud en curso, o None si no se está perfilando."""
+    return _current_trace.get()
+
+
+class RequestTrace:
+    """Tiempos por etapa (y perfil de cProfile opcional) de una solicitud."""
+
+    def __init__(self, use_cprofile=False):
+        """
+        Args:
+            use_cprofile (bool): Ejecutar la solicitud bajo cProfile y
+                escribir el perfil en PROFILE_DIR
+        """
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.profile_file = None
+        self._lock = threading.Lock()
+        self._token = None
+        self._profiler = None
+        if use_cprofile and PROFILE_DIR and _cprofile_lock.acquire(blocking=False):
+            self._profiler = cProfile.Profile()
+
+    def add(self, stage, seconds):
+        """Acumula la duración de una etapa (las repetidas se suman)."""
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def activate(self):
+        """Hace de esta traza la activa en el contexto actual y arranca cProfile."""
+        self._token = _current_trace.set(self)
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def deactivate(self):
+        """Detiene cProfile, escribe el perfil y restaura el contexto anterior."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                self.profile_file = f'{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{id(self):x}.prof'
+                self._profiler.dump_stats(os.path.join(PROFILE_DIR, self.profile_file))
+            except OSError as e:
+                print(f"No se pudo escribir el perfil: {e}")
+                self.profile_file = None
+            finally:
+                self._profiler = None
+                _cprofile_lock.release()
+        if self._token is not None:
+            _current_trace.reset(self._token)
+            self._token = None
+
+    def server_timing(self):
+        """
+        Retorna el valor de la cabecera Server-Timing.
+
+        Returns:
+            str: Etapas en orden de aparición y el total, en milisegundos
+        """
+        with self._lock:
+            stages = list(self.stages.items())
+        stages.append(('total', time.perf_counter() - self.start))
+        return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in stages)
+
+    def headers(self):
+        """Cabeceras de respuesta de una solicitud perfilada."""
+        headers = {'Server-Timing': self.server_timing()}
+        if self.profile_file:
+            headers['X-Profile-File'] = self.profile_file
+        return headers
+
+
+class TraceGroup:
+    """Reparte las etapas de un lote del micro-batcher entre las trazas de sus solicitudes."""
+
+    def __init__(self, traces):
+        self.traces = traces
+
+    def add(self, stage, seconds):
+        for trace in self.traces:
+            trace.add(stage, seconds)
+
+
+def should_profile(headers):
+    """
+    Decide si perfilar una solicitud.
+
+    Args:
+        headers: Cabeceras de la solicitud (Flask o Starlette)
+
+    Returns:
+        bool: True si trae el secreto de perfilado o cae en la muestra
+    """
+    if not PROFILING_ENABLED:
+        return False
+    if PROFILE_SECRET is not None:
+        token = headers.get(PROFILE_HEADER)
+        if token and hmac.compare_digest(token.encode('utf-8'), PROFILE_SECRET.encode('utf-8')):
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def start_trace(headers, use_cprofile=True):
+    """
+    Activa una traza si la solicitud debe perfilarse.
+
+    Args:
+        headers: Cabeceras de la solicitud
+        use_cprofile (bool): Permitir cProfile (solo si PROFILE_DIR está definido)
+
+    Returns:
+        RequestTrace: La traza activa, o None si la solicitud no se perfila
+    """
+    if not should_profile(headers):
+        return None
+    return RequestTrace(use_cprofile).activate()
+
+
+def activate_group(traces):
+    """
+    Activa en el hilo actual una traza que reparte las etapas entre `traces`.
+
+    Returns:
+        Token para restaurar el contexto con deactivate_group, o None si no hay trazas
+    """
+    traces = [trace for trace in traces if trace is not None]
+    if not traces:
+        return None
+    return _current_trace.set(TraceGroup(traces))
+
+
+def deactivate_group(token):
+    """Restaura el contexto previo a activate_group."""
+    if token is not None:
+        _current_trace.reset(token)
+
+
+def bind(fn):
+    """
+    Retorna `fn` ligada al contexto actual si hay una traza activa, para que
+    las etapas que ejecute en otro hilo (executors) se sumen a la traza.
+    """
+    if _current_trace.get() is None:
+        return fn
+    return partial(copy_context().run, fn)
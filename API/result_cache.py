@@ -0,0 +1,238 @@
+"""
+Caché de resultados de predicción direccionada por contenido.
+
+La clave es un hash de los bytes crudos de la imagen junto con la identidad
+del modelo y los parámetros de preprocesamiento, de modo que un acierto
+permite omitir la decodificación, el preprocesamiento y la inferencia.
+
+Tiene dos niveles:
+- LRUCache: en memoria del proceso, acotada en número de entradas.
+- SQLiteCache: opcional, en un archivo local compartido entre workers.
+
+Ambos niveles aplican TTL y desalojo por antigüedad de uso.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .metrics import CACHE_EVENTS
+
+
+def make_cache_key(content, *params):
+    """
+    Calcula la clave de caché de una imagen.
+
+    Args:
+        content (bytes): Bytes crudos de la imagen
+        *params: Identidad del modelo y parámetros de preprocesamiento
+
+    Returns:
+        str: Digest hexadecimal
+    """
+    h = hashlib.blake2b(digest_size=20)
+    for param in params:
+        h.update(str(param).encode('utf-8'))
+        h.update(b'\0')
+    h.update(content)
+    return h.hexdigest()
+
+
+class LRUCache:
+    """Caché en memoria con límite de entradas, desalojo LRU y TTL."""
+
+    def __init__(self, max_entries=1024, ttl=3600.0):
+        """
+        Args:
+            max_entries (int): Número máximo de entradas
+            ttl (float): Segundos de validez de cada entrada
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Retorna el valor guardado o None si no existe o expiró."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Guarda un valor, desalojando la entrada menos usada si hace falta."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Caché compartida entre procesos en un archivo SQLite local.
+
+    Cada hilo (y cada proceso tras un fork) abre su propia conexión.
+    Los errores de la caché se registran y se tratan como fallos de caché,
+    nunca interrumpen una predicción.
+    """
+
+    # Cada cuántas escrituras se purgan expiradas y se recorta al máximo
+    EVICT_EVERY = 256
+
+    def __init__(self, path, max_entries=100000, ttl=3600.0):
+        """
+        Args:
+            path (str): Ruta del archivo SQLite
+            max_entries (int): Número máximo de entradas
+            ttl (float): Segundos de validez de cada entrada
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                " expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connection(self):
+        """Retorna la conexión del hilo y proceso actuales."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Retorna los bytes guardados o None si no existen, expiraron o hubo un error."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value FROM results WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"Error al leer la caché compartida: {e}")
+            return None
+
+    def set(self, key, value):
+        """Guarda bytes en la caché y periódicamente aplica TTL y límite de tamaño."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self.evict(now)
+        except sqlite3.Error as e:
+            print(f"Error al escribir en la caché compartida: {e}")
+
+    def evict(self, now=None):
+        """Elimina entradas expiradas y las menos usadas por encima de max_entries."""
+        now = now or time.time()
+        conn = self._connection()
+        conn.execute("DELETE FROM results WHERE expires <= ?", (now,))
+        conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class ResultCache:
+    """Caché de vectores de probabilidades con nivel local y nivel compartido opcional."""
+
+    def __init__(self, max_entries=1024, ttl=3600.0, shared_path=None, shared_max_entries=100000):
+        """
+        Args:
+            max_entries (int): Entradas de la LRU en memoria
+            ttl (float): Segundos de validez de cada resultado
+            shared_path (str): Archivo SQLite compartido entre workers; None lo desactiva
+            shared_max_entries (int): Entradas máximas del nivel compartido
+        """
+        self.local = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.shared = SQLiteCache(shared_path, shared_max_entries, ttl) if shared_path else None
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stores': 0}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counter_lock:
+            self._counters[name] += 1
+        CACHE_EVENTS.inc(event=name)
+
+    def get(self, key):
+        """
+        Busca un resultado en la LRU local y luego en el nivel compartido.
+
+        Returns:
+            np.ndarray: Probabilidades por clase (float32) o None si no está
+        """
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        if self.shared is not None:
+            blob = self.shared.get(key)
+            if blob is not None:
+                value = np.frombuffer(blob, dtype=np.float32)
+                # Promover al nivel local para los siguientes accesos
+                self.local.set(key, value)
+                self._count('shared_hits')
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key, scores):
+        """Guarda el vector de probabilidades de una imagen en ambos niveles."""
+        scores = np.ascontiguousarray(scores, dtype=np.float32)
+        scores.setflags(write=False)
+        self.local.set(key, scores)
+        if self.shared is not None:
+            self.shared.set(key, scores.tobytes())
+        self._count('stores')
+
+    def stats(self):
+        """
+        Retorna los contadores de aciertos y fallos.
+
+        Returns:
+            dict: Contadores, tasa de aciertos y tamaño del nivel local
+        """
+        with self._counter_lock:
+            counters = dict(self._counters)
+        lookups = counters['local_hits'] + counters['shared_hits'] + counters['misses']
+        hits = counters['local_hits'] + counters['shared_hits']
+        counters['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        counters['local_entries'] = len(self.local)
+        counters['shared_enabled'] = self.shared is not None
+        return counters
@@ -0,0 +1,148 @@
+"""
+Escritura y lectura directa de los buffers de entrada y salida del intérprete.
+
+En lugar de set_tensor/get_tensor (que copian el lote completo), los píxeles
+se escriben en el buffer de entrada a través de interpreter.tensor() y la
+salida se lee de su vista con una única copia, ya convertida a float32.
+
+Los modelos cuantizados (uint8/int8) se alimentan con una tabla de 256
+valores precalculada: cada píxel se traduce directamente a su valor
+cuantizado, sin pasar por float.
+"""
+
+import numpy as np
+
+
+def quantization_params(detail):
+    """
+    Retorna (escala, punto cero) de un tensor, o None si no está cuantizado.
+
+    Args:
+        detail (dict): Entrada de get_input_details() o get_output_details()
+    """
+    scale, zero_point = detail.get('quantization', (0.0, 0))
+    if np.issubdtype(detail['dtype'], np.integer) and scale:
+        return float(scale), int(zero_point)
+    return None
+
+
+class InputWriter:
+    """Copia lotes de imágenes al buffer de entrada de un intérprete."""
+
+    def __init__(self, input_detail, input_scale=1.0):
+        """
+        Args:
+            input_detail (dict): Detalles del tensor de entrada del modelo
+            input_scale (float): Factor aplicado a los píxeles [0, 255] al
+                escribirlos (1.0 = preprocess_input de EfficientNet,
+                1/255 = normalización [0, 1])
+        """
+        self.index = input_detail['index']
+        self.dtype = np.dtype(input_detail['dtype'])
+        self.input_scale = input_scale
+        self.quantization = quantization_params(input_detail)
+        # Tabla píxel -> valor del tensor para entradas enteras
+        self.lut = None
+        if np.issubdtype(self.dtype, np.integer):
+            values = np.arange(256, dtype=np.float64) * input_scale
+            if self.quantization is not None:
+                scale, zero_point = self.quantization
+                values = np.round(values / scale + zero_point)
+            info = np.iinfo(self.dtype)
+            self.lut = np.clip(values, info.min, info.max).astype(self.dtype)
+        # Caso habitual (escala 1, p. ej. punto cero 0 en uint8 o -128 en int8):
+        # la tabla es píxel + constante y basta un cast más una suma en el buffer,
+        # bastante más rápido que indexar la tabla
+        self.offset = None
+        if self.lut is not None:
+            deltas = self.lut.astype(np.int64) - np.arange(256)
+            if (deltas == deltas[0]).all():
+                self.offset = self.dtype.type(deltas[0])
+
+    def _write_one(self, slot, image):
+        """Escribe una imagen (H, W, C) o un lote en la vista `slot` del buffer."""
+        if image.dtype == np.uint8:
+            if self.offset is not None:
+                np.copyto(slot, image, casting='unsafe')
+                if self.offset:
+                    np.add(slot, self.offset, out=slot)
+            elif self.lut is not None:
+                # mode='clip' evita el buffer intermedio de mode='raise'
+                np.take(self.lut, image, out=slot, mode='clip')
+            else:
+                np.copyto(slot, image, casting='unsafe')
+                if self.input_scale != 1.0:
+                    slot *= self.input_scale
+        elif self.lut is None:
+            # Arrays float ya preprocesados (API anterior): un solo cast al buffer
+            np.copyto(slot, image, casting='unsafe')
+        else:
+            values = image * self.input_scale
+            if self.quantization is not None:
+                scale, zero_point = self.quantization
+                values = np.round(values / scale + zero_point)
+            info = np.iinfo(self.dtype)
+            np.copyto(slot, np.clip(values, info.min, info.max), casting='unsafe')
+
+    def write(self, interpreter, images):
+        """
+        Escribe un lote en el tensor de entrada, ya redimensionado a su tamaño.
+
+        Args:
+            interpreter: Intérprete con los tensores asignados
+            images: Lote (N, H, W, C), imagen (H, W, C) o secuencia de imágenes
+                (H, W, C); uint8 en [0, 255] o float ya preprocesado
+        """
+        buffer = interpreter.tensor(self.index)()
+        if isinstance(images, np.ndarray):
+            self._write_one(buffer.reshape(images.shape) if images.ndim == 3 else buffer, images)
+        else:
+            for slot, image in zip(buffer, images):
+                self._write_one(slot, image)
+        # No conservar referencias al buffer: invoke() falla si quedan vistas vivas
+        del buffer
+
+
+def read_scores(interpreter, output_detail):
+    """
+    Lee la salida del modelo como probabilidades float32 normalizadas por fila.
+
+    Hace una única copia desde el buffer de salida (descuantizando si hace
+    falta); la normalización se aplica sobre esa copia, sin temporales.
+
+    Args:
+        interpreter: Intérprete tras invoke()
+        output_detail (dict): Detalles del tensor de salida
+
+    Returns:
+        np.ndarray: Probabilidades por clase con forma (N, num_clases)
+    """
+    view = interpreter.tensor(output_detail['index'])()
+    quantization = quantization_params(output_detail)
+    if quantization is not None:
+        scale, zero_point = quantization
+        scores = np.empty(view.shape, dtype=np.float32)
+        np.subtract(view, zero_point, out=scores, casting='unsafe')
+        scores *= scale
+    else:
+        scores = np.array(view, dtype=np.float32)
+    del view
+    return normalize_in_place(scores)
+
+
+def normalize_in_place(scores):
+    """
+    Normaliza las filas cuya suma supera 1 (salidas no softmax) sobre el mismo array.
+
+    Args:
+        scores (np.ndarray): Array float32 (N, num_clases) propiedad del llamador
+
+    Returns:
+        np.ndarray: El mismo array
+    """
+    sums = scores.sum(axis=-1, keepdims=True)
+    # Tolerancia para errores de punto flotante
+    needs_norm = sums > 1.1
+    if needs_norm.any():
+        np.divide(scores, sums, out=scores, where=needs_norm)
+    return scores
@@ -0,0 +1,241 @@
+"""
+Límites de tamaño, resolución y formato de las imágenes recibidas.
+
+Las imágenes se rechazan antes de decodificarlas:
+
+- Formato: se reconoce por los primeros bytes (ver image_fetcher.py), sin
+  confiar en el nombre del archivo ni en su Content-Type.
+- Bytes: tope por imagen, comprobado mientras se recibe.
+- Píxeles: el ancho y alto se leen de la cabecera (los primeros KB) y se
+  compara su producto con el tope, de modo que una "bomba de
+  descompresión" (un PNG pequeño que declara 50000x50000 píxeles) se
+  rechaza sin reservar su memoria.
+
+InspectedUpload aplica estos límites mientras el parser multipart escribe
+el archivo: al primer incumplimiento deja de guardar datos y conserva el
+error, que se lanza al leer la imagen (el parser de werkzeug descartaría
+una excepción lanzada durante el parseo).
+"""
+
+import tempfile
+from io import BytesIO
+
+from PIL import Image
+
+from .image_fetcher import SNIFF_BYTES, sniff_image_format
+from .metrics import IMAGE_REJECTIONS
+
+# Tamaños de cabecera (bytes recibidos) en los que se intenta leer las
+# dimensiones; casi todos los formatos las tienen en los primeros bytes, los
+# JPEG con EXIF grande pueden necesitar decenas de KB
+HEADER_PROBES = (SNIFF_BYTES, 4 * 1024, 64 * 1024, 256 * 1024)
+# Tamaño a partir del cual una subida se guarda en disco en lugar de memoria
+SPOOL_SIZE = 500 * 1024
+# Margen para los demás campos y las cabeceras multipart de una solicitud
+# con una sola imagen
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """La imagen supera el tope de bytes o de píxeles (HTTP 413)."""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+class UnsupportedImageError(ValueError):
+    """La imagen no está en un formato aceptado (HTTP 415)."""
+
+    reason = 'format'
+
+
+class ImageLimits:
+    """Topes de bytes, píxeles y formatos de las imágenes recibidas."""
+
+    def __init__(self, max_bytes, max_pixels, allowed_formats=None):
+        """
+        Args:
+            max_bytes (int): Bytes máximos por imagen
+            max_pixels (int): Píxeles (ancho x alto) máximos por imagen
+            allowed_formats (iterable): Formatos aceptados (JPEG, PNG, ...);
+                None acepta todos los reconocidos
+        """
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.allowed_formats = (
+            frozenset(f.upper() for f in allowed_formats) if allowed_formats else None
+        )
+
+    def _reject(self, error):
+        IMAGE_REJECTIONS.inc(reason=error.reason)
+        raise error
+
+    def check_bytes(self, num_bytes):
+        """
+        Raises:
+            ImageTooLargeError: Si num_bytes supera el tope
+        """
+        if num_bytes > self.max_bytes:
+            self._reject(ImageTooLargeError(
+                f"La imagen excede el tamaño máximo de {self.max_bytes} bytes.", 'bytes'
+            ))
+
+    def check_format(self, header):
+        """
+        Identifica el formato por los primeros bytes.
+
+        Returns:
+            str: Formato de la imagen
+
+        Raises:
+            UnsupportedImageError: Si no es una imagen reconocida o su formato no se acepta
+        """
+        image_format = sniff_image_format(bytes(header[:SNIFF_BYTES]))
+        if image_format is None:
+            self._reject(UnsupportedImageError("El archivo no es una imagen reconocida."))
+        if self.allowed_formats is not None and image_format not in self.allowed_formats:
+            accepted = ', '.join(sorted(self.allowed_formats))
+            self._reject(UnsupportedImageError(
+                f"Formato de imagen no aceptado: {image_format}. Se aceptan: {accepted}."
+            ))
+        return image_format
+
+    def read_dimensions(self, header):
+        """
+        Lee ancho y alto de la cabecera de una imagen, que puede estar incompleta.
+
+        Returns:
+            tuple: (ancho, alto), o None si aún no son legibles
+
+        Raises:
+            ImageTooLargeError: Si Pillow ya rechaza la imagen como bomba de descompresión
+        """
+        try:
+            with Image.open(BytesIO(header)) as image:
+                size = image.size
+        except Image.DecompressionBombError:
+            self._reject(ImageTooLargeError(
+                f"La imagen excede el máximo de {self.max_pixels} píxeles.", 'pixels'
+            ))
+        except Exception:
+            return None
+        self.check_dimensions(size)
+        return size
+
+    def check_dimensions(self, size):
+        """
+        Raises:
+            ImageTooLargeError: Si ancho x alto supera el tope de píxeles
+        """
+        width, height = size
+        if width * height > self.max_pixels:
+            self._reject(ImageTooLargeError(
+                f"La imagen de {width}x{height} píxeles excede el máximo de "
+                f"{self.max_pixels} píxeles.", 'pixels'
+            ))
+
+    def inspect(self, content):
+        """
+        Aplica todos los límites a una imagen completa en memoria.
+
+        Args:
+            content (bytes): Imagen codificada
+
+        Returns:
+            tuple: (ancho, alto), o None si la cabecera no es legible (el
+                error se reporta al decodificar)
+
+        Raises:
+            ImageTooLargeError, UnsupportedImageError
+        """
+        self.check_bytes(len(content))
+        self.check_format(content)
+        return self.read_dimensions(content)
+
+
+class InspectedUpload:
+    """
+    Archivo de una subida multipart que aplica ImageLimits mientras se recibe.
+
+    Se usa como stream de los FileStorage de werkzeug (ver app.py): es
+    escribible por el parser y legible después como un archivo normal.
+    """
+
+    def __init__(self, limits, spool_size=SPOOL_SIZE):
+        self.limits = limits
+        self.error = None
+        self.image_format = None
+        self.dimensions = None
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        self._header = bytearray()
+        self._probes = iter(HEADER_PROBES)
+        self._next_probe = next(self._probes)
+        self._received = 0
+
+    def write(self, chunk):
+        if self.error is None:
+            try:
+                self._received += len(chunk)
+                self.limits.check_bytes(self._received)
+                if self._next_probe is not None:
+                    self._inspect_header(chunk)
+            except ValueError as e:
+                # Descartar lo recibido y lo que falte por recibir
+                self.error = e
+                self._file.seek(0)
+                self._file.truncate()
+                return len(chunk)
+            self._file.write(chunk)
+        return len(chunk)
+
+    def _inspect_header(self, chunk):
+        self._header += chunk[:HEADER_PROBES[-1] - len(self._header)]
+        while self._next_probe is not None and len(self._header) >= self._next_probe:
+            if self.image_format is None:
+                self.image_format = self.limits.check_format(self._header)
+            self.dimensions = self.limits.read_dimensions(bytes(self._header))
+            if self.dimensions is not None:
+                self._next_probe = None
+            else:
+                self._next_probe = next(self._probes, None)
+        if self._next_probe is None:
+            # Dimensiones leídas o cabecera demasiado larga: se comprueban
+            # con la imagen completa en ImageLimits.inspect
+            self._header = bytearray()
+
+    def raise_for_error(self):
+        """Lanza el error de límites registrado durante la recepción, si lo hay."""
+        if self.error is not None:
+            raise self.error
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def read_upload(file):
+    """
+    Lee una subida de Flask (FileStorage) aplicando los límites registrados.
+
+    Returns:
+        bytes: Contenido del archivo
+
+    Raises:
+        ImageTooLargeError, UnsupportedImageError: Si la subida se rechazó al recibirla
+    """
+    stream = getattr(file, 'stream', None)
+    if isinstance(stream, InspectedUpload):
+        stream.raise_for_error()
+    return file.read()
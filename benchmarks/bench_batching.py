@@ -0,0 +1,81 @@
+"""
+Benchmark de micro-batching: throughput frente a latencia p99 en CPU.
+
+Compara la predicción directa (una invocación por solicitud sobre el pool de
+intérpretes) con MicroBatcher para varias combinaciones de tamaño máximo
+de lote y ventana de espera, usando clientes concurrentes en lazo cerrado.
+
+Uso:
+    python -m benchmarks.bench_batching --model plant_species.tflite \
+        --clients 16 --requests 50 --configs 4:2 8:5 16:10
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from API.batching import MicroBatcher
+from API.model_loader import ModelLoader
+from benchmarks.common import print_table, run_closed_loop, summarize_latencies, write_json
+
+
+def parse_config(value):
+    """Convierte 'max_batch:max_wait_ms' en una tupla (int, float)."""
+    size, wait = value.split(':')
+    return int(size), float(wait)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'plant_species.tflite'))
+    parser.add_argument('--pool-size', type=int, default=None,
+                        help='Intérpretes del pool (por defecto, uno por CPU)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='Solicitudes por cliente')
+    parser.add_argument('--configs', nargs='+', type=parse_config,
+                        default=[(2, 1.0), (4, 2.0), (8, 5.0), (16, 10.0)],
+                        help='Pares max_batch:max_wait_ms a evaluar')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    loader = ModelLoader(args.model, pool_size=args.pool_size)
+    height, width, channels = loader.get_input_shape()
+    rng = np.random.default_rng(0)
+    images = rng.uniform(0, 255, size=(32, height, width, channels)).astype(np.float32)
+
+    def make_args(cid, i):
+        return (images[(cid + i) % len(images)],)
+
+    # Calentamiento
+    loader.predict(images[0])
+
+    rows = []
+    latencies, wall = run_closed_loop(loader.predict, make_args, args.clients, args.requests)
+    rows.append({'mode': 'directo', 'max_batch': 1, 'max_wait_ms': 0,
+                 **summarize_latencies(latencies, wall)})
+
+    for max_batch, max_wait_ms in args.configs:
+        batcher = MicroBatcher(loader.predict_batch, max_batch_size=max_batch,
+                               max_wait_ms=max_wait_ms, num_workers=loader.pool_size)
+        batcher.predict(images[0])
+        latencies, wall = run_closed_loop(batcher.predict, make_args, args.clients, args.requests)
+        batcher.close()
+        rows.append({'mode': 'batch', 'max_batch': max_batch, 'max_wait_ms': max_wait_ms,
+                     **summarize_latencies(latencies, wall)})
+
+    print_table(rows, ['mode', 'max_batch', 'max_wait_ms', 'throughput_rps', 'p50_ms', 'p99_ms'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'batching',
+            'model': args.model,
+            'pool_size': loader.pool_size,
+            'clients': args.clients,
+            'requests_per_client': args.requests,
+            'cpu_count': os.cpu_count(),
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark de decodificación: ruta completa frente a JPEG draft()/reduce().
+
+Para cada modo procesa el mismo corpus (decodificación + preprocess_image) en
+un subproceso independiente, de modo que el pico de RSS de cada modo se mide
+por separado. Si se indica un modelo, también reporta la concordancia top-1
+entre ambos modos.
+
+Modos:
+    actual  load_image_from_file -> array numpy a resolución completa -> preprocess_image
+    draft   load_image_from_file(target_size, as_array=False) -> PIL reducida -> preprocess_image
+
+Uso:
+    python -m benchmarks.bench_decode --model plant_species.tflite --count 20
+    python -m benchmarks.bench_decode --images /ruta/a/fotos
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ('actual', 'draft')
+
+
+def build_corpus(directory, count, width, height):
+    """Genera fotos sintéticas JPEG (y alguna PNG) del tamaño indicado."""
+    from benchmarks.common import synthetic_photo
+
+    paths = []
+    for i in range(count):
+        image = synthetic_photo(width, height, seed=i)
+        if i % 5 == 4:
+            path = os.path.join(directory, f'foto_{i:03d}.png')
+            image.save(path, 'PNG', compress_level=1)
+        else:
+            path = os.path.join(directory, f'foto_{i:03d}.jpg')
+            image.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def run_child(mode, paths, model_path, target_size):
+    """Procesa el corpus en el modo indicado e imprime los resultados como JSON."""
+    from API.image_utils import load_image_from_file, preprocess_image
+    from benchmarks.common import peak_rss_mb, summarize_latencies
+
+    loader = None
+    if model_path:
+        from API.model_loader import ModelLoader
+        loader = ModelLoader(model_path, pool_size=1)
+
+    baseline_rss = peak_rss_mb()
+    latencies = []
+    predictions = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            start = time.perf_counter()
+            if mode == 'draft':
+                image = load_image_from_file(f, target_size=target_size, as_array=False)
+            else:
+                image = load_image_from_file(f)
+            processed = preprocess_image(image, target_size=target_size)
+            latencies.append(time.perf_counter() - start)
+        if loader is not None:
+            predictions.append(loader.predict(processed)[0])
+
+    print(json.dumps({
+        'mode': mode,
+        'latency': summarize_latencies(latencies),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_over_baseline_mb': round(peak_rss_mb() - baseline_rss, 1),
+        'predictions': predictions,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=None, help='Modelo .tflite para medir concordancia top-1')
+    parser.add_argument('--images', default=None, help='Carpeta con imágenes reales (opcional)')
+    parser.add_argument('--count', type=int, default=20, help='Imágenes sintéticas a generar')
+    parser.add_argument('--width', type=int, default=4032)
+    parser.add_argument('--height', type=int, default=3024)
+    parser.add_argument('--target', type=int, default=256, help='Lado del tamaño objetivo')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    target_size = (args.target, args.target)
+
+    if args.child:
+        run_child(args.child, args.paths, args.model, target_size)
+        return
+
+    from benchmarks.common import print_table, write_json
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = sorted(
+                os.path.join(args.images, name) for name in os.listdir(args.images)
+                if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp'))
+            )
+        else:
+            paths = build_corpus(tmp, args.count, args.width, args.height)
+
+        results = {}
+        for mode in MODES:
+            cmd = [sys.executable, '-m', 'benchmarks.bench_decode', '--child', mode,
+                   '--target', str(args.target), '--paths', *paths]
+            if args.model:
+                cmd += ['--model', args.model]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    rows = [{'mode': mode, **results[mode]['latency'],
+             'peak_rss_mb': results[mode]['peak_rss_mb'],
+             'peak_rss_over_baseline_mb': results[mode]['peak_rss_over_baseline_mb']}
+            for mode in MODES]
+    print_table(rows, ['mode', 'count', 'mean_ms', 'p50_ms', 'p99_ms', 'peak_rss_mb',
+                       'peak_rss_over_baseline_mb'])
+
+    agreement = None
+    if args.model:
+        pairs = list(zip(results['actual']['predictions'], results['draft']['predictions']))
+        agreement = sum(a == b for a, b in pairs) / len(pairs) if pairs else None
+        print(f"Concordancia top-1 draft vs actual: {agreement:.3f}")
+
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'decode',
+            'images': args.images or f'sintéticas {args.count} x {args.width}x{args.height}',
+            'results': rows,
+            'top1_agreement': agreement,
+        })
+
+
+if __name__ == '__main__':
+    main()
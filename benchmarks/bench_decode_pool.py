@@ -0,0 +1,122 @@
+"""
+Benchmark de escalado de la etapa de decodificación y preprocesamiento.
+
+Para cada número de workers N compara:
+
+    hilos     N hilos que decodifican y redimensionan en el propio proceso (GIL)
+    pickle    ProcessPoolExecutor de N procesos que retorna el array serializado
+    shm       DecodePool de N procesos con entrega por memoria compartida
+
+Cada modo se carga con 2*N clientes concurrentes sobre el mismo corpus de
+JPEG. Reporta imágenes por segundo, latencias y el speedup respecto de N=1.
+
+Uso:
+    python -m benchmarks.bench_decode_pool --workers 1 2 4 8 --images 400
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from API.decode_pool import DecodePool
+from API.image_utils import load_image_from_bytes, resize_image
+from API.interpreter_pool import available_cpus
+from benchmarks.common import (
+    print_table, run_closed_loop, summarize_latencies, synthetic_photo, write_json
+)
+
+TARGET_SIZE = (256, 256)
+DECODE_OPTIONS = {'target_size': TARGET_SIZE, 'as_array': False}
+
+
+def decode_local(content):
+    """Decodificación y redimensionado en el proceso actual."""
+    return resize_image(load_image_from_bytes(content, **DECODE_OPTIONS), TARGET_SIZE)
+
+
+def build_corpus(count):
+    """JPEG sintéticos de varios tamaños (de 640x480 a 3000x2000)."""
+    sizes = [(640, 480), (1280, 960), (2048, 1536), (3000, 2000)]
+    corpus = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        synthetic_photo(*sizes[i % len(sizes)], seed=i).save(buffer, 'JPEG', quality=90)
+        corpus.append(buffer.getvalue())
+    return corpus
+
+
+def run_mode(mode, workers, corpus, requests_per_client):
+    """Ejecuta un modo con `workers` procesos/hilos y retorna su resumen."""
+    clients = workers if mode == 'hilos' else 2 * workers
+    pool = executor = None
+    if mode == 'hilos':
+        fn = decode_local
+    elif mode == 'pickle':
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+        def fn(content):
+            return executor.submit(decode_local, content).result()
+    else:
+        pool = DecodePool(TARGET_SIZE, workers, decode_options=DECODE_OPTIONS)
+        fn = pool.decode
+
+    # Calentamiento: arranca los procesos hijos
+    for content in corpus[:2 * workers]:
+        fn(content)
+
+    def make_args(cid, i):
+        return (corpus[(cid * requests_per_client + i) % len(corpus)],)
+
+    try:
+        latencies, wall = run_closed_loop(fn, make_args, clients, requests_per_client)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if pool is not None:
+            pool.close()
+    return summarize_latencies(latencies, wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    cpus = available_cpus()
+    default_workers = sorted({1, 2, 4, cpus})
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--modes', nargs='+', default=['hilos', 'pickle', 'shm'])
+    parser.add_argument('--images', type=int, default=200, help='Imágenes procesadas por prueba')
+    parser.add_argument('--corpus', type=int, default=16, help='Imágenes distintas del corpus')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.corpus)
+    rows = []
+    baseline = {}
+    for mode in args.modes:
+        for workers in args.workers:
+            clients = workers if mode == 'hilos' else 2 * workers
+            summary = run_mode(mode, workers, corpus, max(1, args.images // clients))
+            baseline.setdefault(mode, summary['throughput_rps'])
+            rows.append({
+                'mode': mode,
+                'workers': workers,
+                'images_per_s': summary['throughput_rps'],
+                'speedup': round(summary['throughput_rps'] / baseline[mode], 2),
+                'p50_ms': summary['p50_ms'],
+                'p99_ms': summary['p99_ms'],
+            })
+
+    print_table(rows, ['mode', 'workers', 'images_per_s', 'speedup', 'p50_ms', 'p99_ms'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'decode_pool',
+            'cpu_count': os.cpu_count(),
+            'available_cpus': cpus,
+            'images': args.images,
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
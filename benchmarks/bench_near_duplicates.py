@@ -0,0 +1,193 @@
+"""
+Benchmark del índice de casi duplicados: tasa de aciertos frente a precisión.
+
+Clasifica un conjunto de imágenes originales, las guarda en un
+NearDuplicateIndex y consulta con variantes de cada una (recodificadas,
+redimensionadas, recortadas, ...) y con imágenes distintas. Para cada
+método de hash y cada distancia máxima reporta:
+
+    hit_rate        fracción de variantes que aciertan en el índice
+    agreement       fracción de esos aciertos cuya clase reutilizada coincide
+                    con la que da el modelo para la variante
+    false_hit_rate  fracción de imágenes distintas que aciertan (con la
+                    predicción de otra imagen)
+    lookup_us       tiempo medio del hash perceptual más la búsqueda
+
+Con --images se usan fotos reales de un directorio; sin él, fotos sintéticas.
+Las variantes se preprocesan igual que en la API (load_image_from_bytes +
+resize_image al tamaño de entrada del modelo).
+
+Uso:
+    python -m benchmarks.bench_near_duplicates --model plant_species.tflite
+    python -m benchmarks.bench_near_duplicates --images /ruta/a/fotos --distances 0 4 8 12
+"""
+
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from API.image_utils import load_image_from_bytes, resize_image
+from API.model_loader import ModelLoader
+from API.near_duplicates import HASH_METHODS, NearDuplicateIndex
+from benchmarks.common import print_table, synthetic_photo, write_json
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif')
+
+
+def encode(image, image_format='JPEG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def crop(image, fraction):
+    """Recorta `fraction` del ancho y del alto, repartido entre ambos lados."""
+    width, height = image.size
+    dx, dy = int(width * fraction / 2), int(height * fraction / 2)
+    return image.crop((dx, dy, width - dx, height - dy))
+
+
+# Transformaciones típicas de una foto compartida por distintas aplicaciones
+VARIANTS = {
+    'jpeg_q60': lambda im: encode(im, 'JPEG', quality=60),
+    'webp_q75': lambda im: encode(im, 'WEBP', quality=75),
+    'resize_50': lambda im: encode(im.resize((im.width // 2, im.height // 2)), 'JPEG', quality=85),
+    'crop_5': lambda im: encode(crop(im, 0.05), 'JPEG', quality=85),
+    'crop_10': lambda im: encode(crop(im, 0.10), 'JPEG', quality=85),
+    'brightness': lambda im: encode(ImageEnhance.Brightness(im).enhance(1.15), 'JPEG', quality=85),
+}
+
+
+def load_originals(images_dir, count, seed):
+    """Imágenes originales (PIL RGB): fotos de un directorio o sintéticas."""
+    if images_dir:
+        names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+        return [
+            Image.open(os.path.join(images_dir, name)).convert('RGB')
+            for name in names[:count]
+        ]
+    return [synthetic_photo(1024, 768, seed=seed + i) for i in range(count)]
+
+
+def preprocess(content, target_size):
+    return resize_image(
+        load_image_from_bytes(content, target_size=target_size, as_array=False),
+        target_size=target_size,
+    )
+
+
+def classify(loader, pixels):
+    """Clase top-1 de cada imagen preprocesada."""
+    scores = loader.predict_batch(pixels)
+    return [int(np.argmax(row)) for row in scores]
+
+
+def evaluate(method, distance, originals, variants, unrelated):
+    """
+    Mide el índice con un método y una distancia máxima.
+
+    Args:
+        originals (list): (píxeles, clase) de las imágenes guardadas
+        variants (list): (índice del original, nombre de la variante, píxeles, clase)
+        unrelated (list): píxeles de imágenes que no están en el índice
+    """
+    index = NearDuplicateIndex(
+        max_entries=len(originals), max_distance=distance, method=method
+    )
+    num_classes = max(label for _, label in originals) + 1
+    for pixels, label in originals:
+        scores = np.zeros(num_classes, dtype=np.float32)
+        scores[label] = 1.0
+        index.set('bench', index.hash(pixels), scores)
+
+    hits = agreements = 0
+    lookup_time = 0.0
+    per_variant = {}
+    for _, name, pixels, label in variants:
+        start = time.perf_counter()
+        scores, _ = index.get('bench', index.hash(pixels))
+        lookup_time += time.perf_counter() - start
+        stats = per_variant.setdefault(name, [0, 0])
+        if scores is not None:
+            hits += 1
+            stats[0] += 1
+            if int(np.argmax(scores)) == label:
+                agreements += 1
+                stats[1] += 1
+
+    false_hits = 0
+    for pixels in unrelated:
+        start = time.perf_counter()
+        scores, _ = index.get('bench', index.hash(pixels))
+        lookup_time += time.perf_counter() - start
+        false_hits += scores is not None
+
+    variants_per_name = len(variants) // len(per_variant)
+    row = {
+        'method': method,
+        'distance': distance,
+        'hit_rate': round(hits / len(variants), 3),
+        'agreement': round(agreements / hits, 3) if hits else None,
+        'false_hit_rate': round(false_hits / len(unrelated), 3) if unrelated else None,
+        'lookup_us': round(lookup_time / (len(variants) + len(unrelated)) * 1e6, 1),
+    }
+    for name, (variant_hits, _) in per_variant.items():
+        row[name] = round(variant_hits / variants_per_name, 2)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'plant_species.tflite'))
+    parser.add_argument('--images', default=None, help='Directorio con fotos originales')
+    parser.add_argument('--count', type=int, default=40, help='Imágenes originales')
+    parser.add_argument('--unrelated', type=int, default=40,
+                        help='Imágenes distintas para medir falsos aciertos')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--methods', nargs='+', default=list(HASH_METHODS), choices=HASH_METHODS)
+    parser.add_argument('--distances', nargs='+', type=int, default=[0, 2, 4, 6, 8, 10, 12])
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    loader = ModelLoader(args.model)
+    height, width, _ = loader.get_input_shape()
+    target_size = (int(width), int(height))
+
+    print(f"Preparando {args.count} originales con {len(VARIANTS)} variantes cada uno...")
+    images = load_originals(args.images, args.count + args.unrelated, args.seed)
+    stored, others = images[:args.count], images[args.count:]
+
+    original_pixels = [preprocess(encode(im, 'JPEG', quality=90), target_size) for im in stored]
+    originals = list(zip(original_pixels, classify(loader, original_pixels)))
+    variants = []
+    for i, image in enumerate(stored):
+        names = list(VARIANTS)
+        pixels = [preprocess(VARIANTS[name](image), target_size) for name in names]
+        for name, p, label in zip(names, pixels, classify(loader, pixels)):
+            variants.append((i, name, p, label))
+    unrelated = [preprocess(encode(im, 'JPEG', quality=90), target_size) for im in others]
+
+    rows = [
+        evaluate(method, distance, originals, variants, unrelated)
+        for method in args.methods for distance in args.distances
+    ]
+    columns = ['method', 'distance', 'hit_rate', 'agreement', 'false_hit_rate', 'lookup_us',
+               *VARIANTS]
+    print_table(rows, columns)
+
+    if args.output:
+        write_json(args.output, {
+            'model': args.model,
+            'images': args.images or 'synthetic',
+            'count': args.count,
+            'unrelated': len(unrelated),
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
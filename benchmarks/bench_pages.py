@@ -0,0 +1,137 @@
+"""
+Benchmark de las páginas HTML: renderizado por solicitud frente a caché.
+
+Envía GET / (o /home) y GET /predict con el cliente de pruebas de Flask
+y compara:
+
+    render    la página se renderiza en cada solicitud y se sirve sin
+              comprimir ni validadores (el comportamiento anterior a
+              page_cache.py)
+    cached    la página en caché, sin Accept-Encoding
+    gzip      la página en caché con Accept-Encoding: gzip, br
+    304       revalidación con If-None-Match (respuesta sin cuerpo)
+
+Para cada caso reporta solicitudes por segundo, latencias p50/p99 y bytes
+del cuerpo de la respuesta.
+
+Uso:
+    python -m benchmarks.bench_pages --model plant_species.tflite
+    python -m benchmarks.bench_pages --requests 5000 --clients 4 --output pages.json
+"""
+
+import argparse
+import os
+
+from benchmarks.common import print_table, run_closed_loop, summarize_latencies, write_json
+from benchmarks.synthetic_model import ensure_synthetic_model
+
+PAGES = ('home', 'predict')
+MODES = ('render', 'cached', 'gzip', '304')
+
+
+def add_render_routes(app):
+    """Registra /bench/render/<página>, que renderiza la página en cada solicitud."""
+    from flask import Response
+
+    from API.app import DEFAULT_TARGET_SIZE, MODEL_PATH, model_registry
+    from API.pages import render_home_page, render_predict_page
+
+    def render_home():
+        default_entry = model_registry.default_entry()
+        return Response(render_home_page(
+            default_entry.info() if default_entry else None, MODEL_PATH, DEFAULT_TARGET_SIZE,
+            models=model_registry.describe()['models'],
+        ))
+
+    def render_predict():
+        return Response(render_predict_page())
+
+    app.add_url_rule('/bench/render/home', 'bench_render_home', render_home)
+    app.add_url_rule('/bench/render/predict', 'bench_render_predict', render_predict)
+
+
+def measure(client, page, mode, clients, requests_per_client):
+    """
+    Mide un caso.
+
+    Returns:
+        dict: Fila de resultados
+    """
+    path = '/home' if page == 'home' else '/predict'
+    headers = {}
+    if mode == 'render':
+        path = f'/bench/render/{page}'
+    elif mode == 'gzip':
+        headers['Accept-Encoding'] = 'gzip, br'
+    elif mode == '304':
+        headers['If-None-Match'] = client.get(path).headers['ETag']
+
+    expected = 304 if mode == '304' else 200
+    first = client.get(path, headers=headers)
+    if first.status_code != expected:
+        raise RuntimeError(f"GET {path} ({mode}) respondió {first.status_code}")
+    errors = []
+
+    def call():
+        response = client.get(path, headers=headers)
+        if response.status_code != expected:
+            errors.append(response.status_code)
+
+    latencies, wall = run_closed_loop(call, lambda cid, i: (), clients, requests_per_client)
+    summary = summarize_latencies(latencies, wall)
+    return {
+        'page': page,
+        'mode': mode,
+        'rps': summary['throughput_rps'],
+        'p50_ms': summary['p50_ms'],
+        'p99_ms': summary['p99_ms'],
+        'bytes': len(first.get_data()),
+        'encoding': first.headers.get('Content-Encoding', '-'),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=None,
+                        help='Modelo TFLite (por defecto, el sintético de synthetic_model.py)')
+    parser.add_argument('--requests', type=int, default=2000, help='Solicitudes por caso')
+    parser.add_argument('--clients', type=int, default=1, help='Clientes concurrentes')
+    parser.add_argument('--pages', nargs='+', default=list(PAGES), choices=PAGES)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    # La API lee su configuración del entorno al importarse
+    os.environ['MODEL_PATH'] = args.model or ensure_synthetic_model()
+    from API.app import app
+    from API.pages import page_cache
+
+    add_render_routes(app)
+    client = app.test_client()
+    requests_per_client = max(1, args.requests // args.clients)
+
+    rows = [
+        measure(client, page, mode, args.clients, requests_per_client)
+        for page in args.pages for mode in args.modes
+    ]
+    for page in args.pages:
+        base = next((r for r in rows if r['page'] == page and r['mode'] == 'render'), None)
+        for row in rows:
+            if base and row['page'] == page:
+                row['speedup'] = round(row['rps'] / base['rps'], 2)
+    print_table(rows, ['page', 'mode', 'rps', 'speedup', 'p50_ms', 'p99_ms', 'bytes',
+                       'encoding', 'errors'])
+    print(f"Páginas renderizadas por la caché: {page_cache.renders}")
+
+    if args.output:
+        write_json(args.output, {
+            'model': os.environ['MODEL_PATH'],
+            'requests': requests_per_client * args.clients,
+            'clients': args.clients,
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Evaluación de las estrategias de redimensionado: latencia y concordancia.
+
+Decodifica cada imagen del corpus como la API (con FAST_DECODE, salvo
+--no-fast-decode) y la redimensiona con cada estrategia de
+image_utils.resize_image. Para cada estrategia reporta:
+
+    p50_ms/p95_ms   latencia de resize_image (el mínimo de --rounds repeticiones)
+    speedup         latencia media de lanczos / latencia media de la estrategia
+    top1_agreement  fracción de imágenes con la misma clase top-1 que lanczos,
+                    la estrategia actual por defecto
+    pixel_mae       diferencia media absoluta de los píxeles frente a lanczos
+
+Con --images se usan fotos reales de un directorio; sin él, el corpus
+sintético de benchmarks.common. La concordancia solo es representativa con
+el modelo real y fotos reales: el modelo sintético no distingue plantas.
+
+Uso:
+    python -m benchmarks.bench_resize --model plant_species.tflite --images /ruta/a/fotos
+    python -m benchmarks.bench_resize --count 42 --no-fast-decode --output resize.json
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from API.image_utils import RESIZE_STRATEGIES, load_image_from_bytes, resize_image
+from API.model_loader import ModelLoader
+from benchmarks.common import print_table, summarize_latencies, synthetic_corpus, write_json
+from benchmarks.synthetic_model import ensure_synthetic_model
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.gif')
+BASELINE = 'lanczos'
+
+
+def load_corpus(images_dir, count, seed):
+    """Imágenes codificadas: las de un directorio o el corpus sintético."""
+    if images_dir:
+        names = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+        corpus = []
+        for name in names[:count] if count else names:
+            with open(os.path.join(images_dir, name), 'rb') as f:
+                corpus.append((name, f.read()))
+        return corpus
+    return [(name, content) for name, content, _, _ in synthetic_corpus(count, seed=seed)]
+
+
+def time_resize(image, target_size, strategy, rounds):
+    """Redimensiona `rounds` veces y retorna (píxeles, mejor tiempo en segundos)."""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        pixels = resize_image(image, target_size, strategy)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return pixels, best
+
+
+def classify(loader, pixels, batch_size=16):
+    """Clase top-1 de cada imagen ya redimensionada."""
+    labels = []
+    for start in range(0, len(pixels), batch_size):
+        scores = loader.predict_batch(pixels[start:start + batch_size])
+        labels.extend(int(i) for i in np.argmax(scores, axis=-1))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=None,
+                        help='Modelo TFLite (por defecto, el sintético de synthetic_model.py)')
+    parser.add_argument('--images', default=None, help='Directorio con fotos reales')
+    parser.add_argument('--count', type=int, default=42,
+                        help='Imágenes sintéticas (o máximo de fotos con --images)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rounds', type=int, default=3, help='Repeticiones de cada redimensionado')
+    parser.add_argument('--no-fast-decode', action='store_true',
+                        help='Decodificar a resolución completa antes de redimensionar')
+    parser.add_argument('--strategies', nargs='+', default=list(RESIZE_STRATEGIES),
+                        choices=RESIZE_STRATEGIES)
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+    strategies = [BASELINE] + [s for s in args.strategies if s != BASELINE]
+
+    model_path = args.model or ensure_synthetic_model()
+    loader = ModelLoader(model_path, pool_size=1)
+    height, width = loader.get_input_shape()[:2]
+    target_size = (int(width), int(height))
+    decode_options = {} if args.no_fast_decode else {'target_size': target_size, 'as_array': False}
+
+    corpus = load_corpus(args.images, args.count, args.seed)
+    print(f"Redimensionando {len(corpus)} imágenes con {len(strategies)} estrategias...")
+    pixels = {strategy: [] for strategy in strategies}
+    latencies = {strategy: [] for strategy in strategies}
+    for _, content in corpus:
+        image = load_image_from_bytes(content, **decode_options)
+        if not args.no_fast_decode:
+            # La API entrega la imagen PIL reducida; cargarla aquí deja fuera
+            # de la medición la decodificación perezosa de Pillow
+            image.load()
+        for strategy in strategies:
+            resized, elapsed = time_resize(image, target_size, strategy, args.rounds)
+            pixels[strategy].append(resized)
+            latencies[strategy].append(elapsed)
+
+    labels = {strategy: classify(loader, pixels[strategy]) for strategy in strategies}
+    baseline_mean = float(np.mean(latencies[BASELINE]))
+    rows = []
+    for strategy in strategies:
+        summary = summarize_latencies(latencies[strategy])
+        agreement = np.mean([a == b for a, b in zip(labels[strategy], labels[BASELINE])])
+        mae = np.mean([
+            np.abs(p.astype(np.int16) - q.astype(np.int16)).mean()
+            for p, q in zip(pixels[strategy], pixels[BASELINE])
+        ])
+        rows.append({
+            'strategy': strategy,
+            'count': summary['count'],
+            'mean_ms': summary['mean_ms'],
+            'p50_ms': summary['p50_ms'],
+            'p95_ms': summary['p95_ms'],
+            'speedup': round(baseline_mean / float(np.mean(latencies[strategy])), 2),
+            'top1_agreement': round(float(agreement), 4),
+            'pixel_mae': round(float(mae), 2),
+        })
+    print_table(rows, ['strategy', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'speedup',
+                       'top1_agreement', 'pixel_mae'])
+
+    if args.output:
+        write_json(args.output, {
+            'model': model_path,
+            'images': args.images or 'synthetic',
+            'fast_decode': not args.no_fast_decode,
+            'target_size': list(target_size),
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
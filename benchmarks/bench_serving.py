@@ -0,0 +1,146 @@
+"""
+Benchmark de carga: gunicorn + Flask frente al modo ASGI (uvicorn + API.asgi).
+
+Levanta un servidor de imágenes local que responde con una demora fija
+(simulando un origen lento), arranca cada modo de servicio como subproceso y
+envía solicitudes POST /predict con image_url desde clientes concurrentes.
+La caché de resultados se desactiva para que cada solicitud descargue la imagen.
+
+Uso:
+    python -m benchmarks.bench_serving --model plant_species.tflite \
+        --delay 0.5 --clients 64 --requests 4 --workers 1 --threads 4
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmarks.common import (
+    print_table, run_closed_loop, summarize_latencies, synthetic_photo, write_json
+)
+
+
+def start_slow_image_server(port, delay, image_bytes):
+    """Servidor HTTP que entrega siempre la misma imagen tras `delay` segundos."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(image_bytes)))
+            self.end_headers()
+            self.wfile.write(image_bytes)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_until_ready(base_url, timeout=120):
+    """Espera a que el servidor responda en /home."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/home', timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f'El servidor en {base_url} no respondió a tiempo')
+
+
+def server_command(mode, port, workers, threads):
+    """Línea de comandos para arrancar cada modo de servicio."""
+    if mode == 'flask':
+        return [sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{port}',
+                '-w', str(workers), '--threads', str(threads), '--timeout', '120',
+                'API.app:app']
+    return [sys.executable, '-m', 'uvicorn', 'API.asgi:app', '--host', '127.0.0.1',
+            '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+
+
+def run_load(base_url, image_url, clients, requests_per_client):
+    """Envía las solicitudes y retorna el resumen de latencias y errores."""
+    local = threading.local()
+    errors = []
+
+    def call(url):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(f'{base_url}/predict', json={'image_url': url}, timeout=300)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+    def make_args(cid, i):
+        return (f'{image_url}?c={cid}&i={i}',)
+
+    latencies, wall = run_closed_loop(call, make_args, clients, requests_per_client)
+    summary = summarize_latencies(latencies, wall)
+    summary['errors'] = len(errors)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'plant_species.tflite'))
+    parser.add_argument('--modes', nargs='+', default=['flask', 'asgi'])
+    parser.add_argument('--delay', type=float, default=0.5, help='Demora del origen de imágenes (s)')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=4, help='Solicitudes por cliente')
+    parser.add_argument('--workers', type=int, default=1, help='Procesos por servidor')
+    parser.add_argument('--threads', type=int, default=4, help='Hilos por worker de gunicorn')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    buffer = io.BytesIO()
+    synthetic_photo(1024, 768).save(buffer, 'JPEG', quality=90)
+    image_server = start_slow_image_server(args.port + 1, args.delay, buffer.getvalue())
+    image_url = f'http://127.0.0.1:{args.port + 1}/planta.jpg'
+
+    env = dict(os.environ, MODEL_PATH=args.model, RESULT_CACHE_SIZE='0')
+    rows = []
+    for mode in args.modes:
+        proc = subprocess.Popen(
+            server_command(mode, args.port, args.workers, args.threads),
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f'http://127.0.0.1:{args.port}'
+        try:
+            wait_until_ready(base_url)
+            summary = run_load(base_url, image_url, args.clients, args.requests)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        rows.append({'mode': mode, **summary})
+
+    image_server.shutdown()
+    print_table(rows, ['mode', 'count', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'serving',
+            'model': args.model,
+            'origin_delay_s': args.delay,
+            'clients': args.clients,
+            'requests_per_client': args.requests,
+            'workers': args.workers,
+            'gunicorn_threads': args.threads,
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
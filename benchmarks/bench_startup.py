@@ -0,0 +1,93 @@
+"""
+Benchmark de arranque en frío: runtime LiteRT/tflite_runtime frente a TensorFlow.
+
+Cada medición se ejecuta en un proceso nuevo con TFLITE_RUNTIME fijado, y
+reporta el tiempo de importación de los módulos de la API, el tiempo de
+carga del modelo, la primera inferencia y el pico de RSS del proceso.
+
+Uso:
+    python -m benchmarks.bench_startup --model plant_species.tflite --repeat 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def run_child(model_path):
+    """Mide un arranque completo en este proceso e imprime el resultado como JSON."""
+    start = time.perf_counter()
+    from API import image_utils  # noqa: F401
+    from API.model_loader import ModelLoader
+    imported = time.perf_counter()
+    loader = ModelLoader(model_path, pool_size=1)
+    loaded = time.perf_counter()
+    height, width, channels = loader.get_input_shape()
+    loader.predict(np.zeros((height, width, channels), dtype=np.float32))
+    first = time.perf_counter()
+
+    from benchmarks.common import peak_rss_mb
+    print(json.dumps({
+        'runtime': loader.runtime,
+        'tensorflow_imported': 'tensorflow' in sys.modules,
+        'import_s': imported - start,
+        'load_s': loaded - imported,
+        'first_inference_s': first - loaded,
+        'total_s': first - start,
+        'peak_rss_mb': peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.getenv('MODEL_PATH', 'plant_species.tflite'))
+    parser.add_argument('--modes', nargs='+', default=['litert', 'tflite_runtime', 'tensorflow'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.model)
+        return
+
+    from benchmarks.common import print_table, write_json
+
+    rows = []
+    for mode in args.modes:
+        env = dict(os.environ, TFLITE_RUNTIME=mode)
+        runs = []
+        for _ in range(args.repeat):
+            proc = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_startup', '--child', '--model', args.model],
+                env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{mode}: no disponible ({proc.stderr.strip().splitlines()[-1]})")
+                break
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        if not runs:
+            continue
+        row = {'mode': mode, 'tensorflow_imported': runs[0]['tensorflow_imported']}
+        for key in ('import_s', 'load_s', 'first_inference_s', 'total_s', 'peak_rss_mb'):
+            row[key] = round(float(np.median([r[key] for r in runs])), 3)
+        rows.append(row)
+
+    print_table(rows, ['mode', 'tensorflow_imported', 'import_s', 'load_s',
+                       'first_inference_s', 'total_s', 'peak_rss_mb'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'startup',
+            'model': args.model,
+            'repeat': args.repeat,
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
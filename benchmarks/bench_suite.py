@@ -0,0 +1,227 @@
+"""
+Suite de benchmarks reproducible de la API, por etapas y de extremo a extremo.
+
+Usa un modelo TFLite sintético con la misma firma que el real (ver
+synthetic_model.py) y un corpus sintético de imágenes de varios tamaños y
+formatos, ambos generados con semilla fija y guardados en caché. Para cada
+imagen del corpus mide por separado:
+
+    decode       load_image_from_bytes (con FAST_DECODE, como la API)
+    preprocess   resize_image + escritura en el buffer de entrada del intérprete
+    invoke       interpreter.invoke()
+    postprocess  read_scores + format_predictions (top-k y etiquetas)
+    e2e          POST /predict con el cliente de pruebas de Flask
+
+y reporta p50/p95/p99, throughput y pico de RSS en JSON. Con --baseline se
+compara contra un JSON anterior de esta misma suite.
+
+Uso:
+    python -m benchmarks.bench_suite --output suite.json
+    python -m benchmarks.bench_suite --model plant_species.tflite --baseline suite.json
+"""
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from benchmarks.common import (
+    peak_rss_mb, print_table, run_closed_loop, summarize_latencies, synthetic_corpus, write_json
+)
+from benchmarks.synthetic_model import DEFAULT_PATH, ensure_synthetic_model
+
+STAGES = ('decode', 'preprocess', 'invoke', 'postprocess', 'e2e')
+
+
+def load_corpus(count, seed, cache_dir):
+    """Carga el corpus desde la caché en disco o lo genera y lo guarda."""
+    directory = os.path.join(cache_dir, f'plant_bench_corpus_{count}_{seed}')
+    if os.path.isdir(directory):
+        names = sorted(os.listdir(directory))
+        if len(names) == count:
+            corpus = []
+            for name in names:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    corpus.append((name, f.read()))
+            return corpus
+    print(f"Generando corpus sintético de {count} imágenes en {directory}...")
+    os.makedirs(directory, exist_ok=True)
+    corpus = []
+    for name, content, _, _ in synthetic_corpus(count, seed=seed):
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(content)
+        corpus.append((name, content))
+    return corpus
+
+
+def time_stages(corpus, rounds):
+    """
+    Mide cada etapa del pipeline por separado sobre el intérprete de la API.
+
+    Returns:
+        dict: Latencias en segundos por etapa
+    """
+    from API.image_utils import load_image_from_bytes, resize_image
+    from API.prediction import decode_options, format_predictions, model_registry
+    from API.tensor_io import read_scores
+
+    entry = model_registry.resolve()
+    loader = entry.loader
+    timings = {stage: [] for stage in STAGES[:-1]}
+    clock = time.perf_counter
+    for _ in range(rounds):
+        for _, content in corpus:
+            t0 = clock()
+            image = load_image_from_bytes(content, **decode_options(entry))
+            t1 = clock()
+            pixels = resize_image(image, target_size=entry.target_size)
+            with loader.pool.checkout() as member:
+                member.resize_input_if_needed(1)
+                loader.input_writer.write(member.interpreter, pixels)
+                t2 = clock()
+                member.interpreter.invoke()
+                t3 = clock()
+                scores = read_scores(member.interpreter, loader.output_details[0])
+            format_predictions(scores, 5, entry)
+            t4 = clock()
+            timings['decode'].append(t1 - t0)
+            timings['preprocess'].append(t2 - t1)
+            timings['invoke'].append(t3 - t2)
+            timings['postprocess'].append(t4 - t3)
+    return timings
+
+
+def time_end_to_end(corpus, rounds, clients):
+    """
+    Envía el corpus a POST /predict con el cliente de pruebas de Flask.
+
+    Returns:
+        tuple: (latencias en segundos, duración total, errores)
+    """
+    from API.app import app
+
+    errors = []
+
+    def call(name, content):
+        response = app.test_client().post(
+            '/predict',
+            data={'image_file': (io.BytesIO(content), name)},
+            content_type='multipart/form-data',
+        )
+        if response.status_code != 200:
+            errors.append((name, response.status_code))
+
+    requests_per_client = max(1, rounds * len(corpus) // clients)
+
+    def make_args(cid, i):
+        return corpus[(cid + i * clients) % len(corpus)]
+
+    call(*corpus[0])  # Calentamiento
+    latencies, wall = run_closed_loop(call, make_args, clients, requests_per_client)
+    return latencies, wall, errors
+
+
+def git_revision():
+    """Commit actual del repositorio, si está disponible."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Imprime la variación de p50/p99/throughput respecto de un JSON anterior."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = []
+    for stage in STAGES:
+        new, old = results['stages'].get(stage), baseline.get('stages', {}).get(stage)
+        if not new or not old:
+            continue
+        row = {'stage': stage}
+        for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+            if new.get(key) and old.get(key):
+                row[key] = f"{old[key]} -> {new[key]} ({(new[key] / old[key] - 1) * 100:+.1f}%)"
+        rows.append(row)
+    print(f"\nComparación con {baseline_path} ({baseline.get('git_revision')}):")
+    print_table(rows, ['stage', 'p50_ms', 'p99_ms', 'throughput_rps'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=None,
+                        help=f'Modelo .tflite (por defecto, el sintético en {DEFAULT_PATH})')
+    parser.add_argument('--images', type=int, default=42, help='Imágenes del corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rounds', type=int, default=3, help='Pasadas sobre el corpus por etapa')
+    parser.add_argument('--clients', type=int, default=1, help='Clientes concurrentes en e2e')
+    parser.add_argument('--cache-dir', default=tempfile.gettempdir(),
+                        help='Directorio de caché del corpus generado')
+    parser.add_argument('--baseline', default=None, help='JSON de una ejecución anterior')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    model_path = args.model or ensure_synthetic_model()
+    corpus = load_corpus(args.images, args.seed, args.cache_dir)
+
+    # La API lee su configuración del entorno al importarse; sin caché de
+    # resultados para que cada solicitud recorra el pipeline completo
+    os.environ['MODEL_PATH'] = model_path
+    os.environ['RESULT_CACHE_SIZE'] = '0'
+
+    start = time.perf_counter()
+    stage_timings = time_stages(corpus, args.rounds)
+    stages = {}
+    for stage, latencies in stage_timings.items():
+        stages[stage] = summarize_latencies(latencies, sum(latencies))
+    latencies, wall, errors = time_end_to_end(corpus, args.rounds, args.clients)
+    stages['e2e'] = summarize_latencies(latencies, wall)
+    stages['e2e']['errors'] = len(errors)
+
+    from API.prediction import model_registry
+    model_info = model_registry.resolve().info()
+    results = {
+        'benchmark': 'suite',
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'model': {
+            'path': model_path,
+            'synthetic': args.model is None,
+            'sha256': model_info['model_hash'],
+            'input_shape': [int(dim) for dim in model_info['input_shape']],
+            'runtime': model_info['runtime'],
+            'num_threads': model_info['num_threads'],
+        },
+        'corpus': {'images': len(corpus), 'seed': args.seed,
+                   'bytes': sum(len(content) for _, content in corpus)},
+        'rounds': args.rounds,
+        'e2e_clients': args.clients,
+        'duration_s': round(time.perf_counter() - start, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'stages': stages,
+    }
+
+    rows = [{'stage': stage, **summary} for stage, summary in stages.items()]
+    print_table(rows, ['stage', 'count', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'])
+    print(f"Pico de RSS: {results['peak_rss_mb']} MB")
+    if errors:
+        print(f"Errores e2e: {errors[:5]}")
+    if args.baseline:
+        compare(results, args.baseline)
+    if args.output:
+        write_json(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark de memoria y arranque de gunicorn según el número de workers.
+
+Para cada modo de carga del modelo y cada número de workers arranca
+gunicorn (con gunicorn.conf.py), espera a que todos los workers hayan
+creado sus intérpretes y mide:
+
+    spawn_s     desde el arranque hasta que el último worker está listo
+    rss_mb      suma del RSS del master y los workers (cuenta varias veces
+                las páginas compartidas)
+    pss_mb      suma del PSS (cada página compartida se reparte entre los
+                procesos que la usan): la memoria real del conjunto
+    private_mb  memoria privada (Private_Clean + Private_Dirty) por worker
+
+Modos:
+
+    read            MODEL_MMAP=0 sin preload: cada worker lee su copia del modelo
+    mmap            MODEL_MMAP=1 sin preload: el runtime mapea el archivo
+    mmap+preload    MODEL_MMAP=1 con preload_app: además el master importa la
+                    aplicación una vez y los workers la heredan por fork
+
+Por defecto usa el modelo sintético con 32 MB de pesos adicionales, de
+tamaño parecido al real. Solo funciona en Linux (lee /proc).
+
+Uso:
+    python -m benchmarks.bench_workers --workers 1 4 16
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import print_table, write_json
+from benchmarks.synthetic_model import ensure_synthetic_model
+
+MODES = {
+    'read': {'MODEL_MMAP': '0', 'GUNICORN_PRELOAD': '0'},
+    'mmap': {'MODEL_MMAP': '1', 'GUNICORN_PRELOAD': '0'},
+    'mmap+preload': {'MODEL_MMAP': '1', 'GUNICORN_PRELOAD': '1'},
+}
+READY_PATTERN = re.compile(r'Worker listo \(pid (\d+)\)')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def memory_kb(pid):
+    """
+    Lee Rss, Pss y memoria privada de un proceso desde /proc/<pid>/smaps_rollup.
+
+    Returns:
+        dict: rss, pss y private en KB
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def run_mode(mode, workers, model_path, timeout):
+    """Arranca gunicorn en un modo y retorna sus mediciones."""
+    port = free_port()
+    env = dict(
+        os.environ, MODEL_PATH=model_path, GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(workers), TF_CPP_MIN_LOG_LEVEL='3', **MODES[mode],
+    )
+    env.pop('DEFER_WORKER_INIT', None)
+    with tempfile.TemporaryFile('w+') as log:
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'API.app:app'],
+            stdout=log, stderr=subprocess.STDOUT, env=env,
+        )
+        try:
+            ready = set()
+            deadline = time.monotonic() + timeout
+            while len(ready) < workers:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    log.seek(0)
+                    raise RuntimeError(f'gunicorn no arrancó ({mode}, {workers}):\n{log.read()[-2000:]}')
+                time.sleep(0.05)
+                log.seek(0)
+                ready = set(READY_PATTERN.findall(log.read()))
+            spawn = time.perf_counter() - start
+            # Dejar que se asienten las asignaciones de los últimos workers
+            time.sleep(1.0)
+            master = memory_kb(server.pid)
+            per_worker = [memory_kb(int(pid)) for pid in ready]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    total = [master] + per_worker
+    return {
+        'mode': mode,
+        'workers': workers,
+        'spawn_s': round(spawn, 2),
+        'rss_mb': round(sum(m['rss'] for m in total) / 1024, 1),
+        'pss_mb': round(sum(m['pss'] for m in total) / 1024, 1),
+        'private_mb': round(sum(m['private'] for m in per_worker) / len(per_worker) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=None,
+                        help='Modelo .tflite (por defecto, el sintético de 32 MB adicionales)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES))
+    parser.add_argument('--timeout', type=float, default=300.0,
+                        help='Segundos máximos de espera por los workers')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    model_path = args.model or ensure_synthetic_model(
+        os.path.join(tempfile.gettempdir(), 'plant_species_synthetic_32mb.tflite'), extra_mb=32
+    )
+    rows = []
+    for workers in args.workers:
+        for mode in args.modes:
+            rows.append(run_mode(mode, workers, model_path, args.timeout))
+            print(f"{mode} x{workers}: {rows[-1]}", file=sys.stderr)
+
+    print(f"Modelo: {model_path} ({os.path.getsize(model_path) / 1024 / 1024:.1f} MB)")
+    print_table(rows, ['mode', 'workers', 'spawn_s', 'rss_mb', 'pss_mb', 'private_mb'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'workers',
+            'model': model_path,
+            'model_mb': round(os.path.getsize(model_path) / 1024 / 1024, 1),
+            'cpu_count': os.cpu_count(),
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
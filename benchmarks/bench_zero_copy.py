@@ -0,0 +1,152 @@
+"""
+Benchmark de la ruta de entrada al intérprete: copias anteriores frente a zero-copy.
+
+Para cada modelo compara, partiendo de la misma imagen ya decodificada:
+
+    anterior   resize -> float32 -> preprocess_input -> expand_dims -> max()/astype
+               -> set_tensor -> invoke -> get_tensor -> astype/np.where
+    zero-copy  resize_image (uint8) -> escritura en interpreter.tensor() -> invoke
+               -> una sola copia float32 de la vista de salida
+
+Reporta la latencia por solicitud (p50/p99) y las asignaciones de memoria de
+una solicitud: número de bloques >= --min-kb y bytes asignados, medidos con
+tracemalloc en cada llamada y retorno de función (los temporales creados y
+liberados dentro de una misma llamada nativa no se cuentan, en ninguno de
+los dos modos).
+
+Uso:
+    python -m benchmarks.bench_zero_copy --models plant_species.tflite modelo_int8.tflite
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from API.image_utils import preprocess_input, resize_image
+from API.model_loader import ModelLoader
+from benchmarks.common import print_table, summarize_latencies, synthetic_photo, write_json
+
+
+def legacy_request(loader, image, target_size):
+    """Reproduce la ruta de entrada y salida previa a la escritura directa."""
+    image = image.resize(target_size, Image.Resampling.LANCZOS)
+    image_array = preprocess_input(np.array(image, dtype=np.float32))
+    image_array = np.expand_dims(image_array, axis=0)
+    input_dtype = loader.input_details[0]['dtype']
+    if input_dtype == np.uint8:
+        if image_array.max() <= 1.0:
+            image_array = (image_array * 255).astype(np.uint8)
+        else:
+            image_array = image_array.astype(np.uint8)
+    else:
+        image_array = image_array.astype(input_dtype)
+    with loader.pool.checkout() as member:
+        member.resize_input_if_needed(1)
+        member.interpreter.set_tensor(loader.input_details[0]['index'], image_array)
+        member.interpreter.invoke()
+        output = member.interpreter.get_tensor(loader.output_details[0]['index'])
+    output = output.astype(np.float32, copy=False)
+    sums = output.sum(axis=-1, keepdims=True)
+    needs_norm = sums > 1.1
+    if needs_norm.any():
+        output = np.where(needs_norm, output / sums, output)
+    return output
+
+
+def zero_copy_request(loader, image, target_size):
+    """Ruta actual: píxeles uint8 escritos directamente en el buffer de entrada."""
+    return loader.predict_batch(resize_image(image, target_size))
+
+
+def count_allocations(fn, args, min_bytes):
+    """
+    Cuenta los bloques de memoria grandes asignados durante una llamada.
+
+    Returns:
+        tuple: (número de asignaciones >= min_bytes, bytes asignados)
+    """
+    count = 0
+    allocated = 0
+    last = 0
+
+    def profiler(frame, event, arg):
+        nonlocal count, allocated, last
+        current = tracemalloc.get_traced_memory()[0]
+        delta = current - last
+        if delta >= min_bytes:
+            count += 1
+            allocated += delta
+        last = current
+
+    tracemalloc.start()
+    last = tracemalloc.get_traced_memory()[0]
+    sys.setprofile(profiler)
+    try:
+        fn(*args)
+    finally:
+        sys.setprofile(None)
+        tracemalloc.stop()
+    return count, allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--models', nargs='+',
+                        default=[os.getenv('MODEL_PATH', 'plant_species.tflite')])
+    parser.add_argument('--requests', type=int, default=200, help='Solicitudes medidas por modo')
+    parser.add_argument('--width', type=int, default=1024)
+    parser.add_argument('--height', type=int, default=768)
+    parser.add_argument('--min-kb', type=int, default=16,
+                        help='Tamaño mínimo de una asignación contada (KB)')
+    parser.add_argument('--output', default=None, help='Ruta del JSON de resultados ("-" = stdout)')
+    args = parser.parse_args()
+
+    image = synthetic_photo(args.width, args.height)
+    modes = (('anterior', legacy_request), ('zero-copy', zero_copy_request))
+    rows = []
+    for model_path in args.models:
+        loader = ModelLoader(model_path, pool_size=1)
+        height, width, _ = loader.get_input_shape()
+        target_size = (width, height)
+        dtype = np.dtype(loader.input_details[0]['dtype']).name
+
+        for mode, fn in modes:
+            fn(loader, image, target_size)  # Calentamiento
+            allocations, allocated = count_allocations(
+                fn, (loader, image, target_size), args.min_kb * 1024
+            )
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                fn(loader, image, target_size)
+                latencies.append(time.perf_counter() - start)
+            summary = summarize_latencies(latencies)
+            rows.append({
+                'model': os.path.basename(model_path),
+                'input_dtype': dtype,
+                'mode': mode,
+                'allocations': allocations,
+                'allocated_kb': round(allocated / 1024, 1),
+                'p50_ms': summary['p50_ms'],
+                'p99_ms': summary['p99_ms'],
+            })
+
+    print_table(rows, ['model', 'input_dtype', 'mode', 'allocations', 'allocated_kb',
+                       'p50_ms', 'p99_ms'])
+    if args.output:
+        write_json(args.output, {
+            'benchmark': 'zero_copy',
+            'image_size': [args.width, args.height],
+            'requests': args.requests,
+            'min_allocation_kb': args.min_kb,
+            'results': rows,
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Utilidades compartidas por los scripts de benchmark.
+
+Los scripts se ejecutan desde la raíz del repositorio, por ejemplo:
+    python -m benchmarks.bench_batching --model plant_species.tflite
+"""
+
+import json
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+def summarize_latencies(latencies_s, wall_time_s=None):
+    """
+    Resume una lista de latencias en segundos.
+
+    Args:
+        latencies_s (list): Latencias individuales en segundos
+        wall_time_s (float): Duración total de la prueba, para calcular throughput
+
+    Returns:
+        dict: p50/p95/p99/media en milisegundos y throughput en solicitudes/s
+    """
+    lat_ms = np.asarray(latencies_s, dtype=np.float64) * 1000.0
+    summary = {
+        'count': int(lat_ms.size),
+        'mean_ms': round(float(lat_ms.mean()), 3) if lat_ms.size else None,
+        'p50_ms': round(float(np.percentile(lat_ms, 50)), 3) if lat_ms.size else None,
+        'p95_ms': round(float(np.percentile(lat_ms, 95)), 3) if lat_ms.size else None,
+        'p99_ms': round(float(np.percentile(lat_ms, 99)), 3) if lat_ms.size else None,
+    }
+    if wall_time_s:
+        summary['throughput_rps'] = round(lat_ms.size / wall_time_s, 2)
+    return summary
+
+
+def run_closed_loop(fn, make_args, clients, requests_per_client):
+    """
+    Ejecuta `fn` desde varios hilos cliente, cada uno enviando su siguiente
+    solicitud en cuanto recibe la respuesta anterior.
+
+    Args:
+        fn (callable): Operación a medir
+        make_args (callable): Recibe (cliente, iteración) y retorna la tupla de argumentos
+        clients (int): Número de hilos cliente concurrentes
+        requests_per_client (int): Solicitudes que envía cada cliente
+
+    Returns:
+        tuple: (latencias en segundos, duración total en segundos)
+    """
+    latencies = [[] for _ in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(cid):
+        barrier.wait()
+        for i in range(requests_per_client):
+            args = make_args(cid, i)
+            start = time.perf_counter()
+            fn(*args)
+            latencies[cid].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return [lat for per_client in latencies for lat in per_client], wall
+
+
+def peak_rss_mb():
+    """Retorna el pico de memoria residente del proceso actual en MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS reporta bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def synthetic_photo(width, height, seed=0):
+    """
+    Genera una imagen RGB sintética con estructura similar a una fotografía:
+    regiones suaves de color con bordes y algo de ruido de sensor.
+
+    Args:
+        width (int): Ancho en píxeles
+        height (int): Alto en píxeles
+        seed (int): Semilla para que el corpus sea reproducible
+
+    Returns:
+        PIL.Image.Image: Imagen RGB
+    """
+    from PIL import Image, ImageFilter
+
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, size=(max(2, height // 256), max(2, width // 256), 3), dtype=np.uint8)
+    image = Image.fromarray(coarse).resize((width, height), Image.Resampling.BICUBIC)
+    image = image.filter(ImageFilter.EDGE_ENHANCE)
+    noise = rng.normal(0, 6, size=(height, width, 1)).astype(np.int16)
+    pixels = np.clip(np.asarray(image, dtype=np.int16) + noise, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+
+# Tamaños (ancho, alto) y formatos del corpus sintético: desde miniaturas
+# hasta fotos de móvil de 12 MP, en vertical y horizontal
+CORPUS_SIZES = ((320, 240), (800, 600), (1024, 1024), (1920, 1080), (3024, 4032), (4000, 3000))
+CORPUS_FORMATS = (
+    ('jpg', 'JPEG', 'RGB', {'quality': 90}),
+    ('png', 'PNG', 'RGB', {'compress_level': 6}),
+    ('jpg', 'JPEG', 'RGB', {'quality': 75, 'progressive': True}),
+    ('webp', 'WEBP', 'RGB', {'quality': 80}),
+    ('jpg', 'JPEG', 'L', {'quality': 90}),
+    ('png', 'PNG', 'RGBA', {'compress_level': 6}),
+    ('gif', 'GIF', 'P', {}),
+)
+
+
+def synthetic_corpus(count, seed=0):
+    """
+    Genera un corpus reproducible de imágenes codificadas de varios tamaños y formatos.
+
+    Args:
+        count (int): Número de imágenes
+        seed (int): Semilla del corpus
+
+    Returns:
+        list: Tuplas (nombre, bytes, (ancho, alto), formato)
+    """
+    import io
+
+    corpus = []
+    for i in range(count):
+        width, height = CORPUS_SIZES[i % len(CORPUS_SIZES)]
+        ext, image_format, mode, options = CORPUS_FORMATS[i % len(CORPUS_FORMATS)]
+        image = synthetic_photo(width, height, seed=seed + i)
+        if mode == 'P':
+            image = image.quantize(256)
+        elif mode != 'RGB':
+            image = image.convert(mode)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **options)
+        name = f'img_{i:03d}_{width}x{height}_{mode.lower()}.{ext}'
+        corpus.append((name, buffer.getvalue(), (width, height), image_format))
+    return corpus
+
+
+def print_table(rows, columns):
+    """Imprime una lista de diccionarios como tabla de texto alineada."""
+    widths = [max(len(col), *(len(str(r.get(col, ''))) for r in rows)) for col in columns]
+    print('  '.join(col.ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
+
+
+def write_json(path, payload):
+    """Escribe el resultado de un benchmark como JSON (o a stdout si path es '-')."""
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    if path == '-':
+        print(text)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
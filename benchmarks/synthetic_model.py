@@ -0,0 +1,115 @@
+"""
+Modelo TFLite sintético con la misma firma que plant_species.tflite.
+
+Entrada (1, 256, 256, 3) float32 con píxeles en [0, 255] (la normalización
+va dentro del modelo, como en EfficientNet) y salida softmax con una clase
+por entrada de labels.json (100). Es una red convolucional pequeña con pesos
+aleatorios de semilla fija: sirve para medir el rendimiento de la API sin
+descargar el modelo real, no para clasificar.
+
+Generarlo requiere TensorFlow (requirements.txt); los benchmarks lo generan
+en un subproceso y lo reutilizan desde la caché en ejecuciones posteriores.
+
+Uso:
+    python -m benchmarks.synthetic_model --output /tmp/plant_species_synthetic.tflite
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+LABELS_PATH = os.path.join(os.path.dirname(__file__), '..', 'API', 'labels.json')
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), 'plant_species_synthetic.tflite')
+INPUT_SIZE = (256, 256)
+
+
+def num_labels(labels_path=LABELS_PATH):
+    """Número de clases definidas en labels.json."""
+    with open(labels_path, 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+
+def build_model(output_path, num_classes, seed=0, extra_mb=0):
+    """
+    Construye y convierte el modelo sintético.
+
+    Args:
+        output_path (str): Ruta del .tflite a escribir
+        num_classes (int): Tamaño de la salida
+        seed (int): Semilla de los pesos
+        extra_mb (int): MB de pesos float32 adicionales (una capa densa oculta),
+            para acercar el tamaño del archivo al del modelo real
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    height, width = INPUT_SIZE
+    hidden = []
+    if extra_mb:
+        units = extra_mb * 1024 * 1024 // 4 // (128 + num_classes)
+        hidden = [tf.keras.layers.Dense(units, activation='relu')]
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(height, width, 3)),
+        tf.keras.layers.Rescaling(1.0 / 255),
+        tf.keras.layers.Conv2D(16, 3, strides=2, padding='same', activation='relu'),
+        tf.keras.layers.DepthwiseConv2D(3, padding='same', activation='relu'),
+        tf.keras.layers.Conv2D(32, 1, activation='relu'),
+        tf.keras.layers.Conv2D(64, 3, strides=2, padding='same', activation='relu'),
+        tf.keras.layers.DepthwiseConv2D(3, strides=2, padding='same', activation='relu'),
+        tf.keras.layers.Conv2D(128, 1, activation='relu'),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        *hidden,
+        tf.keras.layers.Dense(num_classes, activation='softmax'),
+    ])
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(converter.convert())
+    os.replace(tmp_path, output_path)
+
+
+def ensure_synthetic_model(path=DEFAULT_PATH, num_classes=None, extra_mb=0):
+    """
+    Retorna la ruta del modelo sintético, generándolo si no existe.
+
+    La generación corre en un subproceso para no cargar TensorFlow (ni su
+    memoria) en el proceso que mide.
+
+    Args:
+        path (str): Ruta del .tflite en caché
+        num_classes (int): Clases de salida; por defecto las de labels.json
+        extra_mb (int): MB de pesos adicionales (ver build_model)
+
+    Returns:
+        str: Ruta del modelo
+    """
+    if not os.path.exists(path):
+        num_classes = num_classes or num_labels()
+        print(f"Generando modelo sintético ({num_classes} clases) en {path}...")
+        env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.synthetic_model',
+             '--output', path, '--classes', str(num_classes), '--extra-mb', str(extra_mb)],
+            check=True, env=env,
+        )
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', default=DEFAULT_PATH)
+    parser.add_argument('--classes', type=int, default=None,
+                        help='Clases de salida (por defecto, las de labels.json)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--extra-mb', type=int, default=0,
+                        help='MB de pesos adicionales para simular un modelo más grande')
+    args = parser.parse_args()
+    build_model(args.output, args.classes or num_labels(), seed=args.seed, extra_mb=args.extra_mb)
+    print(f"Modelo sintético escrito en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
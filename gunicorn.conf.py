@@ -0,0 +1,47 @@
+"""
+Configuración de gunicorn para la API.
+
+gunicorn la lee automáticamente si se ejecuta desde la raíz del repositorio:
+
+    gunicorn API.app:app
+
+Con preload_app (por defecto) el master importa la aplicación y lee el
+modelo una sola vez antes de crear los workers. Los workers comparten sus
+páginas (el archivo mapeado y la memoria de Python, copy-on-write) y solo
+crean después del fork lo que no se puede heredar: los intérpretes, el
+micro-batcher y el pool de decodificación.
+
+Variables de entorno: GUNICORN_BIND, GUNICORN_WORKERS, GUNICORN_THREADS,
+GUNICORN_TIMEOUT y GUNICORN_PRELOAD (1/0).
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # El master no debe crear intérpretes ni hilos que los workers heredarían rotos
+    os.environ['DEFER_WORKER_INIT'] = '1'
+
+
+def on_starting(server):
+    """
+    Publica el número real de workers (también si se pasó con -w) para el
+    ajuste automático de los intérpretes, que se hace en cada worker, y
+    vacía el directorio de métricas de este master antes de crearlos.
+    """
+    os.environ['GUNICORN_WORKERS'] = str(server.cfg.workers)
+    os.environ['METRICS_OWNER_PID'] = str(os.getpid())
+    from API.metrics import REGISTRY
+    REGISTRY.clear()
+
+
+def post_worker_init(worker):
+    """Crea los recursos del worker antes de que atienda su primera solicitud."""
+    from API.prediction import init_worker
+    init_worker()
+    worker.log.info("Worker listo (pid %s)", worker.pid)
@@ -0,0 +1,149 @@
+"""
+Utilidades compartidas de las pruebas: un servidor HTTP local que hace de
+servidor remoto (imágenes por URL, descarga del modelo) y la API cargada
+con el modelo sintético de benchmarks/synthetic_model.py.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+ADMIN_TOKEN = 'test-admin-token'
+# Configuración de la API en las pruebas: leída del entorno al importarla
+API_ENVIRONMENT = {
+    'MODEL_URL': '',
+    'ADMIN_TOKEN': ADMIN_TOKEN,
+    'METRICS_FLUSH_INTERVAL': '0.05',
+    'GUNICORN_WORKERS': '1',
+}
+PROXY_VARIABLES = ('HTTP_PROXY', 'HTTPS_PROXY', 'ALL_PROXY', 'http_proxy', 'https_proxy',
+                   'all_proxy')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.stand_in.requests.append((self.path, dict(self.headers)))
+        route = self.server.stand_in.routes.get(self.path.split('?', 1)[0])
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            route(self)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandonó la descarga
+            self.server.stand_in.aborted.append(self.path)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """
+    Servidor HTTP en un hilo. Cada ruta la atiende una función que recibe el
+    BaseHTTPRequestHandler y escribe la respuesta completa.
+
+    Attributes:
+        requests (list): (ruta, cabeceras) de cada solicitud recibida
+        aborted (list): Rutas cuya respuesta cortó el cliente
+        release (threading.Event): Lo esperan las rutas que se quedan
+            bloqueadas a mitad de la respuesta; se activa al cerrar
+    """
+
+    def __init__(self, routes):
+        self.routes = dict(routes)
+        self.requests = []
+        self.aborted = []
+        self.release = threading.Event()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+        self._thread.start()
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}{path}'
+
+    def close(self):
+        self.release.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def send_chunk(handler, data):
+    """Escribe un fragmento de una respuesta con Transfer-Encoding: chunked."""
+    handler.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+    handler.wfile.flush()
+
+
+def end_chunks(handler):
+    handler.wfile.write(b'0\r\n\r\n')
+    handler.wfile.flush()
+
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    """Fábrica de servidores locales: stand_in_server({ruta: función}) -> StandInServer."""
+    # Las solicitudes a 127.0.0.1 no deben pasar por un proxy del entorno
+    for name in PROXY_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    servers = []
+
+    def start(routes):
+        server = StandInServer(routes)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture(scope='session')
+def api():
+    """
+    Módulo API.prediction cargado con el modelo sintético (se genera con
+    TensorFlow la primera vez y queda en caché).
+    """
+    from benchmarks.synthetic_model import DEFAULT_PATH, ensure_synthetic_model
+
+    if not os.path.exists(DEFAULT_PATH) and importlib.util.find_spec('tensorflow') is None:
+        pytest.skip('Generar el modelo sintético requiere TensorFlow.')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(ROOT)
+        model_path = ensure_synthetic_model()
+    for name, value in {**API_ENVIRONMENT, 'MODEL_PATH': model_path}.items():
+        os.environ[name] = value
+    return importlib.import_module('API.prediction')
+
+
+@pytest.fixture
+def flask_client(api):
+    from API.app import app
+
+    return app.test_client()
+
+
+@pytest.fixture
+def asgi_client(api):
+    pytest.importorskip('starlette')
+    pytest.importorskip('httpx')
+    from starlette.testclient import TestClient
+
+    from API.asgi import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,130 @@
+"""
+Endpoints de administración de modelos con uno y con varios workers.
+"""
+
+import threading
+import time
+
+import pytest
+
+from tests.conftest import ADMIN_TOKEN
+
+HEADERS = {'X-Admin-Token': ADMIN_TOKEN}
+
+
+@pytest.fixture
+def several_workers(api, monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKERS', '4')
+    monkeypatch.setattr(api, 'MODEL_REGISTRY_PATH', None)
+
+
+def admin_calls(client):
+    """Las tres operaciones de administración, con datos que no cambian nada."""
+    return [
+        client.post('/admin/models', json={'version': 'v2'}, headers=HEADERS),
+        client.put('/admin/models/default', json={'model': 'no-existe'}, headers=HEADERS),
+        client.delete('/admin/models/no-existe/v1', headers=HEADERS),
+    ]
+
+
+def test_flask_rejects_changes_local_to_one_worker(flask_client, several_workers):
+    for response in admin_calls(flask_client):
+        assert response.status_code == 409
+        assert 'MODEL_REGISTRY_PATH' in response.get_json()['error']
+
+
+def test_asgi_rejects_changes_local_to_one_worker(asgi_client, several_workers):
+    for response in admin_calls(asgi_client):
+        assert response.status_code == 409
+        assert 'MODEL_REGISTRY_PATH' in response.json()['error']
+
+
+def test_single_worker_allows_local_changes(flask_client, api, monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKERS', '1')
+    monkeypatch.setattr(api, 'MODEL_REGISTRY_PATH', None)
+    # Datos inválidos: la solicitud pasa la comprobación y falla al validarlos
+    assert [r.status_code for r in admin_calls(flask_client)] == [400, 400, 400]
+
+
+def test_registry_file_allows_several_workers(flask_client, api, monkeypatch, tmp_path):
+    monkeypatch.setenv('GUNICORN_WORKERS', '4')
+    monkeypatch.setattr(api, 'MODEL_REGISTRY_PATH', str(tmp_path / 'models.json'))
+    assert [r.status_code for r in admin_calls(flask_client)] == [400, 400, 400]
+
+
+def test_token_checked_before_scope(flask_client, several_workers):
+    response = flask_client.delete('/admin/models/no-existe/v1')
+    assert response.status_code == 403
+
+
+@pytest.fixture
+def file_registry(api, monkeypatch, tmp_path):
+    """
+    Registro con archivo de configuración (plant:1 activa, plant:3 sin
+    activar) cuya carga de plant:2 queda bloqueada hasta activar el evento
+    retornado.
+    """
+    from API.model_registry import ModelRegistry
+
+    config_path = str(tmp_path / 'models.json')
+    model_path = api.model_registry.default_entry().loader.model_path
+    specs = [{'name': 'plant', 'version': version, 'model_path': model_path,
+              'active': version == '1'} for version in ('1', '3')]
+    registry = ModelRegistry(api.LABELS_PATH, config_path=config_path)
+    registry._write_config('plant', specs)
+    registry.load_config()
+    loading = threading.Event()
+    release = threading.Event()
+    build = registry._build
+
+    def blocking_build(name, version, *args, **kwargs):
+        if version == '2':
+            loading.set()
+            release.wait(10)
+        return build(name, version, *args, **kwargs)
+
+    monkeypatch.setattr(registry, '_build', blocking_build)
+    monkeypatch.setattr(api, 'model_registry', registry)
+    monkeypatch.setattr(api, 'MODEL_REGISTRY_PATH', config_path)
+    monkeypatch.setenv('GUNICORN_WORKERS', '4')
+    registry.add_to_config('plant', '2', model_path, activate=False, keep_previous=True)
+    registry.reload()
+    assert loading.wait(10)
+    registry.release = release
+    yield registry
+    release.set()
+
+
+def config_versions(registry):
+    return sorted(str(spec['version']) for spec in registry._read_config()[1])
+
+
+def test_admin_changes_keep_versions_still_loading(flask_client, file_registry):
+    response = flask_client.put('/admin/models/default', json={'model': 'plant:1'},
+                                headers=HEADERS)
+    assert response.status_code == 200
+    response = flask_client.delete('/admin/models/plant/3', headers=HEADERS)
+    assert response.status_code == 200
+    # plant:2 sigue en el archivo aunque este proceso aún no la haya publicado
+    assert config_versions(file_registry) == ['1', '2']
+    assert file_registry._read_config()[0] == 'plant'
+    # Al terminar la carga, la reconciliación con el archivo no la retira
+    file_registry.release.set()
+    deadline = time.monotonic() + 10
+    while '2' not in file_registry._entries['plant'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    file_registry.reload()
+    assert sorted(file_registry._entries['plant']) == ['1', '2']
+
+
+@pytest.mark.parametrize('client_name', ['flask_client', 'asgi_client'])
+def test_non_object_body_rejected(request, client_name, api, monkeypatch):
+    monkeypatch.setattr(api, 'MODEL_REGISTRY_PATH', None)
+    client = request.getfixturevalue(client_name)
+    for response in (
+        client.post('/admin/models', json=['v2'], headers=HEADERS),
+        client.put('/admin/models/default', json=['plant'], headers=HEADERS),
+    ):
+        assert response.status_code == 400
+        body = response.json() if callable(response.json) else response.json
+        assert 'objeto' in body['error']
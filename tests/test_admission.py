@@ -0,0 +1,219 @@
+"""
+Control de admisión (admission.py) y su alcance en /predict.
+"""
+
+import io
+import threading
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from API.admission import AdmissionController, AdmissionRejectedError
+
+FETCH_SECONDS = 0.3
+
+
+def make_jpeg(seed):
+    """JPEG distinto por semilla, para no acertar en la caché de resultados."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+def hold_slot(controller):
+    """Ocupa una plaza en otro hilo hasta que se active el evento retornado."""
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with controller.admit():
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def test_rejects_when_queue_full():
+    controller = AdmissionController(initial_limit=1, max_limit=1, max_queue=0)
+    release, thread = hold_slot(controller)
+    with pytest.raises(AdmissionRejectedError) as excinfo:
+        with controller.admit():
+            pass
+    assert excinfo.value.reason == 'queue_full'
+    assert excinfo.value.retry_after >= 1
+    release.set()
+    thread.join(5)
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_rejects_after_queue_timeout():
+    controller = AdmissionController(initial_limit=1, max_limit=1, max_queue=1,
+                                     queue_timeout=0.05)
+    release, thread = hold_slot(controller)
+    with pytest.raises(AdmissionRejectedError) as excinfo:
+        with controller.admit():
+            pass
+    assert excinfo.value.reason == 'queue_timeout'
+    assert controller.stats()['queued'] == 0
+    release.set()
+    thread.join(5)
+
+
+def test_released_slot_goes_to_waiter():
+    controller = AdmissionController(initial_limit=1, max_limit=1, max_queue=1,
+                                     queue_timeout=5)
+    release, thread = hold_slot(controller)
+    threading.Timer(0.05, release.set).start()
+    with controller.admit():
+        assert controller.stats()['in_flight'] == 1
+    thread.join(5)
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_failed_blocks_do_not_feed_latency():
+    controller = AdmissionController()
+    with pytest.raises(RuntimeError):
+        with controller.admit():
+            raise RuntimeError('fallo')
+    assert controller.stats()['short_latency_ms'] is None
+
+
+def test_limit_shrinks_when_latency_rises():
+    controller = AdmissionController(initial_limit=32, max_limit=64)
+    # Límite en uso: las muestras cuentan
+    controller._in_flight = 32
+    with controller._lock:
+        for _ in range(200):
+            controller._update_limit(0.01)
+        steady = controller.limit
+        for _ in range(50):
+            controller._update_limit(0.1)
+    assert steady >= 32
+    assert controller.limit < steady
+
+
+@pytest.fixture
+def controller(api, monkeypatch):
+    """Control de admisión nuevo para la API que registra las muestras de latencia."""
+    controller = AdmissionController(initial_limit=4, max_queue=4, queue_timeout=1)
+    controller.samples = []
+    update_limit = controller._update_limit
+
+    def record(latency):
+        controller.samples.append(latency)
+        update_limit(latency)
+
+    monkeypatch.setattr(controller, '_update_limit', record)
+    monkeypatch.setattr(api, 'admission', controller)
+    return controller
+
+
+@pytest.fixture
+def slow_image_server(stand_in_server, controller):
+    """Imagen servida en FETCH_SECONDS; anota las inferencias en curso durante la descarga."""
+    content = make_jpeg(int(time.time_ns() % 2 ** 32))
+    in_flight = []
+
+    def route(handler):
+        in_flight.append(controller.stats()['in_flight'])
+        time.sleep(FETCH_SECONDS)
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'image/jpeg')
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    server = stand_in_server({'/slow.jpg': route})
+    return server.url('/slow.jpg'), content, in_flight
+
+
+def test_flask_admits_only_inference(flask_client, controller, slow_image_server):
+    url, content, in_flight = slow_image_server
+    response = flask_client.post('/predict', json={'image_url': url})
+    assert response.status_code == 200, response.get_json()
+    # La descarga no ocupó plaza ni cuenta en la latencia
+    assert in_flight == [0]
+    assert len(controller.samples) == 1
+    assert controller.samples[0] < FETCH_SECONDS
+    # Un acierto de caché no pasa por el control de admisión
+    response = flask_client.post(
+        '/predict', data={'image_file': (io.BytesIO(content), 'imagen.jpg')}
+    )
+    assert response.status_code == 200
+    assert len(controller.samples) == 1
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_asgi_admits_only_inference(stand_in_server, asgi_client, controller, slow_image_server):
+    url, content, in_flight = slow_image_server
+    response = asgi_client.post('/predict', json={'image_url': url})
+    assert response.status_code == 200, response.json()
+    assert in_flight == [0]
+    assert len(controller.samples) == 1
+    assert controller.samples[0] < FETCH_SECONDS
+    response = asgi_client.post(
+        '/predict', files={'image_file': ('imagen.jpg', content, 'image/jpeg')}
+    )
+    assert response.status_code == 200
+    assert len(controller.samples) == 1
+    assert controller.stats()['in_flight'] == 0
+
+
+def batch_upload(count, seed):
+    """Formulario de /predict/batch con `count` imágenes distintas."""
+    return {
+        'image_files': [
+            (io.BytesIO(make_jpeg(seed + i)), f'imagen{i}.jpg') for i in range(count)
+        ]
+    }
+
+
+def test_batch_takes_one_slot_per_chunk(flask_client, controller, monkeypatch):
+    monkeypatch.setattr('API.app.BATCH_ENDPOINT_CHUNK_SIZE', 2)
+    admitted = []
+    admit = controller.admit
+
+    def counting_admit(*args, **kwargs):
+        admitted.append(kwargs)
+        return admit(*args, **kwargs)
+
+    monkeypatch.setattr(controller, 'admit', counting_admit)
+    seed = int(time.time_ns() % 2 ** 31)
+    response = flask_client.post('/predict/batch', data=batch_upload(5, seed))
+    assert response.status_code == 200
+    assert [r['success'] for r in response.get_json()['results']] == [True] * 5
+    assert len(admitted) == 3
+    # Los lotes no ajustan el límite con su latencia
+    assert controller.samples == []
+    assert controller.stats()['in_flight'] == 0
+
+
+def test_batch_shed_when_saturated(flask_client, api, monkeypatch):
+    controller = AdmissionController(initial_limit=1, max_limit=1, max_queue=0)
+    monkeypatch.setattr(api, 'admission', controller)
+    release, thread = hold_slot(controller)
+    try:
+        seed = int(time.time_ns() % 2 ** 31)
+        response = flask_client.post('/predict/batch', data=batch_upload(2, seed))
+    finally:
+        release.set()
+        thread.join(5)
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['success'] is False
+
+
+def test_batch_deadline(flask_client, controller, slow_image_server):
+    url, _, _ = slow_image_server
+    response = flask_client.post(
+        '/predict/batch', json={'image_urls': [url, url]},
+        headers={'X-Request-Timeout': str(FETCH_SECONDS / 3)},
+    )
+    assert response.status_code == 504
+    assert 'plazo' in response.get_json()['error']
+    assert controller.stats()['in_flight'] == 0
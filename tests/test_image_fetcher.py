@@ -0,0 +1,202 @@
+"""
+ImageFetcher y AsyncImageFetcher contra un servidor HTTP local.
+"""
+
+import asyncio
+import socket
+import time
+
+import pytest
+import requests
+
+from API.image_fetcher import AsyncImageFetcher, ImageFetcher
+from tests.conftest import end_chunks, send_chunk
+
+MAX_BYTES = 4096
+CHUNK_SIZE = 1024
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * (CHUNK_SIZE - 4)
+# Espera que no debe llegar a cumplirse: el cliente tiene que abandonar antes
+BLOCK_SECONDS = 10
+
+
+def serve_image(handler):
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'image/jpeg')
+    handler.send_header('Content-Length', str(len(JPEG)))
+    handler.end_headers()
+    handler.wfile.write(JPEG)
+
+
+def serve_too_long(handler):
+    # Anuncia más bytes de los permitidos y no envía el cuerpo hasta el cierre
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'image/jpeg')
+    handler.send_header('Content-Length', str(MAX_BYTES + 1))
+    handler.end_headers()
+    handler.wfile.flush()
+    handler.server.stand_in.release.wait(BLOCK_SECONDS)
+    handler.wfile.write(b'\x00' * (MAX_BYTES + 1))
+
+
+def serve_endless_stream(handler):
+    # Sin Content-Length: el tope solo se puede aplicar durante la lectura
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'image/jpeg')
+    handler.send_header('Transfer-Encoding', 'chunked')
+    handler.end_headers()
+    for _ in range(2 * MAX_BYTES // CHUNK_SIZE):
+        send_chunk(handler, JPEG)
+    handler.server.stand_in.release.wait(BLOCK_SECONDS)
+    end_chunks(handler)
+
+
+def serve_html(handler):
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'text/html')
+    handler.send_header('Transfer-Encoding', 'chunked')
+    handler.end_headers()
+    send_chunk(handler, b'<!DOCTYPE html>'.ljust(CHUNK_SIZE, b' '))
+    handler.server.stand_in.release.wait(BLOCK_SECONDS)
+    end_chunks(handler)
+
+
+def serve_nothing(handler):
+    # Conexión aceptada, pero sin respuesta: solo vence el timeout de lectura
+    handler.server.stand_in.release.wait(BLOCK_SECONDS)
+
+
+ROUTES = {
+    '/image.jpg': serve_image,
+    '/too-long.jpg': serve_too_long,
+    '/endless.jpg': serve_endless_stream,
+    '/page.html': serve_html,
+    '/slow.jpg': serve_nothing,
+}
+
+
+@pytest.fixture
+def server(stand_in_server):
+    return stand_in_server(ROUTES)
+
+
+@pytest.fixture
+def unresponsive_port():
+    """
+    Puerto que nunca completa el handshake TCP: con la cola de conexiones
+    pendientes llena, Linux descarta los SYN nuevos y solo vence el timeout
+    de conexión.
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    fillers = []
+    for _ in range(4):
+        filler = socket.socket()
+        filler.setblocking(False)
+        try:
+            filler.connect(('127.0.0.1', port))
+        except BlockingIOError:
+            pass
+        fillers.append(filler)
+    time.sleep(0.1)
+    yield port
+    for sock in fillers + [listener]:
+        sock.close()
+
+
+def fetch(kind, url, **options):
+    """Descarga `url` con ImageFetcher ('sync') o AsyncImageFetcher ('async')."""
+    options = {'max_bytes': MAX_BYTES, 'chunk_size': CHUNK_SIZE, **options}
+    if kind == 'sync':
+        return ImageFetcher(**options).fetch(url)
+
+    async def run():
+        fetcher = AsyncImageFetcher(**options)
+        try:
+            return await fetcher.fetch(url)
+        finally:
+            await fetcher.aclose()
+
+    return asyncio.run(run())
+
+
+def timeout_errors(kind):
+    """Clases de los errores de timeout de conexión y de lectura de cada cliente."""
+    if kind == 'sync':
+        return requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout
+    httpx = pytest.importorskip('httpx')
+    return httpx.ConnectTimeout, httpx.ReadTimeout
+
+
+@pytest.fixture(params=['sync', 'async'])
+def kind(request):
+    if request.param == 'async':
+        pytest.importorskip('httpx')
+    return request.param
+
+
+def test_downloads_image(kind, server):
+    assert fetch(kind, server.url('/image.jpg')) == JPEG
+
+
+def test_rejects_content_length_before_reading_body(kind, server):
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match='tamaño máximo'):
+        fetch(kind, server.url('/too-long.jpg'), read_timeout=BLOCK_SECONDS)
+    # El cuerpo no llega hasta el cierre del servidor: no se esperó
+    assert time.perf_counter() - start < BLOCK_SECONDS / 2
+
+
+def test_aborts_stream_over_cap(kind, server):
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match='tamaño máximo'):
+        fetch(kind, server.url('/endless.jpg'), read_timeout=BLOCK_SECONDS)
+    # Se cortó al superar el tope, sin esperar al final del cuerpo
+    assert time.perf_counter() - start < BLOCK_SECONDS / 2
+
+
+def test_rejects_non_image_after_first_chunk(kind, server):
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match='no es una imagen'):
+        fetch(kind, server.url('/page.html'), read_timeout=BLOCK_SECONDS)
+    assert time.perf_counter() - start < BLOCK_SECONDS / 2
+
+
+def test_read_timeout(kind, server):
+    _, read_error = timeout_errors(kind)
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match='Error al descargar') as excinfo:
+        fetch(kind, server.url('/slow.jpg'), connect_timeout=BLOCK_SECONDS, read_timeout=0.3)
+    elapsed = time.perf_counter() - start
+    assert isinstance(excinfo.value.__context__, read_error)
+    # Venció el timeout de lectura, no el de conexión
+    assert 0.25 <= elapsed < BLOCK_SECONDS / 2
+
+
+def test_connect_timeout(kind, unresponsive_port):
+    connect_error, _ = timeout_errors(kind)
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match='Error al descargar') as excinfo:
+        fetch(kind, f'http://127.0.0.1:{unresponsive_port}/image.jpg',
+              connect_timeout=0.3, read_timeout=BLOCK_SECONDS)
+    elapsed = time.perf_counter() - start
+    assert isinstance(excinfo.value.__context__, connect_error)
+    assert 0.25 <= elapsed < BLOCK_SECONDS / 2
+
+
+@pytest.mark.parametrize('url', [5, ['http://127.0.0.1/image.jpg'], None])
+def test_rejects_non_string_url(kind, url):
+    with pytest.raises(ValueError, match='http'):
+        fetch(kind, url)
+
+
+@pytest.mark.parametrize('client_name', ['flask_client', 'asgi_client'])
+def test_api_rejects_non_string_url(request, client_name):
+    client = request.getfixturevalue(client_name)
+    response = client.post('/predict', json={'image_url': 5})
+    assert response.status_code == 400
+    if client_name == 'flask_client':
+        results = client.post('/predict/batch', json={'image_urls': [5]}).get_json()['results']
+        assert results[0]['success'] is False
+        assert 'http' in results[0]['error']
@@ -0,0 +1,72 @@
+"""
+Volcado y directorio compartido de las métricas (metrics.py).
+"""
+
+import os
+import runpy
+import threading
+import time
+from types import SimpleNamespace
+
+from API import metrics
+from API.metrics import MetricsRegistry, metrics_owner_pid
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_observations_never_flush_in_calling_thread(tmp_path, monkeypatch):
+    registry = MetricsRegistry(directory=str(tmp_path), flush_interval=0.01)
+    counter = registry.counter('test_total', 'Prueba.')
+    flushed = threading.Event()
+    threads = []
+
+    def flush():
+        threads.append(threading.current_thread())
+        flushed.set()
+
+    monkeypatch.setattr(registry, 'flush', flush)
+    counter.inc()
+    assert flushed.wait(5)
+    assert threading.current_thread() not in threads
+
+
+def test_deferred_flush_writes_file(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path), flush_interval=0.01)
+    registry.counter('test_total', 'Prueba.').inc(endpoint='/predict')
+    deadline = time.monotonic() + 5
+    while not os.listdir(tmp_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.json')]
+    assert 'test_total{endpoint="/predict"} 1' in registry.render()
+
+
+def test_clear_drops_previous_run(tmp_path):
+    (tmp_path / '1-123.json').write_text('{"test_total": {"[]": 5}}')
+    (tmp_path / '1-123.json.tmp').write_text('{}')
+    registry = MetricsRegistry(directory=str(tmp_path))
+    counter = registry.counter('test_total', 'Prueba.')
+    registry.clear()
+    assert os.listdir(tmp_path) == []
+    counter.inc()
+    assert 'test_total 1' in registry.render()
+
+
+def test_owner_pid(monkeypatch):
+    monkeypatch.delenv('METRICS_OWNER_PID', raising=False)
+    # Sin master, el directorio es del propio proceso, no del shell que lo lanzó
+    assert metrics_owner_pid() == os.getpid()
+    monkeypatch.setenv('METRICS_OWNER_PID', '4242')
+    assert metrics_owner_pid() == 4242
+    assert MetricsRegistry()._directory().endswith('plant-api-metrics-4242')
+
+
+def test_gunicorn_on_starting_clears_directory(tmp_path, monkeypatch):
+    for name in ('METRICS_OWNER_PID', 'GUNICORN_WORKERS', 'DEFER_WORKER_INIT'):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(metrics.REGISTRY, 'directory', str(tmp_path))
+    (tmp_path / '1-123.json').write_text('{}')
+    config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=3)))
+    assert os.listdir(tmp_path) == []
+    assert os.environ['METRICS_OWNER_PID'] == str(os.getpid())
+    assert os.environ['GUNICORN_WORKERS'] == '3'
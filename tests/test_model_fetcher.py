@@ -0,0 +1,187 @@
+"""
+fetch_model contra un servidor HTTP local que admite (o ignora) Range.
+"""
+
+import hashlib
+import os
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+
+from API.model_fetcher import PART_SUFFIX, ModelFetchError, fetch_model
+from tests.conftest import ROOT
+
+DATA = random.Random(0).randbytes(64 * 1024)
+SHA256 = hashlib.sha256(DATA).hexdigest()
+CHUNK_SIZE = 4096
+
+
+def file_route(data, honor_range=True, cut_at=None, delay=0.0):
+    """
+    Ruta que sirve `data` como un servidor de archivos.
+
+    Args:
+        honor_range (bool): Responder 206/416 a las solicitudes con Range
+        cut_at (int): En la primera solicitud, cerrar la conexión tras
+            enviar hasta este byte (con Content-Length completo)
+        delay (float): Segundos de espera entre fragmentos del cuerpo
+    """
+    calls = []
+
+    def route(handler):
+        calls.append(handler.headers.get('Range'))
+        start = 0
+        range_header = handler.headers.get('Range')
+        if range_header and honor_range:
+            start = int(range_header.split('=', 1)[1].rstrip('-'))
+            if start >= len(data):
+                handler.send_response(416)
+                handler.send_header('Content-Range', f'bytes */{len(data)}')
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return
+            handler.send_response(206)
+            handler.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            handler.send_response(200)
+        body = data[start:]
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        if cut_at is not None and len(calls) == 1:
+            handler.wfile.write(body[:cut_at - start])
+            handler.wfile.flush()
+            handler.close_connection = True
+            return
+        for offset in range(0, len(body), CHUNK_SIZE):
+            handler.wfile.write(body[offset:offset + CHUNK_SIZE])
+            if delay:
+                handler.wfile.flush()
+                time.sleep(delay)
+
+    route.calls = calls
+    return route
+
+
+@pytest.fixture
+def dest(tmp_path):
+    return str(tmp_path / 'v1' / 'model.tflite')
+
+
+def serve(stand_in_server, **options):
+    route = file_route(DATA, **options)
+    server = stand_in_server({'/model.tflite': route})
+    return server.url('/model.tflite'), route
+
+
+def write_part(dest, content):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with open(dest + PART_SUFFIX, 'wb') as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_downloads_and_verifies(stand_in_server, dest):
+    url, route = serve(stand_in_server)
+    assert fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE) == dest
+    assert read(dest) == DATA
+    assert not os.path.exists(dest + PART_SUFFIX)
+    assert route.calls == [None]
+    # Ya publicado: no se vuelve a descargar
+    fetch_model(url, dest, sha256=SHA256)
+    assert route.calls == [None]
+
+
+def test_resumes_after_mid_stream_cut(stand_in_server, dest):
+    url, route = serve(stand_in_server, cut_at=20000)
+    fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    assert read(dest) == DATA
+    assert route.calls[0] is None
+    assert len(route.calls) == 2
+    resumed_at = int(route.calls[1].split('=', 1)[1].rstrip('-'))
+    assert 0 < resumed_at <= 20000
+
+
+def test_resumes_part_left_by_killed_process(stand_in_server, dest):
+    url, route = serve(stand_in_server)
+    write_part(dest, DATA[:30000])
+    fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    assert read(dest) == DATA
+    assert route.calls == ['bytes=30000-']
+
+
+def test_stale_part_is_discarded_and_restarted(stand_in_server, dest):
+    # .part de otra versión del archivo: reanudarlo da un contenido incorrecto
+    url, route = serve(stand_in_server)
+    write_part(dest, b'\x00' * 30000)
+    with pytest.raises(ModelFetchError, match='verificación'):
+        fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + PART_SUFFIX)
+    fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    assert read(dest) == DATA
+    assert route.calls == ['bytes=30000-', None]
+
+
+def test_wrong_checksum_is_not_published(stand_in_server, dest):
+    url, _ = serve(stand_in_server)
+    with pytest.raises(ModelFetchError, match='verificación'):
+        fetch_model(url, dest, sha256=hashlib.sha256(b'otro').hexdigest(), chunk_size=CHUNK_SIZE)
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + PART_SUFFIX)
+
+
+def test_complete_part_answered_with_416(stand_in_server, dest):
+    url, route = serve(stand_in_server)
+    write_part(dest, DATA)
+    fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    assert read(dest) == DATA
+    assert route.calls == [f'bytes={len(DATA)}-']
+
+
+def test_oversized_part_answered_with_416_is_discarded(stand_in_server, dest):
+    url, _ = serve(stand_in_server)
+    write_part(dest, DATA + b'sobra')
+    with pytest.raises(ModelFetchError, match='verificación'):
+        fetch_model(url, dest, chunk_size=CHUNK_SIZE)
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + PART_SUFFIX)
+
+
+def test_server_ignoring_range_restarts_from_zero(stand_in_server, dest):
+    url, route = serve(stand_in_server, honor_range=False)
+    write_part(dest, DATA[:30000])
+    fetch_model(url, dest, sha256=SHA256, chunk_size=CHUNK_SIZE)
+    # Sin duplicar los bytes del .part
+    assert read(dest) == DATA
+    assert route.calls == ['bytes=30000-']
+
+
+def test_concurrent_processes_download_once(stand_in_server, dest):
+    # Descarga lenta (~1 s) para que los procesos coincidan en el lock
+    url, route = serve(stand_in_server, delay=0.06)
+    script = (
+        'import sys\n'
+        'from API.model_fetcher import fetch_model\n'
+        'print(fetch_model(sys.argv[1], sys.argv[2], sha256=sys.argv[3], chunk_size=4096))\n'
+    )
+    processes = [
+        subprocess.Popen(
+            [sys.executable, '-c', script, url, dest, SHA256],
+            cwd=ROOT, env=dict(os.environ), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        for _ in range(6)
+    ]
+    for process in processes:
+        stdout, stderr = process.communicate(timeout=120)
+        assert process.returncode == 0, stderr.decode()
+        assert stdout.decode().strip().splitlines()[-1] == dest
+    assert route.calls == [None]
+    assert read(dest) == DATA
+    assert not os.path.exists(dest + PART_SUFFIX)
@@ -0,0 +1,52 @@
+"""
+Búsqueda por distancia de Hamming en NearDuplicateIndex.
+"""
+
+import numpy as np
+import pytest
+
+from API import near_duplicates
+from API.near_duplicates import NearDuplicateIndex
+
+HASH = 0x0F0F_F0F0_3C3C_C3C3
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico controlado por la prueba: clock[0] son los segundos actuales."""
+    now = [1000.0]
+    monkeypatch.setattr(near_duplicates.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def scores(class_idx):
+    values = np.zeros(4, dtype=np.float32)
+    values[class_idx] = 1.0
+    return values
+
+
+def test_returns_closest_within_distance(clock):
+    index = NearDuplicateIndex(max_distance=4, ttl=60)
+    index.set('m', HASH ^ 0b111, scores(3))
+    index.set('m', HASH ^ 0b1, scores(1))
+    found, distance = index.get('m', HASH)
+    assert distance == 1
+    assert int(np.argmax(found)) == 1
+    assert index.get('otro', HASH) == (None, None)
+    assert index.get('m', HASH ^ 0xFF00) == (None, None)
+
+
+def test_expired_closest_does_not_hide_live_candidate(clock):
+    index = NearDuplicateIndex(max_distance=4, ttl=60)
+    index.set('m', HASH ^ 0b1, scores(1))
+    clock[0] += 30
+    index.set('m', HASH ^ 0b111, scores(3))
+    # Vence la más cercana; la otra sigue dentro de su TTL
+    clock[0] += 40
+    found, distance = index.get('m', HASH)
+    assert distance == 3
+    assert int(np.argmax(found)) == 3
+    assert len(index) == 1
+    clock[0] += 30
+    assert index.get('m', HASH) == (None, None)
+    assert len(index) == 0
@@ -0,0 +1,33 @@
+"""
+Página de estado (/home): caché y endpoints listados.
+"""
+
+import re
+
+
+def test_home_etag_ignores_pool_occupancy(flask_client, api):
+    entry = api.model_registry.default_entry()
+    first = flask_client.get('/home')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    # Un intérprete prestado, como durante una inferencia
+    with entry.loader.pool.checkout():
+        models = flask_client.get('/models').get_json()['models']
+        assert [model['pool']['in_use'] for model in models if model['key'] == entry.key] == [1]
+        again = flask_client.get('/home', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+
+
+def listed_endpoints(html):
+    """Pares (método, ruta) que lista la página de estado."""
+    return set(re.findall(r'endpoint-method"[^>]*>(\w+)</span>\s*<strong>([^<]+)</strong>', html))
+
+
+def test_home_lists_only_served_endpoints(flask_client, asgi_client):
+    flask_listed = listed_endpoints(flask_client.get('/home').get_data(as_text=True))
+    asgi_listed = listed_endpoints(asgi_client.get('/home').text)
+    assert {('POST', '/predict'), ('GET', '/models')} <= asgi_listed
+    # /predict/batch solo existe en Flask
+    assert flask_listed - asgi_listed == {('POST', '/predict/batch')}
+    assert asgi_client.post('/predict/batch').status_code in (404, 405)
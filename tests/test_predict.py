@@ -0,0 +1,26 @@
+"""
+Validación de las solicitudes a /predict y /predict/batch en ambos modos.
+"""
+
+import pytest
+
+
+def error_of(response):
+    body = response.json() if callable(response.json) else response.json
+    assert body['success'] is False
+    return body['error']
+
+
+@pytest.mark.parametrize('client_name', ['flask_client', 'asgi_client'])
+def test_predict_rejects_non_object_body(request, client_name):
+    client = request.getfixturevalue(client_name)
+    response = client.post('/predict', json=['http://127.0.0.1/imagen.jpg'])
+    assert response.status_code == 400
+    assert 'objeto' in error_of(response)
+
+
+@pytest.mark.parametrize('body', [['http://127.0.0.1/imagen.jpg'], {'image_urls': 5}])
+def test_batch_rejects_malformed_body(flask_client, body):
+    response = flask_client.post('/predict/batch', json=body)
+    assert response.status_code == 400
+    error_of(response)